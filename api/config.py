@@ -65,6 +65,7 @@ class SecurityConfig(BaseModel):
 class ExperimentConfig(BaseModel):
     """Experiment execution configuration."""
     max_concurrent_experiments: int = Field(default=5, description="Maximum concurrent experiments")
+    max_queued_experiments: int = Field(default=100, description="Maximum experiments waiting to run")
     experiment_timeout: float = Field(default=3600.0, description="Experiment timeout in seconds")
     results_directory: str = Field(default="results", description="Results storage directory")
     cleanup_interval: int = Field(default=3600, description="Cleanup interval in seconds")
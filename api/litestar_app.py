@@ -13,14 +13,22 @@ import logging
 import os
 import sys
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from pathlib import Path
 
 from litestar import Litestar, Request, Response, get, post
 from litestar.config.cors import CORSConfig
 from litestar.exceptions import HTTPException
-from litestar.status_codes import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
+from litestar.response import ServerSentEvent
+from litestar.response.sse import ServerSentEventMessage
+from litestar.status_codes import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 from pydantic import BaseModel, Field, ValidationError
 
 # Add the parent directory to sys.path to import local modules
@@ -30,10 +38,18 @@ sys.path.insert(0, str(parent_dir))
 
 try:
     from dispatch import ExperimentDispatcher, LocalResultUploader
+    from scheduler import ExperimentScheduler, ExperimentQueueFull
+    from utils.result_store import to_json_compatible
+    from utils.experiment_events import EventBroadcaster, emitting_to, STATUS, END
+    from api.config import get_config
 except ImportError:
     # Fallback for when running from different directory
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from dispatch import ExperimentDispatcher, LocalResultUploader
+    from scheduler import ExperimentScheduler, ExperimentQueueFull
+    from utils.result_store import to_json_compatible
+    from utils.experiment_events import EventBroadcaster, emitting_to, STATUS, END
+    from config import get_config
 
 # Configure logging
 logging.basicConfig(
@@ -52,6 +68,7 @@ class ExperimentRequest(BaseModel):
     uo_type: str = Field(..., description="Type of experiment (CVA, PEIS, OCV, CP, LSV)")
     parameters: Dict[str, Any] = Field(..., description="Experiment parameters")
     metadata: Optional[Dict[str, Any]] = Field(default=None, description="Optional metadata")
+    priority: int = Field(default=0, description="Scheduling priority, higher runs first")
 
 class ExperimentResponse(BaseModel):
     """Model for experiment response."""
@@ -70,58 +87,133 @@ class ExperimentStatus(BaseModel):
 
 # Global state management
 class ExperimentManager:
-    """Manages experiment execution and status tracking."""
+    """
+    Manages experiment execution and status tracking.
+
+    Submitted experiments are handed to an ExperimentScheduler, which starts
+    them once the devices they need are free. The blocking dispatcher runs on
+    a thread pool, so the event loop keeps serving requests while experiments
+    run.
+    """
     
-    def __init__(self):
+    def __init__(self, max_concurrent: Optional[int] = None, max_queued: Optional[int] = None):
+        experiment_config = get_config().experiments
+        self.max_concurrent = max_concurrent or experiment_config.max_concurrent_experiments
+        self.max_queued = max_queued or experiment_config.max_queued_experiments
         self.dispatcher = ExperimentDispatcher()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent,
+            thread_name_prefix="experiment"
+        )
+        self.scheduler = ExperimentScheduler(
+            self._execute_experiment,
+            max_concurrent=self.max_concurrent,
+            max_queued=self.max_queued
+        )
+        self.events = EventBroadcaster()
         self.experiments: Dict[str, ExperimentStatus] = {}
-        self.running_experiments: Dict[str, asyncio.Task] = {}
+        self.running_experiments: Dict[str, asyncio.Future] = {}
     
-    async def submit_experiment(self, experiment_data: Dict[str, Any]) -> str:
-        """Submit an experiment for execution."""
+    async def submit_experiment(self, experiment_data: Dict[str, Any], priority: int = 0) -> str:
+        """
+        Queue an experiment for execution.
+
+        Raises:
+            ExperimentQueueFull: If the queue already holds max_queued experiments
+        """
         experiment_id = str(uuid.uuid4())
         
         # Create experiment status
-        status = ExperimentStatus(
+        self.experiments[experiment_id] = ExperimentStatus(
             experiment_id=experiment_id,
             status="pending",
             created_at=datetime.now()
         )
-        self.experiments[experiment_id] = status
         
-        # Start experiment execution in background
-        task = asyncio.create_task(self._execute_experiment(experiment_id, experiment_data))
-        self.running_experiments[experiment_id] = task
+        try:
+            self.scheduler.submit(experiment_id, experiment_data, priority)
+        except ExperimentQueueFull:
+            del self.experiments[experiment_id]
+            raise
         
         return experiment_id
     
+    def _set_status(self, experiment_id: str, status: str):
+        """Update an experiment's status and notify stream subscribers."""
+        experiment = self.experiments[experiment_id]
+        experiment.status = status
+        if status in ("completed", "failed"):
+            experiment.completed_at = datetime.now()
+        self.events.publish(experiment_id, STATUS, {"status": status})
+        if status in ("completed", "failed"):
+            self.events.publish(experiment_id, END, {"status": status})
+    
+    def _run_dispatcher(self, experiment_id: str, experiment_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the dispatcher on a worker thread, streaming backend events."""
+        with emitting_to(self.events.listener_for(experiment_id)):
+            return self.dispatcher.execute_experiment(experiment_data)
+    
     async def _execute_experiment(self, experiment_id: str, experiment_data: Dict[str, Any]):
-        """Execute experiment in background."""
+        """Execute experiment on the worker thread pool."""
         try:
             logger.info(f"Starting experiment execution: {experiment_id}")
-            self.experiments[experiment_id].status = "running"
+            self._set_status(experiment_id, "running")
             
-            # Execute experiment using dispatcher
-            result = self.dispatcher.execute_experiment(experiment_data)
+            # Execute experiment using dispatcher without blocking the event loop
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor, self._run_dispatcher, experiment_id, experiment_data
+            )
+            self.running_experiments[experiment_id] = future
+            result = await future
             
             # Update status
-            self.experiments[experiment_id].status = "completed"
-            self.experiments[experiment_id].completed_at = datetime.now()
-            self.experiments[experiment_id].result = result
+            self.experiments[experiment_id].result = to_json_compatible(result)
+            self._set_status(experiment_id, "completed")
             
             logger.info(f"Experiment completed successfully: {experiment_id}")
             
         except Exception as e:
             logger.error(f"Experiment failed: {experiment_id}, Error: {str(e)}")
-            self.experiments[experiment_id].status = "failed"
-            self.experiments[experiment_id].completed_at = datetime.now()
             self.experiments[experiment_id].result = {"error": str(e)}
+            self._set_status(experiment_id, "failed")
         
         finally:
             # Clean up running task
             if experiment_id in self.running_experiments:
                 del self.running_experiments[experiment_id]
     
+    async def stream_events(self, experiment_id: str, keepalive: float = 15.0) -> AsyncIterator[ServerSentEventMessage]:
+        """
+        Yield server-sent events for an experiment until it finishes.
+
+        The current status is sent first. Samples produced before the client
+        connected are not replayed.
+        """
+        subscription = self.events.subscribe(experiment_id)
+        try:
+            status = self.experiments[experiment_id].status
+            yield ServerSentEventMessage(event=STATUS, data=json.dumps({"status": status}))
+            if status in ("completed", "failed"):
+                yield ServerSentEventMessage(event=END, data=json.dumps({"status": status}))
+                return
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ServerSentEventMessage(comment="keepalive")
+                    continue
+                
+                data = dict(event["data"])
+                if "dropped_samples" in event:
+                    data["dropped_samples"] = event["dropped_samples"]
+                yield ServerSentEventMessage(event=event["event"], data=json.dumps(data))
+                if event["event"] == END:
+                    return
+        finally:
+            self.events.unsubscribe(experiment_id, subscription)
+    
     def get_experiment_status(self, experiment_id: str) -> Optional[ExperimentStatus]:
         """Get experiment status by ID."""
         return self.experiments.get(experiment_id)
@@ -130,12 +222,17 @@ class ExperimentManager:
         """List all experiments."""
         return list(self.experiments.values())
     
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Get the number of queued and running experiments."""
+        return self.scheduler.get_stats()
+    
     def cleanup(self):
         """Clean up resources."""
-        # Cancel running tasks
-        for task in self.running_experiments.values():
-            if not task.done():
-                task.cancel()
+        # Stop taking new work from the queue
+        self.scheduler.cancel_all()
+        
+        # Experiments already on the pool cannot be interrupted; don't wait for them
+        self.executor.shutdown(wait=False)
         
         # Clean up dispatcher
         self.dispatcher.cleanup()
@@ -164,14 +261,21 @@ async def submit_experiment(data: ExperimentRequest) -> ExperimentResponse:
             experiment_data["metadata"] = data.metadata
         
         # Submit experiment
-        experiment_id = await experiment_manager.submit_experiment(experiment_data)
+        experiment_id = await experiment_manager.submit_experiment(experiment_data, data.priority)
         
         return ExperimentResponse(
             status="success",
             experiment_id=experiment_id,
-            message="Experiment submitted successfully"
+            message="Experiment submitted successfully",
+            data=experiment_manager.get_queue_stats()
         )
         
+    except ExperimentQueueFull as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except ValidationError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(
@@ -218,6 +322,23 @@ async def get_experiment_status(experiment_id: str) -> ExperimentResponse:
             detail=f"Internal server error: {str(e)}"
         )
 
+@get("/experiments/{experiment_id:str}/stream")
+async def stream_experiment(experiment_id: str) -> ServerSentEvent:
+    """
+    Stream samples, cycle boundaries and status changes of an experiment.
+
+    Sent as server-sent events ("status", "samples", "cycle", "end"). Slow
+    clients skip sample events rather than stalling the server; the next
+    event then carries the number of "dropped_samples".
+    """
+    if experiment_manager.get_experiment_status(experiment_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Experiment {experiment_id} not found"
+        )
+    
+    return ServerSentEvent(experiment_manager.stream_events(experiment_id))
+
 @get("/experiments")
 async def list_experiments() -> ExperimentResponse:
     """List all experiments."""
@@ -261,15 +382,23 @@ async def submit_batch_experiments(experiments: List[ExperimentRequest]) -> Expe
             if exp_data.metadata:
                 experiment_data["metadata"] = exp_data.metadata
             
-            experiment_id = await experiment_manager.submit_experiment(experiment_data)
+            experiment_id = await experiment_manager.submit_experiment(
+                experiment_data, exp_data.priority
+            )
             experiment_ids.append(experiment_id)
         
         return ExperimentResponse(
             status="success",
             message=f"Submitted {len(experiment_ids)} experiments",
-            data={"experiment_ids": experiment_ids}
+            data={"experiment_ids": experiment_ids, **experiment_manager.get_queue_stats()}
         )
         
+    except ExperimentQueueFull as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{str(e)}; submitted {len(experiment_ids)} experiments before the queue filled: {experiment_ids}"
+        )
     except Exception as e:
         logger.error(f"Error submitting batch experiments: {str(e)}")
         raise HTTPException(
@@ -283,7 +412,8 @@ async def health_check() -> Dict[str, Any]:
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "experiments": experiment_manager.get_queue_stats()
     }
 
 @get("/")
@@ -296,6 +426,7 @@ async def root() -> Dict[str, Any]:
         "endpoints": {
             "submit_experiment": "POST /experiments",
             "get_experiment_status": "GET /experiments/{experiment_id}",
+            "stream_experiment": "GET /experiments/{experiment_id}/stream",
             "list_experiments": "GET /experiments",
             "batch_experiments": "POST /experiments/batch",
             "health_check": "GET /health"
@@ -310,28 +441,29 @@ cors_config = CORSConfig(
     allow_credentials=True,
 )
 
+# Cleanup on shutdown
+async def cleanup_on_shutdown():
+    """Clean up resources on application shutdown."""
+    logger.info("Shutting down API server...")
+    experiment_manager.cleanup()
+    logger.info("API server shutdown complete")
+
 # Create Litestar application
 app = Litestar(
     route_handlers=[
         submit_experiment,
         get_experiment_status,
+        stream_experiment,
         list_experiments,
         submit_batch_experiments,
         health_check,
         root
     ],
     cors_config=cors_config,
+    on_shutdown=[cleanup_on_shutdown],
     debug=True,
 )
 
-# Cleanup on shutdown
-@app.on_shutdown
-async def cleanup_on_shutdown():
-    """Clean up resources on application shutdown."""
-    logger.info("Shutting down API server...")
-    experiment_manager.cleanup()
-    logger.info("API server shutdown complete")
-
 if __name__ == "__main__":
     import uvicorn
     
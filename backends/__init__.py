@@ -5,6 +5,7 @@ This package contains backend implementations for various electrochemical experi
 """
 
 from backends.base import BaseBackend
+from backends.clock import Clock, RealClock, VirtualClock, AcceleratedClock, make_clock
 from backends.cva_backend import CVABackend
 from backends.peis_backend import PEISBackend
 from backends.ocv_backend import OCVBackend
@@ -13,6 +14,11 @@ from backends.lsv_backend import LSVBackend
 
 __all__ = [
     'BaseBackend',
+    'Clock',
+    'RealClock',
+    'VirtualClock',
+    'AcceleratedClock',
+    'make_clock',
     'CVABackend',
     'PEISBackend',
     'OCVBackend',
@@ -11,16 +11,30 @@ implementations must follow.
 import logging
 import json
 import os
+import threading
+import uuid
 from abc import ABC, abstractmethod
+from concurrent import futures
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Union
 
+import numpy as np
+
 from hardware.OT_Arduino_Client import Arduino
 from hardware.OT2_control import OT2Control
 
+from backends.clock import Clock, make_clock
+from utils.data_processing import SMOOTHING_METHODS, StreamingSmoother
+from utils.result_store import save_results
+from utils.sample_sink import SampleSink
+from utils.experiment_events import emit, is_streaming, SAMPLES
+
 # Configure logging
 LOGGER = logging.getLogger(__name__)
 
+# All bases and pumps sit behind one Arduino serial link; only one backend talks to it at a time
+_ARDUINO_LOCK = threading.Lock()
+
 class BaseBackend(ABC):
     """
     Base class for all experiment backends.
@@ -33,7 +47,8 @@ class BaseBackend(ABC):
         self,
         config_path: Optional[str] = None,
         result_uploader: Optional[Any] = None,
-        experiment_type: str = "UNKNOWN"
+        experiment_type: str = "UNKNOWN",
+        clock: Optional[Clock] = None
     ):
         """
         Initialize the experiment backend.
@@ -42,13 +57,17 @@ class BaseBackend(ABC):
             config_path (Optional[str]): Path to configuration file
             result_uploader (Optional[Any]): Result uploader instance
             experiment_type (str): Type of experiment (e.g., 'CVA', 'PEIS')
+            clock (Optional[Clock]): Clock used to pace sampling. Defaults to the
+                "clock" entry of the configuration file, or the real clock
         """
         self.logger = logging.getLogger(self.__class__.__name__)
         self.config = self._load_config(config_path) if config_path else {}
+        self.clock = clock or make_clock(self.config.get("clock"))
         self.arduino: Optional[Arduino] = None
         self.ot2_client: Optional[OT2Control] = None
         self.result_uploader = result_uploader
         self.experiment_type = experiment_type
+        self._connect_lock = threading.Lock()
         self.logger.info(f"{experiment_type} Backend initialized")
 
     def _load_config(self, config_path: str) -> Dict[str, Any]:
@@ -142,15 +161,20 @@ class BaseBackend(ABC):
             return {"status": "error", "message": error_msg}
 
         # Connect to devices if not already connected
-        if not self.arduino or not self.ot2_client:
-            if not self.connect_devices():
-                return {"status": "error", "message": "Failed to connect to devices"}
+        with self._connect_lock:
+            if not self.arduino or not self.ot2_client:
+                if not self.connect_devices():
+                    return {"status": "error", "message": "Failed to connect to devices"}
 
+        arduino_actions = {}
         try:
-            # Execute Arduino actions if specified
+            # Start Arduino actions if specified; the measurement only waits
+            # for the ones listed in "measure_after" (all by default)
             if "arduino_control" in params:
-                from utils.utils import execute_arduino_actions
-                execute_arduino_actions(params["arduino_control"], self.arduino)
+                from utils.utils import plan_arduino_actions, schedule_arduino_actions
+                arduino_actions = schedule_arduino_actions(params["arduino_control"], self.arduino, lock=_ARDUINO_LOCK)
+                _, _, measure_after = plan_arduino_actions(params["arduino_control"])
+                futures.wait([arduino_actions[key] for key in measure_after])
 
             # Execute measurement
             results = self._execute_measurement(params)
@@ -172,6 +196,9 @@ class BaseBackend(ABC):
             return {"status": "error", "message": str(e)}
 
         finally:
+            # Actions running alongside the measurement still belong to this experiment
+            futures.wait(list(arduino_actions.values()))
+
             # Optionally disconnect devices
             if self.config.get("auto_disconnect", False):
                 self.disconnect_devices()
@@ -180,6 +207,9 @@ class BaseBackend(ABC):
         """
         Save experiment results to file.
 
+        Series are stored as .npy columns next to a JSON sidecar, see
+        utils.result_store.
+
         Args:
             results (Dict[str, Any]): Experiment results
             uo (Dict[str, Any]): Unit operation dictionary
@@ -193,20 +223,89 @@ class BaseBackend(ABC):
         filename = f"{self.experiment_type.lower()}_{timestamp}.json"
         filepath = os.path.join(results_dir, filename)
 
-        # Save results
+        # Save results as binary columns with a JSON sidecar, unless the
+        # configuration asks for plain JSON ("result_format": "json")
         try:
-            with open(filepath, 'w') as f:
-                json.dump({
-                    "uo": uo,
-                    "results": results,
-                    "timestamp": timestamp,
-                    "experiment_type": self.experiment_type
-                }, f, indent=2)
+            save_results({
+                "uo": uo,
+                "results": results,
+                "timestamp": timestamp,
+                "experiment_type": self.experiment_type
+            }, filepath, result_format=self.config.get("result_format", "columnar"))
             self.logger.info(f"Results saved to {filepath}")
         except Exception as e:
             self.logger.error(f"Failed to save results to {filepath}: {str(e)}")
             raise
 
+    def _open_sample_sink(self, columns: List[str]) -> SampleSink:
+        """
+        Open a sink that persists samples while they are being acquired.
+
+        The series is written under the "stream_dir" configuration entry
+        (default: results/streams) and can be read with
+        utils.sample_sink.read_samples while the run is in progress. Saved
+        results reference these files rather than copying the series, so the
+        stream directory must be kept with the results.
+
+        Args:
+            columns (List[str]): Column names, in the order values are appended
+
+        Returns:
+            SampleSink: Open sink, to be closed when the measurement ends
+        """
+        stream_dir = self.config.get("stream_dir", os.path.join(os.getcwd(), "results", "streams"))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directory = os.path.join(
+            stream_dir, f"{self.experiment_type.lower()}_{timestamp}_{uuid.uuid4().hex[:8]}"
+        )
+        self.logger.info(f"Streaming samples to {directory}")
+        return SampleSink(
+            directory, columns,
+            block_size=self.config.get("stream_block_size", 4096),
+            max_delay=self.config.get("stream_flush_interval", 1.0),
+            on_flush=self._emit_samples if is_streaming() else None
+        )
+
+    def _open_smoother(self, params: Dict[str, Any], num_points: int) -> Optional[StreamingSmoother]:
+        """
+        Create a smoother for a live series, if the parameters ask for one.
+
+        Uses the "smoothing_window", "smoothing_method" and "smoothing_polyorder"
+        parameters; see utils.data_processing.smooth_data.
+
+        Args:
+            params (Dict[str, Any]): Experiment parameters
+            num_points (int): Number of samples that will be pushed
+
+        Returns:
+            Optional[StreamingSmoother]: Smoother writing into a preallocated
+                array, or None if no smoothing window is set
+        """
+        window = params.get("smoothing_window")
+        if not window:
+            return None
+        return StreamingSmoother(
+            window,
+            method=params.get("smoothing_method", "moving_average"),
+            polyorder=params.get("smoothing_polyorder", 2),
+            out=np.empty(num_points)
+        )
+
+    def _emit_samples(self, columns: Dict[str, Any], offset: int = 0, **extra: Any) -> None:
+        """
+        Report newly acquired samples to live stream subscribers, if any.
+
+        Args:
+            columns (Dict[str, Any]): Equal-length series keyed by column name
+            offset (int): Index of the first sample within the measurement
+            **extra (Any): Additional fields for the event, e.g. the cycle number
+        """
+        if not is_streaming():
+            return
+        series = {name: np.asarray(values).tolist() for name, values in columns.items()}
+        count = len(next(iter(series.values()), []))
+        emit(SAMPLES, {"offset": offset, "count": count, "columns": series, **extra})
+
     @abstractmethod
     def _execute_measurement(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -251,6 +350,24 @@ class BaseBackend(ABC):
             if timing is not None and timing < 0:
                 errors.append("Ultrasonic timing must be non-negative")
 
+            # Validate action dependencies
+            from utils.utils import plan_arduino_actions
+            try:
+                plan_arduino_actions(arduino_params)
+            except ValueError as e:
+                errors.append(str(e))
+
+        # Validate live smoothing
+        window = params.get("smoothing_window")
+        method = params.get("smoothing_method", "moving_average")
+        if window is not None and (not isinstance(window, int) or window < 1):
+            errors.append("Smoothing window must be a positive integer")
+        elif method not in SMOOTHING_METHODS:
+            errors.append(f"Smoothing method must be one of {', '.join(SMOOTHING_METHODS)}")
+        elif window is not None and method == "savgol" and (
+                window % 2 == 0 or params.get("smoothing_polyorder", 2) >= window):
+            errors.append("Savitzky-Golay smoothing needs an odd window larger than the polynomial order")
+
         return errors
 
     def get_default_parameters(self) -> Dict[str, Any]:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Clock Module
+
+This module provides the clocks backends use to pace sampling. RealClock follows
+wall-clock time, VirtualClock jumps forward instantly on sleep, and AcceleratedClock
+runs a fixed factor faster than real time. Dry runs and regression tests can swap
+in a simulated clock without touching the measurement code.
+"""
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+class Clock(ABC):
+    """
+    Base class for backend clocks.
+
+    Times are in seconds and only meaningful relative to each other.
+    """
+
+    @abstractmethod
+    def time(self) -> float:
+        """
+        Get the current time.
+
+        Returns:
+            float: Current time in seconds
+        """
+        raise NotImplementedError("Subclasses must implement time")
+
+    @abstractmethod
+    def sleep(self, seconds: float) -> None:
+        """
+        Wait for the given number of seconds.
+
+        Args:
+            seconds (float): Time to wait in seconds
+        """
+        raise NotImplementedError("Subclasses must implement sleep")
+
+    def sleep_until(self, deadline: float) -> None:
+        """
+        Wait until the clock reaches the given time.
+
+        Args:
+            deadline (float): Time, as returned by time(), to wait for
+        """
+        remaining = deadline - self.time()
+        if remaining > 0:
+            self.sleep(remaining)
+
+
+class RealClock(Clock):
+    """Clock that follows wall-clock time."""
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Clock whose time only moves when something sleeps.
+
+    Sleeping returns immediately after advancing the clock, so a run paced
+    by this clock takes as long as its computation. All callers share one
+    timeline, so concurrent sleepers each advance it.
+    """
+
+    def __init__(self, start: float = 0.0):
+        """
+        Initialize the virtual clock.
+
+        Args:
+            start (float): Initial time in seconds
+        """
+        self._now = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    def advance(self, seconds: float) -> None:
+        """
+        Move the clock forward without a caller sleeping.
+
+        Args:
+            seconds (float): Time to add in seconds
+        """
+        self.sleep(seconds)
+
+
+class AcceleratedClock(Clock):
+    """Clock that runs a fixed factor faster than wall-clock time."""
+
+    def __init__(self, speedup: float = 1000.0):
+        """
+        Initialize the accelerated clock.
+
+        Args:
+            speedup (float): How many simulated seconds pass per real second
+        """
+        if speedup <= 0:
+            raise ValueError("Clock speedup must be positive")
+        self.speedup = speedup
+        self._origin = time.monotonic()
+
+    def time(self) -> float:
+        return (time.monotonic() - self._origin) * self.speedup
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds / self.speedup)
+
+
+def make_clock(spec: Optional[Union[str, float, dict, Clock]] = None) -> Clock:
+    """
+    Create a clock from a configuration value.
+
+    Args:
+        spec: One of
+            - None or "real": RealClock
+            - "virtual": VirtualClock
+            - a number: AcceleratedClock with that speedup
+            - a dict with "type" ("real", "virtual" or "accelerated") and,
+              for accelerated clocks, "speedup"
+            - a Clock instance, returned as is
+
+    Returns:
+        Clock: The configured clock
+
+    Raises:
+        ValueError: If the clock type is unknown
+    """
+    if isinstance(spec, Clock):
+        return spec
+    if spec is None:
+        return RealClock()
+    if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+        return AcceleratedClock(float(spec))
+
+    options: dict = dict(spec) if isinstance(spec, dict) else {"type": spec}
+    clock_type = str(options.get("type", "real")).lower()
+
+    if clock_type == "real":
+        return RealClock()
+    if clock_type == "virtual":
+        return VirtualClock(float(options.get("start", 0.0)))
+    if clock_type == "accelerated":
+        return AcceleratedClock(float(options.get("speedup", 1000.0)))
+    raise ValueError(f"Unknown clock type: {clock_type}")
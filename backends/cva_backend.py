@@ -9,12 +9,14 @@ the corresponding experimental procedures.
 """
 
 import logging
-import time
 import numpy as np
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
 from backends.base import BaseBackend
+from backends.clock import Clock
+from utils.data_processing import CVCycleTracker
+from utils.experiment_events import emit, CYCLE, FEATURES
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
@@ -30,15 +32,21 @@ class CVABackend(BaseBackend):
     4. Data collection and storage
     """
     
-    def __init__(self, config_path: Optional[str] = None, result_uploader: Optional[Any] = None):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        result_uploader: Optional[Any] = None,
+        clock: Optional[Clock] = None
+    ):
         """
         Initialize the CVA backend.
         
         Args:
             config_path (Optional[str]): Path to configuration file
             result_uploader (Optional[Any]): Result uploader instance
+            clock (Optional[Clock]): Clock used to pace sampling
         """
-        super().__init__(config_path, result_uploader, experiment_type="CVA")
+        super().__init__(config_path, result_uploader, experiment_type="CVA", clock=clock)
     
     def _execute_measurement(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -57,6 +65,10 @@ class CVABackend(BaseBackend):
         cycles = params.get("cycles", 1)  # Number of cycles
         sample_interval = params.get("sample_interval", 0.1)  # Sampling interval in seconds
         
+        # Early stop once consecutive cycles agree within this relative RMS change (optional)
+        stability_tolerance = params.get("stability_tolerance")
+        stable_cycles = params.get("stable_cycles", 2)
+        
         # Reference electrode configuration
         reference = params.get("reference", {
             "type": "RE",  # RE or CE
@@ -85,7 +97,8 @@ class CVABackend(BaseBackend):
                 # Execute measurement with updated parameter
                 cycle_results = self._execute_cycles(
                     start_voltage, end_voltage, scan_rate, 
-                    cycles, sample_interval, reference
+                    cycles, sample_interval, reference,
+                    stability_tolerance, stable_cycles
                 )
                 
                 all_results.append({
@@ -97,7 +110,8 @@ class CVABackend(BaseBackend):
             # Execute single set of cycles
             all_results = self._execute_cycles(
                 start_voltage, end_voltage, scan_rate,
-                cycles, sample_interval, reference
+                cycles, sample_interval, reference,
+                stability_tolerance, stable_cycles
             )
         
         return {
@@ -110,7 +124,9 @@ class CVABackend(BaseBackend):
                 "cycles": cycles,
                 "sample_interval": sample_interval,
                 "reference": reference,
-                "nested_loop": nested_loop
+                "nested_loop": nested_loop,
+                "stability_tolerance": stability_tolerance,
+                "stable_cycles": stable_cycles
             },
             "timestamp": datetime.now().isoformat()
         }
@@ -122,11 +138,18 @@ class CVABackend(BaseBackend):
         scan_rate: float,
         cycles: int,
         sample_interval: float,
-        reference: Dict[str, Any]
+        reference: Dict[str, Any],
+        stability_tolerance: Optional[float] = None,
+        stable_cycles: int = 2
     ) -> List[Dict[str, Any]]:
         """
         Execute multiple CV cycles.
         
+        The features of each cycle are computed as soon as it completes. With
+        a stability tolerance, the run ends early once stable_cycles
+        consecutive cycles changed less than the tolerance (see
+        utils.data_processing.CVCycleTracker).
+        
         Args:
             start_voltage (float): Starting voltage
             end_voltage (float): Ending voltage
@@ -134,62 +157,82 @@ class CVABackend(BaseBackend):
             cycles (int): Number of cycles
             sample_interval (float): Sampling interval
             reference (Dict[str, Any]): Reference electrode configuration
+            stability_tolerance (Optional[float]): Relative RMS change between
+                cycles below which the CV counts as stable
+            stable_cycles (int): Consecutive stable cycles that end the run
             
         Returns:
-            List[Dict[str, Any]]: Results for each cycle
+            List[Dict[str, Any]]: Results for each cycle run
         """
         cycle_results = []
+        tracker = CVCycleTracker(stability_tolerance, stable_cycles)
+        
+        # Calculate points for forward and reverse scans
+        voltage_range = abs(end_voltage - start_voltage)
+        points_per_scan = int(voltage_range / (scan_rate * sample_interval))
+        
+        # The waveform is the same for every cycle: forward scan (start -> end)
+        # followed by reverse scan (end -> start), with a signed scan rate per point
+        forward_voltages = np.linspace(start_voltage, end_voltage, points_per_scan)
+        voltages = np.concatenate((forward_voltages, forward_voltages[::-1]))
+        scan_rates = np.repeat([scan_rate, -scan_rate], points_per_scan)
+        time_points = np.arange(voltages.size) * sample_interval
+        times = time_points.tolist()
+        voltage_list = voltages.tolist()
         
         for cycle in range(cycles):
             self.logger.info(f"Executing cycle {cycle + 1}/{cycles}")
+            emit(CYCLE, {"cycle": cycle + 1, "cycles": cycles})
             
-            # Calculate points for forward and reverse scans
-            voltage_range = abs(end_voltage - start_voltage)
-            points_per_scan = int(voltage_range / (scan_rate * sample_interval))
-            
-            # Forward scan (start_voltage -> end_voltage)
-            forward_voltages = np.linspace(start_voltage, end_voltage, points_per_scan)
-            forward_currents = [
-                self._simulate_current_response(v, scan_rate) 
-                for v in forward_voltages
-            ]
-            
-            # Reverse scan (end_voltage -> start_voltage)
-            reverse_voltages = np.linspace(end_voltage, start_voltage, points_per_scan)
-            reverse_currents = [
-                self._simulate_current_response(v, -scan_rate)
-                for v in reverse_voltages
-            ]
+            currents = self._simulate_current_response(voltages, scan_rates)
+            self._emit_samples(
+                {"time": time_points, "voltage": voltages, "current": currents},
+                offset=cycle * voltages.size, cycle=cycle + 1
+            )
             
-            # Combine scans
-            voltages = list(forward_voltages) + list(reverse_voltages)
-            currents = forward_currents + reverse_currents
-            times = [i * sample_interval for i in range(len(voltages))]
+            # JSON has no NaN; features that don't apply yet are null
+            features = {
+                key: None if isinstance(value, float) and np.isnan(value) else value
+                for key, value in tracker.add_cycle(time_points, voltages, currents).items()
+            }
+            emit(FEATURES, features)
             
             cycle_results.append({
                 "cycle": cycle + 1,
-                "time": times,
-                "voltage": voltages,
-                "current": currents
+                "time": list(times),
+                "voltage": list(voltage_list),
+                "current": currents.tolist(),
+                "features": features
             })
             
+            if tracker.stable and cycle < cycles - 1:
+                self.logger.info(f"CV stable after {cycle + 1} cycles "
+                                 f"(drift {features['drift_rms']:.2%}), skipping the remaining {cycles - cycle - 1}")
+                break
+            
             # Small delay between cycles
             if cycle < cycles - 1:
-                time.sleep(0.5)
+                self.clock.sleep(0.5)
         
         return cycle_results
     
-    def _simulate_current_response(self, voltage: float, scan_rate: float) -> float:
+    def _simulate_current_response(
+        self,
+        voltage: Union[float, np.ndarray],
+        scan_rate: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
         """
         Simulate current response for a given voltage and scan rate.
         Replace this with actual measurement code.
         
+        Works element-wise, so a whole sweep can be simulated in one call.
+        
         Args:
-            voltage (float): Applied voltage
-            scan_rate (float): Scan rate (positive for forward, negative for reverse)
+            voltage (Union[float, np.ndarray]): Applied voltage(s)
+            scan_rate (Union[float, np.ndarray]): Scan rate(s) (positive for forward, negative for reverse)
             
         Returns:
-            float: Simulated current response
+            Union[float, np.ndarray]: Simulated current response
         """
         # Simple simulation of CV curve
         # Replace with actual measurement
@@ -236,6 +279,15 @@ class CVABackend(BaseBackend):
             
         if cycles is not None and (not isinstance(cycles, int) or cycles <= 0):
             errors.append("Cycles must be a positive integer")
+        
+        stability_tolerance = params.get("stability_tolerance")
+        stable_cycles = params.get("stable_cycles")
+        
+        if stability_tolerance is not None and (not isinstance(stability_tolerance, (int, float)) or stability_tolerance < 0):
+            errors.append("Stability tolerance must be a non-negative number")
+            
+        if stable_cycles is not None and (not isinstance(stable_cycles, int) or stable_cycles <= 0):
+            errors.append("Stable cycles must be a positive integer")
             
         return errors
     
@@ -9,12 +9,12 @@ the corresponding experimental procedures.
 """
 
 import logging
-import time
 import numpy as np
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
 from backends.base import BaseBackend
+from backends.clock import Clock
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
@@ -30,15 +30,21 @@ class LSVBackend(BaseBackend):
     4. Data collection and storage
     """
     
-    def __init__(self, config_path: Optional[str] = None, result_uploader: Optional[Any] = None):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        result_uploader: Optional[Any] = None,
+        clock: Optional[Clock] = None
+    ):
         """
         Initialize the LSV backend.
         
         Args:
             config_path (Optional[str]): Path to configuration file
             result_uploader (Optional[Any]): Result uploader instance
+            clock (Optional[Clock]): Clock used to pace sampling
         """
-        super().__init__(config_path, result_uploader, experiment_type="LSV")
+        super().__init__(config_path, result_uploader, experiment_type="LSV", clock=clock)
     
     def _execute_measurement(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -73,29 +79,22 @@ class LSVBackend(BaseBackend):
         # Generate voltage points
         voltages = np.linspace(start_voltage, end_voltage, points_per_scan)
         
-        # Lists to store results
-        currents = []
-        times = []
+        # Simulate measurement (replace with actual measurement)
+        start_time = self.clock.time()
+        currents = self._simulate_current_response(voltages, scan_rate)
+        times = np.arange(voltages.size) * sample_interval
+        self._emit_samples({"time": times, "voltage": voltages, "current": currents})
         
-        # Simulate measurement
-        start_time = time.time()
-        for i, voltage in enumerate(voltages):
-            # Simulate current measurement (replace with actual measurement)
-            current = self._simulate_current_response(voltage, scan_rate)
-            
-            currents.append(current)
-            times.append(i * sample_interval)
-            
-            # Wait until next sample time
-            next_sample_time = start_time + (i + 1) * sample_interval
-            sleep_time = max(0, next_sample_time - time.time())
-            if sleep_time > 0 and i < len(voltages) - 1:
-                time.sleep(sleep_time)
+        # Wait until the last sample time
+        if voltages.size > 1:
+            sleep_time = max(0, start_time + times[-1] - self.clock.time())
+            if sleep_time > 0:
+                self.clock.sleep(sleep_time)
         
         return {
-            "time": times,
+            "time": times.tolist(),
             "voltage": voltages.tolist(),
-            "current": currents,
+            "current": currents.tolist(),
             "parameters": {
                 "start_voltage": start_voltage,
                 "end_voltage": end_voltage,
@@ -106,17 +105,23 @@ class LSVBackend(BaseBackend):
             "timestamp": datetime.now().isoformat()
         }
     
-    def _simulate_current_response(self, voltage: float, scan_rate: float) -> float:
+    def _simulate_current_response(
+        self,
+        voltage: Union[float, np.ndarray],
+        scan_rate: float
+    ) -> Union[float, np.ndarray]:
         """
         Simulate current response for a given voltage and scan rate.
         Replace this with actual measurement code.
         
+        Works element-wise, so a whole sweep can be simulated in one call.
+        
         Args:
-            voltage (float): Applied voltage
+            voltage (Union[float, np.ndarray]): Applied voltage(s)
             scan_rate (float): Scan rate
             
         Returns:
-            float: Simulated current response
+            Union[float, np.ndarray]: Simulated current response
         """
         # Simple simulation of LSV curve
         # Replace with actual measurement
@@ -131,7 +136,7 @@ class LSVBackend(BaseBackend):
         
         # Add some noise
         noise_level = 0.05  # 5% noise
-        peak_current *= (1 + noise_level * (np.random.random() - 0.5))
+        peak_current = peak_current * (1 + noise_level * (np.random.random(np.shape(voltage)) - 0.5))
         
         return peak_current
     
@@ -9,12 +9,12 @@ the corresponding experimental procedures.
 """
 
 import logging
-import time
 import numpy as np
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
 from backends.base import BaseBackend
+from backends.clock import Clock
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
@@ -30,15 +30,21 @@ class OCVBackend(BaseBackend):
     4. Data collection and storage
     """
     
-    def __init__(self, config_path: Optional[str] = None, result_uploader: Optional[Any] = None):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        result_uploader: Optional[Any] = None,
+        clock: Optional[Clock] = None
+    ):
         """
         Initialize the OCV backend.
         
         Args:
             config_path (Optional[str]): Path to configuration file
             result_uploader (Optional[Any]): Result uploader instance
+            clock (Optional[Clock]): Clock used to pace sampling
         """
-        super().__init__(config_path, result_uploader, experiment_type="OCV")
+        super().__init__(config_path, result_uploader, experiment_type="OCV", clock=clock)
     
     def _execute_measurement(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -66,31 +72,37 @@ class OCVBackend(BaseBackend):
         # Calculate number of data points
         num_points = int(duration / sample_interval) + 1
         
-        # Lists to store results
-        times = []
-        voltages = []
-        
-        # Simulate measurement
-        start_time = time.time()
-        for i in range(num_points):
-            # Calculate current time
-            current_time = i * sample_interval
-            
-            # Simulate voltage measurement (replace with actual measurement)
-            voltage = self._simulate_voltage_measurement(current_time, reference)
-            
-            times.append(current_time)
-            voltages.append(voltage)
-            
-            # Wait until next sample time
-            next_sample_time = start_time + (i + 1) * sample_interval
-            sleep_time = max(0, next_sample_time - time.time())
-            if sleep_time > 0 and i < num_points - 1:
-                time.sleep(sleep_time)
-        
-        return {
-            "time": times,
-            "voltage": voltages,
+        # Optional smoothing as the samples arrive
+        smoother = self._open_smoother(params, num_points)
+        
+        # Samples go straight to disk in blocks, so long runs use bounded memory
+        # and the partial series survives a crash
+        with self._open_sample_sink(["time", "voltage"]) as sink:
+            # Simulate measurement
+            start_time = self.clock.time()
+            for i in range(num_points):
+                # Calculate current time
+                current_time = i * sample_interval
+                
+                # Simulate voltage measurement (replace with actual measurement)
+                voltage = self._simulate_voltage_measurement(current_time, reference)
+                
+                sink.append(current_time, voltage)
+                if smoother:
+                    smoother.push(voltage)
+                
+                # Wait until next sample time
+                next_sample_time = start_time + (i + 1) * sample_interval
+                sleep_time = max(0, next_sample_time - self.clock.time())
+                if sleep_time > 0 and i < num_points - 1:
+                    self.clock.sleep(sleep_time)
+        
+        series = sink.read()
+        
+        results = {
+            "time": series["time"],
+            "voltage": series["voltage"],
+            "data_path": sink.directory,
             "parameters": {
                 "duration": duration,
                 "sample_interval": sample_interval,
@@ -98,6 +110,10 @@ class OCVBackend(BaseBackend):
             },
             "timestamp": datetime.now().isoformat()
         }
+        if smoother:
+            smoother.flush()
+            results["voltage_smooth"] = smoother.out
+        return results
     
     def _simulate_voltage_measurement(self, time_point: float, reference: Dict[str, Any]) -> float:
         """
@@ -9,12 +9,13 @@ and executes the corresponding experimental procedures.
 """
 
 import logging
-import time
 import numpy as np
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Tuple
 
 from backends.base import BaseBackend
+from backends.clock import Clock
+from utils.eis_fitting import CIRCUITS, fit_spectrum
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
@@ -31,15 +32,21 @@ class PEISBackend(BaseBackend):
     5. Data collection and storage
     """
     
-    def __init__(self, config_path: Optional[str] = None, result_uploader: Optional[Any] = None):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        result_uploader: Optional[Any] = None,
+        clock: Optional[Clock] = None
+    ):
         """
         Initialize the PEIS backend.
         
         Args:
             config_path (Optional[str]): Path to configuration file
             result_uploader (Optional[Any]): Result uploader instance
+            clock (Optional[Clock]): Clock used to pace sampling
         """
-        super().__init__(config_path, result_uploader, experiment_type="PEIS")
+        super().__init__(config_path, result_uploader, experiment_type="PEIS", clock=clock)
     
     def _execute_measurement(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -68,48 +75,56 @@ class PEISBackend(BaseBackend):
         frequencies = self._generate_frequency_points(params)
         self.logger.info(f"Frequency sweep from {frequencies[0]:.2f} Hz to {frequencies[-1]:.2f} Hz")
         
-        # Lists to store results
-        impedance_real = []
-        impedance_imag = []
-        phase_angles = []
+        # Arrays to store results
+        impedance_real = np.empty(len(frequencies))
+        impedance_imag = np.empty(len(frequencies))
         
         # Simulate measurement at each frequency
-        for freq in frequencies:
+        for i, freq in enumerate(frequencies):
             # Simulate measurement (replace with actual measurement code)
-            time.sleep(0.1)  # Simulate measurement time
+            self.clock.sleep(0.1)  # Simulate measurement time
             
             # Generate simulated impedance response
             # In real EIS, these would be measured values
-            z_real, z_imag = self._simulate_impedance_response(
+            impedance_real[i], impedance_imag[i] = self._simulate_impedance_response(
                 freq, dc_voltage, ac_amplitude, reference
             )
-            phase = np.arctan2(z_imag, z_real)  # Phase angle in radians
-            
-            impedance_real.append(z_real)
-            impedance_imag.append(z_imag)
-            phase_angles.append(phase)
+            self._emit_samples(
+                {"frequency": [freq], "impedance_real": [impedance_real[i]],
+                 "impedance_imag": [impedance_imag[i]]},
+                offset=i
+            )
             
-        # Calculate impedance magnitude
-        impedance_mag = [np.sqrt(r**2 + i**2) for r, i in zip(impedance_real, impedance_imag)]
+        # Magnitude and phase (degrees) of the whole spectrum at once
+        impedance_mag = np.hypot(impedance_real, impedance_imag)
+        phase_degrees = np.degrees(np.arctan2(impedance_imag, impedance_real))
         
-        # Convert phase to degrees
-        phase_degrees = [np.degrees(phase) for phase in phase_angles]
-        
-        return {
+        fit_circuit = params.get("fit_circuit")
+        results = {
             "frequencies": frequencies.tolist(),
-            "impedance_real": impedance_real,
-            "impedance_imag": impedance_imag,
-            "impedance_magnitude": impedance_mag,
-            "phase_angle": phase_degrees,
+            "impedance_real": impedance_real.tolist(),
+            "impedance_imag": impedance_imag.tolist(),
+            "impedance_magnitude": impedance_mag.tolist(),
+            "phase_angle": phase_degrees.tolist(),
             "parameters": {
                 "dc_voltage": dc_voltage,
                 "ac_amplitude": ac_amplitude,
                 "reference": reference,
                 "frequency_range": [frequencies[0], frequencies[-1]],
-                "points_per_decade": params.get("points_per_decade", 10)
+                "points_per_decade": params.get("points_per_decade", 10),
+                "fit_circuit": fit_circuit
             },
             "timestamp": datetime.now().isoformat()
         }
+        
+        # Fit an equivalent circuit if requested
+        if fit_circuit:
+            fit = fit_spectrum(frequencies, impedance_real + 1j * impedance_imag, fit_circuit)
+            self.logger.info(f"Fitted {fit_circuit} circuit: " + ", ".join(
+                f"{name}={fit[name]:.4g}" for name in CIRCUITS[fit_circuit]))
+            results["fit"] = fit
+        
+        return results
     
     def _generate_frequency_points(self, params: Dict[str, Any]) -> np.ndarray:
         """
@@ -189,6 +204,7 @@ class PEISBackend(BaseBackend):
         ac_amplitude = params.get("ac_amplitude")
         f_start = params.get("frequency_start")
         f_end = params.get("frequency_end")
+        fit_circuit = params.get("fit_circuit")
         
         if dc_voltage is not None and (dc_voltage < -2.0 or dc_voltage > 2.0):
             errors.append("DC voltage must be between -2.0V and 2.0V")
@@ -205,6 +221,9 @@ class PEISBackend(BaseBackend):
         if f_start is not None and f_end is not None and f_start >= f_end:
             errors.append("Start frequency must be less than end frequency")
             
+        if fit_circuit is not None and fit_circuit not in CIRCUITS:
+            errors.append(f"Fit circuit must be one of: {', '.join(CIRCUITS)}")
+            
         return errors
     
     def get_default_parameters(self) -> Dict[str, Any]:
@@ -224,7 +243,8 @@ class PEISBackend(BaseBackend):
             "reference": {
                 "type": "RE",
                 "enabled": True
-            }
+            },
+            "fit_circuit": None
         })
         return params
 
@@ -16,9 +16,13 @@ import os
 from abc import ABC, abstractmethod
 import sys
 import json
+import threading
 
 from parsing import parse_experiment_parameters
 from backends import BaseBackend, CVABackend, PEISBackend, OCVBackend, CPBackend, LSVBackend
+from backends.clock import Clock
+from utils.experiment_archive import ExperimentArchive
+from utils.result_store import save_results, to_json_compatible
 
 LOGGER = logging.getLogger(__name__)
 
@@ -40,10 +44,20 @@ class ResultUploader(ABC):
         pass
 
 class LocalResultUploader(ResultUploader):
-    """Save results to local filesystem."""
+    """
+    Save results to local filesystem.
+
+    Results go to <base_dir>/<experiment_id>/results.json. By default series
+    are stored as binary columns next to it (see utils.result_store); pass
+    result_format="json" to write them inline instead. Pass an
+    ExperimentArchive to index every saved result.
+    """
 
-    def __init__(self, base_dir: str = "results"):
+    def __init__(self, base_dir: str = "results", result_format: str = "columnar",
+                 archive: Optional[ExperimentArchive] = None):
         self.base_dir = base_dir
+        self.result_format = result_format
+        self.archive = archive
         os.makedirs(base_dir, exist_ok=True)
 
     def upload(self, results: Dict[str, Any], experiment_id: str) -> bool:
@@ -52,12 +66,18 @@ class LocalResultUploader(ResultUploader):
             exp_dir = os.path.join(self.base_dir, experiment_id)
             os.makedirs(exp_dir, exist_ok=True)
 
-            # Save results as JSON
+            # Save results
             result_path = os.path.join(exp_dir, "results.json")
-            with open(result_path, 'w') as f:
-                json.dump(results, f, indent=2)
+            save_results(results, result_path, result_format=self.result_format)
 
             LOGGER.info(f"Saved results to {result_path}")
+
+            # The results are saved even if indexing fails
+            if self.archive is not None:
+                try:
+                    self.archive.add_file(result_path)
+                except Exception as e:
+                    LOGGER.warning(f"Failed to index {result_path}: {str(e)}")
             return True
 
         except Exception as e:
@@ -77,7 +97,7 @@ class S3ResultUploader(ResultUploader):
     def upload(self, results: Dict[str, Any], experiment_id: str) -> bool:
         try:
             # Convert results to JSON string
-            results_json = json.dumps(results, indent=2)
+            results_json = json.dumps(to_json_compatible(results), indent=2)
 
             # Upload to S3
             key = f"{self.prefix}/{experiment_id}/results.json"
@@ -107,7 +127,8 @@ class ExperimentDispatcher:
     def __init__(
         self,
         config_path: Optional[str] = None,
-        result_uploader: Optional[ResultUploader] = None
+        result_uploader: Optional[ResultUploader] = None,
+        clock: Optional[Clock] = None
     ):
         """
         Initialize the experiment dispatcher.
@@ -115,9 +136,14 @@ class ExperimentDispatcher:
         Args:
             config_path: Path to global configuration file
             result_uploader: Optional result uploader instance
+            clock: Optional clock shared by all backends, e.g. a VirtualClock
+                to replay experiments without waiting in real time
         """
         self.config_path = config_path
+        self.clock = clock
         self.backend_instances = {}
+        # Experiments may be executed from several worker threads at once
+        self._backend_lock = threading.Lock()
         self.result_uploader = result_uploader or LocalResultUploader()
 
     def _generate_experiment_id(self, uo_type: str) -> str:
@@ -159,19 +185,21 @@ class ExperimentDispatcher:
         if uo_type not in backend_classes:
             raise ValueError(f"Unknown experiment type: {uo_type}")
 
-        if uo_type not in self.backend_instances:
-            try:
-                backend_class = backend_classes[uo_type]
-                self.backend_instances[uo_type] = backend_class(
-                    config_path=self.config_path,
-                    result_uploader=self.result_uploader
-                )
-                LOGGER.info(f"Created new {uo_type} backend instance")
-            except Exception as e:
-                LOGGER.error(f"Failed to create backend for {uo_type}: {str(e)}")
-                raise ValueError(f"Failed to create backend for {uo_type}: {str(e)}")
+        with self._backend_lock:
+            if uo_type not in self.backend_instances:
+                try:
+                    backend_class = backend_classes[uo_type]
+                    self.backend_instances[uo_type] = backend_class(
+                        config_path=self.config_path,
+                        result_uploader=self.result_uploader,
+                        clock=self.clock
+                    )
+                    LOGGER.info(f"Created new {uo_type} backend instance")
+                except Exception as e:
+                    LOGGER.error(f"Failed to create backend for {uo_type}: {str(e)}")
+                    raise ValueError(f"Failed to create backend for {uo_type}: {str(e)}")
 
-        return self.backend_instances[uo_type]
+            return self.backend_instances[uo_type]
 
     def execute_experiment(self, uo: Dict[str, Any]) -> Dict[str, Any]:
         """
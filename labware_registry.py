@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Labware Registry
+
+This module parses custom labware definitions (labware/<load_name>.json) once
+and keeps them in memory, keyed by the SHA-256 of the file contents. Files are
+only re-read when their size or modification time changes, and identical
+definitions share one parsed object.
+
+A DeckLayout places definitions in deck slots and indexes the absolute
+position of every well, so wells can be validated and distances estimated
+without asking the robot.
+
+Coordinates are in mm in the OT-2 deck frame: x to the right, y towards the
+back of the robot, z up from the deck surface.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+# Front-left corner of each OT-2 deck slot (ot2_standard deck definition)
+SLOT_ORIGINS: Dict[int, Tuple[float, float, float]] = {
+    1: (0.0, 0.0, 0.0), 2: (132.5, 0.0, 0.0), 3: (265.0, 0.0, 0.0),
+    4: (0.0, 90.5, 0.0), 5: (132.5, 90.5, 0.0), 6: (265.0, 90.5, 0.0),
+    7: (0.0, 181.0, 0.0), 8: (132.5, 181.0, 0.0), 9: (265.0, 181.0, 0.0),
+    10: (0.0, 271.5, 0.0), 11: (132.5, 271.5, 0.0), 12: (265.0, 271.5, 0.0),
+}
+
+# Well origins accepted by the OT-2 HTTP API
+WELL_ORIGINS = ("bottom", "center", "top")
+
+# Standard Opentrons 96 tip racks: (well depth, z of the well bottom) in mm
+STANDARD_TIPRACKS: Dict[str, Tuple[float, float]] = {
+    "opentrons_96_tiprack_10ul": (39.2, 25.49),
+    "opentrons_96_tiprack_20ul": (39.2, 25.49),
+    "opentrons_96_tiprack_300ul": (59.3, 5.39),
+    "opentrons_96_tiprack_1000ul": (88.0, 9.47),
+}
+
+
+class LabwareError(ValueError):
+    """Raised for unknown labware, slots or wells."""
+    pass
+
+
+class LabwareDefinition:
+    """
+    Parsed labware definition.
+
+    Well positions are stored as one array, relative to the labware's
+    front-left corner, in the order of the definition's "ordering" (A1, B1, ...).
+    """
+
+    def __init__(self, definition: Dict[str, Any], content_hash: str):
+        """
+        Parse a labware definition.
+
+        Args:
+            definition: Labware definition in the Opentrons JSON schema
+            content_hash: SHA-256 of the definition file
+        """
+        self.definition = definition
+        self.content_hash = content_hash
+        self.load_name = definition.get("parameters", {}).get("loadName")
+        self.is_tiprack = bool(definition.get("parameters", {}).get("isTiprack", False))
+
+        wells = definition.get("wells", {})
+        ordering = [name for column in definition.get("ordering", []) for name in column]
+        # Definitions without an ordering still list every well
+        self.well_names: List[str] = ordering or list(wells)
+        self.well_index: Dict[str, int] = {name: i for i, name in enumerate(self.well_names)}
+
+        corner = definition.get("cornerOffsetFromSlot", {})
+        self.corner_offset = np.array([corner.get(axis, 0.0) for axis in "xyz"], dtype=float)
+        self.positions = np.array(
+            [[wells[name]["x"], wells[name]["y"], wells[name]["z"]] for name in self.well_names],
+            dtype=float
+        ).reshape(-1, 3)
+        self.depths = np.array([wells[name].get("depth", 0.0) for name in self.well_names], dtype=float)
+
+    def has_well(self, well: str) -> bool:
+        """Check whether the labware has a well, e.g. "A1"."""
+        return well in self.well_index
+
+
+class DeckLayout:
+    """
+    Labware placed in deck slots, with the absolute position of every well.
+    """
+
+    def __init__(self):
+        """Initialize an empty deck."""
+        self.slots: Dict[int, LabwareDefinition] = {}
+        self.names: Dict[str, int] = {}
+        self._bottoms: Dict[int, np.ndarray] = {}
+
+    def place(self, slot: int, labware: LabwareDefinition, name: Optional[str] = None) -> None:
+        """
+        Put labware in a slot and index its wells.
+
+        Args:
+            slot: Deck slot, 1 to 12
+            labware: Parsed definition
+            name: Name the workflow uses for this labware, e.g. "reactor_plate"
+
+        Raises:
+            LabwareError: If the slot doesn't exist
+        """
+        slot = int(slot)
+        if slot not in SLOT_ORIGINS:
+            raise LabwareError(f"Unknown deck slot: {slot}")
+
+        self.slots[slot] = labware
+        if name is not None:
+            self.names[name] = slot
+        # Absolute position of the bottom of each well
+        self._bottoms[slot] = np.asarray(SLOT_ORIGINS[slot]) + labware.corner_offset + labware.positions
+
+    def _slot_for(self, labware: Any) -> int:
+        """Resolve a workflow labware name or a slot number."""
+        if labware in self.names:
+            return self.names[labware]
+        if isinstance(labware, int) and labware in self.slots:
+            return labware
+        raise LabwareError(f"No labware {labware} on the deck")
+
+    def has_labware(self, labware: Any) -> bool:
+        """Check whether a labware name or slot is on the deck."""
+        return labware in self.names or (isinstance(labware, int) and labware in self.slots)
+
+    def definition(self, labware: Any) -> LabwareDefinition:
+        """Get the definition of labware on the deck."""
+        return self.slots[self._slot_for(labware)]
+
+    def slot_of(self, labware: Any) -> int:
+        """Get the slot of labware on the deck."""
+        return self._slot_for(labware)
+
+    def has_well(self, labware: Any, well: str) -> bool:
+        """Check whether labware on the deck has a well."""
+        return self.slots[self._slot_for(labware)].has_well(well)
+
+    def well_position(self, labware: Any, well: str, origin: str = "top",
+                      offset: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Get the absolute position of a well.
+
+        Args:
+            labware: Workflow labware name or slot number
+            well: Well name, e.g. "A1"
+            origin: "bottom", "center" or "top" of the well
+            offset: Optional {"x", "y", "z"} offset from the origin
+
+        Returns:
+            np.ndarray: Position (x, y, z) in mm
+
+        Raises:
+            LabwareError: For unknown labware, wells or origins
+        """
+        slot = self._slot_for(labware)
+        definition = self.slots[slot]
+        if well not in definition.well_index:
+            raise LabwareError(f"Labware {labware} ({definition.load_name}) has no well {well}")
+        if origin not in WELL_ORIGINS:
+            raise LabwareError(f"Unknown well origin: {origin}")
+
+        index = definition.well_index[well]
+        position = self._bottoms[slot][index].copy()
+        position[2] += definition.depths[index] * WELL_ORIGINS.index(origin) / 2
+        if offset:
+            position += [offset.get("x", 0.0), offset.get("y", 0.0), offset.get("z", 0.0)]
+        return position
+
+    def well_positions(self, labware: Any, origin: str = "top") -> Dict[str, np.ndarray]:
+        """
+        Get the absolute position of every well of a labware.
+
+        Args:
+            labware: Workflow labware name or slot number
+            origin: "bottom", "center" or "top" of the wells
+
+        Returns:
+            Dict[str, np.ndarray]: Position (x, y, z) in mm by well name
+        """
+        slot = self._slot_for(labware)
+        definition = self.slots[slot]
+        return {well: self.well_position(slot, well, origin) for well in definition.well_names}
+
+
+class LabwareRegistry:
+    """
+    Cache of custom labware definitions read from a directory.
+    """
+
+    def __init__(self, labware_dir: str = "labware"):
+        """
+        Initialize the registry.
+
+        Args:
+            labware_dir: Directory holding <load_name>.json definitions
+        """
+        self.labware_dir = labware_dir
+        self._lock = threading.Lock()
+        # content hash -> parsed definition
+        self._definitions: Dict[str, LabwareDefinition] = {}
+        # file path -> (mtime_ns, size, content hash)
+        self._files: Dict[str, Tuple[int, int, str]] = {}
+
+    def path_for(self, load_name: str) -> str:
+        """Get the definition file of a labware type."""
+        return os.path.join(self.labware_dir, f"{load_name}.json")
+
+    def has(self, load_name: str) -> bool:
+        """Check whether a definition file exists for a labware type."""
+        return os.path.exists(self.path_for(load_name))
+
+    def load(self, load_name: str) -> LabwareDefinition:
+        """
+        Get a labware definition, reading its file only if it changed.
+
+        Args:
+            load_name: Labware type, e.g. "nis_15_wellplate_3895ul"
+
+        Returns:
+            LabwareDefinition: Parsed definition
+
+        Raises:
+            LabwareError: If no definition file exists
+        """
+        path = self.path_for(load_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise LabwareError(f"No labware definition for {load_name} at {path}")
+
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return self._definitions[cached[2]]
+
+            with open(path, "rb") as f:
+                content = f.read()
+            content_hash = hashlib.sha256(content).hexdigest()
+            self._files[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+
+            if content_hash not in self._definitions:
+                LOGGER.info(f"Parsed labware definition {load_name} ({content_hash[:12]})")
+                self._definitions[content_hash] = LabwareDefinition(json.loads(content), content_hash)
+            return self._definitions[content_hash]
+
+
+def standard_tiprack_definition(load_name: str) -> Optional[LabwareDefinition]:
+    """
+    Build the geometry of a standard Opentrons 96 tip rack.
+
+    Standard labware lives on the robot, so there is no local file to read.
+    The racks share one 8 x 12 grid with a 9 mm pitch.
+
+    Args:
+        load_name: Labware type, e.g. "opentrons_96_tiprack_1000ul"
+
+    Returns:
+        Optional[LabwareDefinition]: The rack, or None if it isn't a known tip rack
+    """
+    if load_name not in STANDARD_TIPRACKS:
+        return None
+
+    depth, bottom = STANDARD_TIPRACKS[load_name]
+    rows = "ABCDEFGH"
+    wells = {
+        f"{row}{column}": {"x": 14.38 + 9 * (column - 1), "y": 74.38 - 9 * i,
+                           "z": bottom, "depth": depth}
+        for i, row in enumerate(rows) for column in range(1, 13)
+    }
+    definition = {
+        "ordering": [[f"{row}{column}" for row in rows] for column in range(1, 13)],
+        "wells": wells,
+        "parameters": {"loadName": load_name, "isTiprack": True},
+        "cornerOffsetFromSlot": {"x": 0, "y": 0, "z": 0},
+    }
+    content = json.dumps(definition, sort_keys=True).encode()
+    return LabwareDefinition(definition, hashlib.sha256(content).hexdigest())
+
+
+_shared_registries: Dict[str, LabwareRegistry] = {}
+_shared_lock = threading.Lock()
+
+
+def get_registry(labware_dir: str = "labware") -> LabwareRegistry:
+    """
+    Get the registry shared by everything in the process that reads a directory.
+
+    Args:
+        labware_dir: Directory holding <load_name>.json definitions
+
+    Returns:
+        LabwareRegistry: Shared registry
+    """
+    key = os.path.abspath(labware_dir)
+    with _shared_lock:
+        registry = _shared_registries.get(key)
+        if registry is None:
+            registry = LabwareRegistry(labware_dir)
+            _shared_registries[key] = registry
+        return registry
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motion Planner
+
+This module estimates how long the OT-2 gantry spends travelling through a
+list of ot2_actions and can reorder well visits to shorten that time.
+
+A visit is a move (move_to, pick_up_tip, drop_tip) together with the
+stationary actions that follow it, such as a wash at that well. Only
+consecutive move_to visits marked "reorderable": true with the same speed are
+reordered. Tip changes, homing, unmarked moves and moves whose position is
+unknown keep their place and bound the reorderable runs. Each run is ordered
+with a nearest-neighbour tour improved by 2-opt, starting where the gantry
+was and ending next to the visit that follows the run.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+# Speed WorkflowExecutor sends with moves that don't set "speed"
+DEFAULT_SPEED = 100.0  # mm/s
+
+# Actions that move the gantry to a well
+MOVE_ACTIONS = ("move_to", "pick_up_tip", "drop_tip")
+
+Position = Optional[np.ndarray]
+
+
+class GantryModel:
+    """
+    Travel-time model of the OT-2 gantry.
+
+    A move between wells lifts to a safe height above the higher of the two
+    points, travels in a straight line in x/y and lowers onto the target. A
+    move within the same x/y position only travels in z.
+    """
+
+    def __init__(self, z_speed: float = 125.0, clearance: float = 10.0, overhead: float = 0.05):
+        """
+        Initialize the model.
+
+        Args:
+            z_speed: Maximum speed of the z axis (mm/s)
+            clearance: Height of the travel arc above the higher endpoint (mm)
+            overhead: Fixed time per move for acceleration and settling (s)
+        """
+        self.z_speed = z_speed
+        self.clearance = clearance
+        self.overhead = overhead
+
+    def travel_times(self, start: np.ndarray, end: np.ndarray, speed: float = DEFAULT_SPEED) -> np.ndarray:
+        """
+        Estimate travel times between arrays of positions.
+
+        Args:
+            start: Start positions, shape (..., 3) in mm
+            end: End positions, broadcastable against start
+            speed: Gantry speed requested for the move (mm/s)
+
+        Returns:
+            np.ndarray: Travel times in s
+        """
+        start = np.asarray(start, dtype=float)
+        end = np.asarray(end, dtype=float)
+        horizontal = np.hypot(end[..., 0] - start[..., 0], end[..., 1] - start[..., 1])
+        safe_height = np.maximum(start[..., 2], end[..., 2]) + self.clearance
+        vertical = np.where(
+            horizontal > 0,
+            2 * safe_height - start[..., 2] - end[..., 2],
+            np.abs(end[..., 2] - start[..., 2])
+        )
+        return horizontal / speed + vertical / min(speed, self.z_speed) + self.overhead
+
+    def travel_time(self, start: np.ndarray, end: np.ndarray, speed: float = DEFAULT_SPEED) -> float:
+        """Estimate the travel time of one move in s."""
+        return float(self.travel_times(start, end, speed))
+
+
+def plan_route(cost: np.ndarray) -> List[int]:
+    """
+    Order the inner points of an open path to minimise its cost.
+
+    Args:
+        cost: Symmetric cost matrix. Row 0 is the fixed start and the last row
+            the fixed end; a free endpoint has zero cost to every point
+
+    Returns:
+        List[int]: Indices of the inner points (1 .. n-2) in visiting order
+    """
+    end = len(cost) - 1
+    inner = list(range(1, end))
+    if len(inner) < 2:
+        return inner
+
+    def route_cost(route: List[int]) -> float:
+        path = [0] + route + [end]
+        return float(cost[path[:-1], path[1:]].sum())
+
+    # Nearest neighbour from the start
+    greedy = []
+    remaining = set(inner)
+    current = 0
+    while remaining:
+        current = min(remaining, key=lambda point: (cost[current, point], point))
+        greedy.append(current)
+        remaining.remove(current)
+
+    # Improve the better of the original and greedy routes with 2-opt
+    path = [0] + min((inner, greedy), key=route_cost) + [end]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, end - 1):
+            for j in range(i + 1, end):
+                a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                if cost[a, c] + cost[b, d] < cost[a, b] + cost[c, d] - 1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+    return path[1:-1]
+
+
+class MotionPlanner:
+    """
+    Travel-time estimator and visit-order optimiser for ot2_actions.
+    """
+
+    def __init__(self, position: Callable[[Dict[str, Any]], Position], model: Optional[GantryModel] = None):
+        """
+        Initialize the planner.
+
+        Args:
+            position: Returns the absolute target of a move action, or None if unknown
+            model: Gantry travel-time model
+        """
+        self.position = position
+        self.model = model or GantryModel()
+
+    def _visits(self, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group actions into visits: a move and the stationary actions after it."""
+        visits = []
+        for action in actions:
+            action_type = action.get("action")
+            if action_type in MOVE_ACTIONS or action_type == "home" or not visits:
+                moves = action_type in MOVE_ACTIONS
+                position = self.position(action) if moves else None
+                visits.append({
+                    "actions": [action],
+                    "moves": moves or action_type == "home",
+                    "position": position,
+                    "speed": float(action.get("speed", DEFAULT_SPEED)),
+                    "reorderable": (action_type == "move_to" and bool(action.get("reorderable"))
+                                    and position is not None)
+                })
+            else:
+                visits[-1]["actions"].append(action)
+        return visits
+
+    def _walk(self, visits: List[Dict[str, Any]], start: Position) -> Tuple[float, Position]:
+        """Sum the travel time of visits; moves from an unknown position count as 0."""
+        total = 0.0
+        current = start
+        for visit in visits:
+            if not visit["moves"]:
+                continue
+            if current is not None and visit["position"] is not None:
+                total += self.model.travel_time(current, visit["position"], visit["speed"])
+            current = visit["position"]
+        return total, current
+
+    def estimate(self, actions: List[Dict[str, Any]], start: Position = None) -> Tuple[float, Position]:
+        """
+        Estimate the gantry travel time of a list of actions.
+
+        Args:
+            actions: ot2_actions in execution order
+            start: Gantry position before the first action, if known
+
+        Returns:
+            Tuple[float, Position]: Travel time in s and the final gantry position
+        """
+        return self._walk(self._visits(actions), start)
+
+    def optimize(self, actions: List[Dict[str, Any]], start: Position = None) -> List[Dict[str, Any]]:
+        """
+        Reorder the reorderable visits of a list of actions.
+
+        Args:
+            actions: ot2_actions in execution order
+            start: Gantry position before the first action, if known
+
+        Returns:
+            List[Dict[str, Any]]: The same actions, never slower than the input order
+        """
+        visits = self._visits(actions)
+        planned = []
+        current = start
+        i = 0
+        while i < len(visits):
+            run_end = i
+            while (run_end < len(visits) and visits[run_end]["reorderable"]
+                   and visits[run_end]["speed"] == visits[i]["speed"]):
+                run_end += 1
+
+            if run_end - i < 2:
+                planned.append(visits[i])
+                if visits[i]["moves"]:
+                    current = visits[i]["position"]
+                i += 1
+                continue
+
+            run = visits[i:run_end]
+            following = visits[run_end]["position"] if run_end < len(visits) else None
+            points = np.array([visit["position"] for visit in run])
+            speed = run[0]["speed"]
+
+            # Fixed start and end as extra rows; unknown ends cost nothing
+            cost = np.zeros((len(run) + 2, len(run) + 2))
+            cost[1:-1, 1:-1] = self.model.travel_times(points[:, None, :], points[None, :, :], speed)
+            if current is not None:
+                cost[0, 1:-1] = cost[1:-1, 0] = self.model.travel_times(current, points, speed)
+            if following is not None:
+                cost[-1, 1:-1] = cost[1:-1, -1] = self.model.travel_times(points, following, speed)
+
+            planned.extend(run[index - 1] for index in plan_route(cost))
+            current = planned[-1]["position"]
+            i = run_end
+
+        if self._walk(planned, start)[0] >= self._walk(visits, start)[0]:
+            return list(actions)
+        return [action for visit in planned for action in visit["actions"]]
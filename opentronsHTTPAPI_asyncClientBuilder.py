@@ -0,0 +1,820 @@
+import aiohttp
+import asyncio
+import json
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+# pooled sessions, one per robot and event loop, shared by every client that talks to that robot
+_dicSharedSessions = {}
+
+def getSharedSession(strRobotIP: str,
+                     intMaxConnections: int = 4):
+    '''
+    gets the pooled keep-alive session for a robot on the running event loop, creating it on first use
+
+    arguments
+    ----------
+    strRobotIP: str
+        the IP address of the robot
+
+    intMaxConnections: int
+        the maximum number of open connections kept to the robot
+        only used when the session is first created
+        default: 4
+
+    returns
+    ----------
+    session: aiohttp.ClientSession
+        the session shared by all clients of this robot on this loop
+    '''
+
+    loop = asyncio.get_running_loop()
+    session = _dicSharedSessions.get((loop, strRobotIP))
+    if session is None or session.closed:
+        session = makeSession(intMaxConnections = intMaxConnections)
+        _dicSharedSessions[(loop, strRobotIP)] = session
+
+        # LOG - info
+        LOGGER.info(f"Created pooled async session for robot: {strRobotIP} (max connections: {intMaxConnections})")
+
+    return session
+
+def makeSession(intMaxConnections: int = 4):
+    '''
+    makes a keep-alive session with a bounded connection pool
+
+    arguments
+    ----------
+    intMaxConnections: int
+        the maximum number of open connections kept to a host
+        default: 4
+
+    returns
+    ----------
+    session: aiohttp.ClientSession
+        the new session
+    '''
+
+    connector = aiohttp.TCPConnector(limit_per_host = intMaxConnections)
+    return aiohttp.ClientSession(connector = connector)
+
+async def closeSharedSessions():
+    '''
+    closes every shared robot session of the running event loop
+
+    arguments
+    ----------
+    None
+
+    returns
+    ----------
+    None
+    '''
+
+    loop = asyncio.get_running_loop()
+    for tupKey in [tupKey for tupKey in _dicSharedSessions if tupKey[0] is loop]:
+        session = _dicSharedSessions.pop(tupKey)
+        await session.close()
+        # LOG - info
+        LOGGER.info(f"Closed pooled async session for robot: {tupKey[1]}")
+
+class AsyncOpentronsClient:
+    '''
+    awaitable twin of opentronsClient - each object will represent a single experiment
+
+    the run is created by awaiting AsyncOpentronsClient.create(...) or by entering
+    the client with "async with"
+    '''
+
+    def __init__(self,
+                 strRobotIP: str,
+                 dicHeaders: dict = {"opentrons-version": "3"},
+                 intMaxConnections: int = 4,
+                 fltConnectTimeout: float = 5.0,
+                 fltReadTimeout: float = 300.0,
+                 boolSharedSession: bool = True,):
+        '''
+        initializes the object with the robot IP and headers
+
+        arguments
+        ----------
+        strRobotIP: str
+            the IP address of the robot
+
+        dicHeaders: dict
+            the headers to be used in the requests
+
+        intMaxConnections: int
+            the maximum number of keep-alive connections to the robot
+            default: 4
+
+        fltConnectTimeout: float
+            the time to wait for a connection to the robot
+            units: s
+            default: 5.0
+
+        fltReadTimeout: float
+            the time to wait for the robot to answer a request
+            commands are sent with waitUntilComplete so this must cover the longest move
+            units: s
+            default: 300.0
+
+        boolSharedSession: bool
+            whether to share the connection pool with other clients of the same robot
+            default: True
+
+        returns
+        ----------
+        None
+        '''
+        self.robotIP = strRobotIP
+        self.headers = dicHeaders
+        self.timeout = aiohttp.ClientTimeout(sock_connect = fltConnectTimeout,
+                                             sock_read = fltReadTimeout)
+        self.maxConnections = intMaxConnections
+        self.sharedSession = boolSharedSession
+        self.session = None
+        self.runID = None
+        self.commandURL = None
+
+        self.labware = {}
+        self.pipettes = {}
+
+    @classmethod
+    async def create(cls,
+                     strRobotIP: str,
+                     **kwargs):
+        '''
+        creates a client and a new blank run on the opentrons
+
+        arguments
+        ----------
+        strRobotIP: str
+            the IP address of the robot
+
+        **kwargs
+            passed on to the constructor
+
+        returns
+        ----------
+        client: AsyncOpentronsClient
+            the client with its run initialized
+        '''
+        client = cls(strRobotIP, **kwargs)
+        await client._initalizeRun()
+        return client
+
+    async def __aenter__(self):
+        await self._initalizeRun()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        '''
+        closes the session if it is not shared with other clients
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        None
+        '''
+        if self.session is not None and not self.sharedSession:
+            await self.session.close()
+        self.session = None
+
+    def _getSession(self):
+        if self.session is None or self.session.closed:
+            if self.sharedSession:
+                self.session = getSharedSession(strRobotIP = self.robotIP,
+                                                intMaxConnections = self.maxConnections)
+            else:
+                self.session = makeSession(intMaxConnections = self.maxConnections)
+        return self.session
+
+    async def _request(self,
+                       strMethod: str,
+                       strURL: str,
+                       strData: str = None,
+                       dicParams: dict = None):
+        '''
+        sends a request to the robot
+
+        arguments
+        ----------
+        strMethod: str
+            the HTTP method
+
+        strURL: str
+            the URL of the request
+
+        strData: str
+            the body of the request
+            default: None
+
+        dicParams: dict
+            the query parameters of the request
+            default: None
+
+        returns
+        ----------
+        intStatus: int
+            the HTTP status code
+
+        strText: str
+            the body of the response
+        '''
+        async with self._getSession().request(strMethod,
+                                              strURL,
+                                              headers = self.headers,
+                                              params = dicParams,
+                                              data = strData,
+                                              timeout = self.timeout) as response:
+            strText = await response.text()
+
+        # LOG - debug
+        LOGGER.debug(f"Response: {strText}")
+
+        return response.status, strText
+
+    async def _initalizeRun(self):
+        '''
+        creates a new blank run on the opentrons with command endpoints
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        None
+        '''
+
+        strRunURL = f"http://{self.robotIP}:31950/runs"
+        # create a new run
+        intStatus, strText = await self._request("POST", strRunURL)
+
+        if intStatus == 201:
+            dicResponse = json.loads(strText)
+            # get the run ID
+            self.runID = dicResponse['data']['id']
+            # setup command endpoints
+            self.commandURL = strRunURL + f"/{self.runID}/commands"
+
+            # LOG - info
+            LOGGER.info(f"New run created with ID: {self.runID}")
+            LOGGER.info(f"Command URL: {self.commandURL}")
+
+        else:
+            raise Exception(f"Failed to create a new run.\nError code: {intStatus}\n Error message: {strText}")
+
+    async def _postCommand(self,
+                           dicCommand: dict,
+                           strAction: str,
+                           strSuccessMessage: str = None):
+        '''
+        posts a command to the run, waits for it to complete and checks the response
+
+        arguments
+        ----------
+        dicCommand: dict
+            the command to be posted
+
+        strAction: str
+            the action used in log and error messages
+
+        strSuccessMessage: str
+            the message logged once the command succeeds
+            default: None
+
+        returns
+        ----------
+        dicData: dict
+            the command data
+        '''
+
+        strCommand = json.dumps(dicCommand)
+
+        # LOG - debug
+        LOGGER.debug(f"Command: {strCommand}")
+
+        intStatus, strText = await self._request("POST",
+                                                 self.commandURL,
+                                                 strData = strCommand,
+                                                 dicParams = {"waitUntilComplete": "true"})
+
+        if intStatus != 201:
+            raise Exception(f"Failed to {strAction}.\nError code: {intStatus}\n Error message: {strText}")
+
+        dicData = json.loads(strText)['data']
+        if dicData['status'] == "failed":
+            error_info = dicData.get('error', dicData)
+            # log the error
+            LOGGER.error(f"Failed to {strAction}.\nResponse error: {error_info}")
+            # raise exception
+            raise Exception(f"Failed to {strAction}.\nResponse error: {error_info}")
+
+        # LOG - info
+        if strSuccessMessage:
+            LOGGER.info(strSuccessMessage)
+
+        return dicData
+
+    def _wellLocation(self,
+                      strOffsetStart: str,
+                      fltOffsetX: float,
+                      fltOffsetY: float,
+                      fltOffsetZ: float):
+        return {
+            "origin": strOffsetStart,
+            "offset": {"x": fltOffsetX,
+                       "y": fltOffsetY,
+                       "z": fltOffsetZ}
+        }
+
+    async def getRunInfo(self):
+        '''
+        gets the information for the current run
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        dicRunInfo: dict
+            the information for the current run
+        '''
+
+        # LOG - info
+        LOGGER.info(f"Getting information for run: {self.runID}")
+
+        intStatus, strText = await self._request("GET", f"http://{self.robotIP}:31950/runs/{self.runID}")
+
+        if intStatus != 200:
+            raise Exception(f"Failed to get run information.\nError code: {intStatus}\n Error message: {strText}")
+
+        # LOG - info
+        LOGGER.info("Run information retrieved.")
+
+        return json.loads(strText)
+
+    async def loadLabware(self,
+                          intSlot: int,
+                          strLabwareName: str,
+                          strNamespace: str = "opentrons",
+                          intVersion: int = 1,
+                          strIntent: str = "setup"):
+        '''
+        loads labware onto the robot - see opentronsClient.loadLabware
+
+        returns
+        ----------
+        strLabwareIdentifier_temp: str
+            the identifier of the labware that was loaded
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "loadLabware",
+                "params": {
+                    "location": {"slotName": str(intSlot)},
+                    "loadName": strLabwareName,
+                    "namespace": strNamespace,
+                    "version": str(intVersion)
+                },
+                "intent": strIntent
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Loading labware: {strLabwareName} in slot: {intSlot}")
+
+        dicData = await self._postCommand(dicCommand = dicCommand,
+                                          strAction = "load labware")
+
+        strLabwareID = dicData['result']['labwareId']
+        strLabwareIdentifier_temp = strLabwareName + "_" + str(intSlot)
+        self.labware[strLabwareIdentifier_temp] = {"id": strLabwareID, "slot": intSlot}
+        # LOG - info
+        LOGGER.info(f"Labware loaded with name: {strLabwareName} and ID: {strLabwareID}")
+
+        return strLabwareIdentifier_temp
+
+    async def loadCustomLabware(self,
+                                dicLabware: dict,
+                                intSlot: int,
+                                ):
+        '''
+        loads custom labware onto the robot - see opentronsClient.loadCustomLabware
+
+        returns
+        ----------
+        strLabwareIdentifier_temp: str
+            the identifier of the labware that was loaded
+        '''
+
+        strCommand = json.dumps({'data' : dicLabware})
+
+        # LOG - info
+        LOGGER.info(f"Loading custom labware: {dicLabware['parameters']['loadName']} in slot: {intSlot}")
+
+        intStatus, strText = await self._request("POST",
+                                                 f"http://{self.robotIP}:31950/runs/{self.runID}/labware_definitions",
+                                                 strData = strCommand)
+
+        if intStatus != 201:
+            raise Exception(f"Failed to load custom labware.\nError code: {intStatus}\n Error message: {strText}")
+
+        dicData = json.loads(strText)['data']
+        if dicData.get('status') == "failed":
+            error_info = dicData.get('error', dicData)
+            LOGGER.error(f"Failed to load custom labware.\nResponse error: {error_info}")
+            raise Exception(f"Failed to load custom labware.\nResponse error: {error_info}")
+
+        # LOG - info
+        LOGGER.info(f"Custom labware {dicLabware['parameters']['loadName']} loaded in slot: {intSlot} successfully.")
+
+        return await self.loadLabware(intSlot = intSlot,
+                                      strLabwareName = dicLabware['parameters']['loadName'],
+                                      strNamespace = dicLabware['namespace'],
+                                      intVersion = dicLabware['version'],
+                                      strIntent = "setup")
+
+    async def loadPipette(self,
+                          strPipetteName: str,
+                          strMount: str):
+        '''
+        loads a pipette onto the robot - see opentronsClient.loadPipette
+
+        returns
+        ----------
+        None
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "loadPipette",
+                "params": {
+                    "pipetteName": strPipetteName,
+                    "mount": strMount
+                },
+                "intent": "setup"
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Loading pipette: {strPipetteName} on mount: {strMount}")
+
+        dicData = await self._postCommand(dicCommand = dicCommand,
+                                          strAction = "load pipette")
+
+        strPipetteID = dicData['result']['pipetteId']
+        self.pipettes[strPipetteName] = {"id": strPipetteID, "mount": strMount}
+        # LOG - info
+        LOGGER.info(f"Pipette loaded with name: {strPipetteName} and ID: {strPipetteID}")
+
+    async def homeRobot(self):
+        '''
+        homes the robot
+
+        returns
+        ----------
+        None
+        '''
+
+        # LOG - info
+        LOGGER.info("Homing the robot")
+
+        intStatus, strText = await self._request("POST",
+                                                 f"http://{self.robotIP}:31950/robot/home",
+                                                 strData = json.dumps({"target": "robot"}))
+
+        if intStatus != 200:
+            raise Exception(f"Failed to home the robot.\nError code: {intStatus}\n Error message: {strText}")
+
+        # LOG - info
+        LOGGER.info("Robot homed successfully.")
+
+    async def pickUpTip(self,
+                        strLabwareName: str,
+                        strPipetteName: str,
+                        strOffsetStart: str = "top",
+                        fltOffsetX: float = 0,
+                        fltOffsetY: float = 0,
+                        fltOffsetZ: float = 0,
+                        strWellName: str = "A1",
+                        strIntent: str = "setup"
+                        ):
+        '''
+        picks up a tip from a labware - see opentronsClient.pickUpTip
+
+        returns
+        ----------
+        dicData: dict
+            the completed command
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "pickUpTip",
+                "params": {
+                    "labwareId": self.labware[strLabwareName]["id"],
+                    "wellName": strWellName,
+                    "wellLocation": self._wellLocation(strOffsetStart, fltOffsetX, fltOffsetY, fltOffsetZ),
+                    "pipetteId": self.pipettes[strPipetteName]["id"],
+                },
+                "intent": strIntent
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Picking up tip from labware: {strLabwareName}")
+
+        return await self._postCommand(dicCommand = dicCommand,
+                                       strAction = "pick up tip",
+                                       strSuccessMessage = f"Tip picked up from labware: {strLabwareName}, well: {strWellName}")
+
+    async def dropTip(self,
+                      strPipetteName: str,
+                      strLabwareName: str,
+                      strWellName: str = "A1",
+                      strOffsetStart: str = "center",
+                      fltOffsetX: float = 0,
+                      fltOffsetY: float = 0,
+                      fltOffsetZ: float = 0,
+                      boolHomeAfter: bool = False,
+                      boolAlternateDropLocation: bool = False,
+                      strIntent: str = "setup",
+                      ):
+        '''
+        drops a tip into a labware - see opentronsClient.dropTip
+
+        returns
+        ----------
+        dicData: dict
+            the completed command
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "dropTip",
+                "params": {
+                    "pipetteId": self.pipettes[strPipetteName]["id"],
+                    "labwareId": self.labware[strLabwareName]["id"],
+                    "wellName": strWellName,
+                    "wellLocation": self._wellLocation(strOffsetStart, fltOffsetX, fltOffsetY, fltOffsetZ),
+                    "homeAfter": boolHomeAfter,
+                    "alternateDropLocation": boolAlternateDropLocation
+                },
+                "intent": strIntent
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Dropping tip into labware: {strLabwareName}")
+
+        return await self._postCommand(dicCommand = dicCommand,
+                                       strAction = "drop tip",
+                                       strSuccessMessage = f"Tip dropped into labware: {strLabwareName}, well: {strWellName}")
+
+    async def aspirate(self,
+                       strLabwareName: str,
+                       strWellName: str,
+                       strPipetteName: str,
+                       intVolume: int,                        # uL
+                       fltFlowRate: float = 274.7,            # uL/s -- need to check this
+                       strOffsetStart: str = "center",
+                       fltOffsetX: float = 0,
+                       fltOffsetY: float = 0,
+                       fltOffsetZ: float = 0,
+                       strIntent: str = "setup"
+                       ):
+        '''
+        aspirates liquid from a well - see opentronsClient.aspirate
+
+        returns
+        ----------
+        dicData: dict
+            the completed command
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "aspirate",
+                "params": {
+                    "labwareId": self.labware[strLabwareName]["id"],
+                    "wellName": strWellName,
+                    "wellLocation": self._wellLocation(strOffsetStart, fltOffsetX, fltOffsetY, fltOffsetZ),
+                    "flowRate": str(fltFlowRate),
+                    "volume": str(intVolume),
+                    "pipetteId": self.pipettes[strPipetteName]["id"]
+                },
+                "intent": strIntent
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Aspirating from labware: {strLabwareName}, well: {strWellName}")
+
+        return await self._postCommand(dicCommand = dicCommand,
+                                       strAction = "aspirate",
+                                       strSuccessMessage = "Aspiration successful.")
+
+    async def dispense(self,
+                       strLabwareName: str,
+                       strWellName: str,
+                       strPipetteName: str,
+                       intVolume: int,                        # uL
+                       fltFlowRate: float = 274.7,            # uL/s -- need to check this
+                       strOffsetStart: str = "top",
+                       fltOffsetX: float = 0,
+                       fltOffsetY: float = 0,
+                       fltOffsetZ: float = 0,
+                       strIntent: str = "setup"
+                       ):
+        '''
+        dispenses liquid into a well - see opentronsClient.dispense
+
+        returns
+        ----------
+        dicData: dict
+            the completed command
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "dispense",
+                "params": {
+                    "labwareId": self.labware[strLabwareName]["id"],
+                    "wellName": strWellName,
+                    "wellLocation": self._wellLocation(strOffsetStart, fltOffsetX, fltOffsetY, fltOffsetZ),
+                    "flowRate": fltFlowRate,
+                    "volume": intVolume,
+                    "pipetteId": self.pipettes[strPipetteName]["id"]
+                },
+                "intent": strIntent
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Dispensing into labware: {strLabwareName}, well: {strWellName}")
+
+        return await self._postCommand(dicCommand = dicCommand,
+                                       strAction = "dispense",
+                                       strSuccessMessage = "Dispense successful.")
+
+    async def blowout(self,
+                      strLabwareName: str,
+                      strWellName: str,
+                      strPipetteName: str,
+                      fltFlowRate: float = 274.7,            # uL/s -- need to check this
+                      strOffsetStart: str = "top",
+                      fltOffsetX: float = 0,
+                      fltOffsetY: float = 0,
+                      fltOffsetZ: float = 0
+                      ):
+        '''
+        blows out liquid from a pipette - see opentronsClient.blowout
+
+        returns
+        ----------
+        dicData: dict
+            the completed command
+        '''
+
+        dicCommand = {
+            "data": {
+                "commandType": "blowout",
+                "params": {
+                    "labwareId": self.labware[strLabwareName]["id"],
+                    "wellName": strWellName,
+                    "wellLocation": self._wellLocation(strOffsetStart, fltOffsetX, fltOffsetY, fltOffsetZ),
+                    "flowRate": fltFlowRate,
+                    "pipetteId": self.pipettes[strPipetteName]["id"]
+                },
+                "intent": "setup"
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Blowing out from labware: {strLabwareName}, well: {strWellName}")
+
+        return await self._postCommand(dicCommand = dicCommand,
+                                       strAction = "blowout",
+                                       strSuccessMessage = "Blowout successful.")
+
+    async def moveToWell(self,
+                         strLabwareName: str,
+                         strWellName: str,
+                         strPipetteName: str,
+                         strOffsetStart: str = "top",
+                         fltOffsetX: float = 0,
+                         fltOffsetY: float = 0,
+                         fltOffsetZ: float = 0,
+                         strIntent: str = "setup",
+                         intSpeed: int = 400   # mm/s
+                         ):
+        '''
+        moves the pipette to a well - see opentronsClient.moveToWell
+
+        returns
+        ----------
+        dicData: dict
+            the completed command
+        '''
+
+        # apply the same slot-specific Z offsets as opentronsClient.moveToWell
+        intSlot = self.labware.get(strLabwareName, {}).get("slot")
+        if intSlot == 12:
+            LOGGER.info("Applying special offset for slot 12: Z+15mm")
+            fltOffsetZ += 15
+        elif intSlot == 9:
+            LOGGER.info("Applying special offset for slot 9: Z+10mm")
+            fltOffsetZ += 10
+
+        dicCommand = {
+            "data": {
+                "commandType": "moveToWell",
+                "params": {
+                    "speed": intSpeed,
+                    "labwareId": self.labware[strLabwareName]["id"],
+                    "wellName": strWellName,
+                    "wellLocation": self._wellLocation(strOffsetStart, fltOffsetX, fltOffsetY, fltOffsetZ),
+                    "pipetteId": self.pipettes[strPipetteName]["id"],
+                },
+                "intent": strIntent,
+            }
+        }
+
+        # LOG - info
+        LOGGER.info(f"Moving pipette to labware: {strLabwareName}, well: {strWellName}")
+
+        return await self._postCommand(dicCommand = dicCommand,
+                                       strAction = "move pipette",
+                                       strSuccessMessage = "Move successful.")
+
+    async def lights(self,
+                     strState: str = 'true'
+                     ) -> None:
+        '''
+        turns the lights on or off - see opentronsClient.lights
+
+        returns
+        ----------
+        None
+        '''
+
+        strState = str(strState).lower()
+
+        # check if the state is valid
+        if strState not in ['true', 'false']:
+            raise Exception(f"Invalid state: {strState}, needs to be 'true' or 'false'")
+
+        # LOG - info
+        LOGGER.info(f"Lights On: {strState}")
+
+        intStatus, strText = await self._request("POST",
+                                                 f"http://{self.robotIP}:31950/robot/lights",
+                                                 strData = json.dumps({"on": strState}))
+
+        if intStatus != 200:
+            # LOG - error
+            LOGGER.error(f"Failed to turn lights {strState}.")
+            raise Exception(f"Failed to turn lights {strState}.\nError code: {intStatus}\n Error message: {strText}")
+
+        # LOG - info
+        LOGGER.info("Light change successful.")
+
+    async def controlAction(self,
+                            strAction: str):
+        '''
+        performs a control action - see opentronsClient.controlAction
+
+        returns
+        ----------
+        None
+        '''
+        strAction = strAction.lower()
+
+        # check if the action is valid
+        if strAction not in ["pause", "play", "stop"]:
+            raise Exception(f"Invalid action: {strAction}, needs to be 'pause', 'play', or 'stop'")
+
+        # LOG - info
+        LOGGER.info(f"Performing action: {strAction}")
+
+        intStatus, strText = await self._request("POST",
+                                                 f"http://{self.robotIP}:31950/runs/{self.runID}/actions",
+                                                 strData = json.dumps({"data": {"actionType": strAction}}))
+
+        if intStatus != 201:
+            raise Exception(f"Failed to perform action.\nError code: {intStatus}\n Error message: {strText}")
+
+        # LOG - info
+        LOGGER.info(f"Action: {strAction} successful.")
@@ -1,9 +1,307 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
+import threading
+import collections
+import contextlib
+from concurrent.futures import Future, wait
 
 LOGGER = logging.getLogger(__name__)
 
+# pooled sessions, one per robot, shared by every client that talks to that robot
+_dicSharedSessions = {}
+_lockSharedSessions = threading.Lock()
+
+def getSharedSession(strRobotIP: str,
+                     intMaxConnections: int = 4):
+    '''
+    gets the pooled keep-alive session for a robot, creating it on first use
+
+    arguments
+    ----------
+    strRobotIP: str
+        the IP address of the robot
+
+    intMaxConnections: int
+        the maximum number of open connections kept to the robot
+        only used when the session is first created
+        default: 4
+
+    returns
+    ----------
+    session: requests.Session
+        the session shared by all clients of this robot
+    '''
+
+    with _lockSharedSessions:
+        session = _dicSharedSessions.get(strRobotIP)
+        if session is None:
+            session = makeSession(intMaxConnections = intMaxConnections)
+            _dicSharedSessions[strRobotIP] = session
+
+            # LOG - info
+            LOGGER.info(f"Created pooled session for robot: {strRobotIP} (max connections: {intMaxConnections})")
+
+    return session
+
+def makeSession(intMaxConnections: int = 4):
+    '''
+    makes a keep-alive session with a bounded connection pool
+
+    arguments
+    ----------
+    intMaxConnections: int
+        the maximum number of open connections kept to a host
+        default: 4
+
+    returns
+    ----------
+    session: requests.Session
+        the new session
+    '''
+
+    session = requests.Session()
+    # block instead of opening extra connections once the pool is exhausted
+    adapter = HTTPAdapter(pool_connections = 1,
+                          pool_maxsize = intMaxConnections,
+                          pool_block = True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+def closeSharedSessions():
+    '''
+    closes every shared robot session and its pooled connections
+
+    arguments
+    ----------
+    None
+
+    returns
+    ----------
+    None
+    '''
+
+    with _lockSharedSessions:
+        for strRobotIP, session in _dicSharedSessions.items():
+            session.close()
+            # LOG - info
+            LOGGER.info(f"Closed pooled session for robot: {strRobotIP}")
+        _dicSharedSessions.clear()
+
+class commandPoller:
+    '''
+    resolves commands queued with waitUntilComplete=False in one background thread
+
+    commands in a run execute in the order they were queued, so only the oldest
+    pending command needs to be polled at any time
+    '''
+
+    def __init__(self,
+                 client,
+                 fltPollInterval: float = 0.1):
+        '''
+        initializes the poller for a client
+
+        arguments
+        ----------
+        client: opentronsClient
+            the client whose run commands are polled
+
+        fltPollInterval: float
+            the time between polls of a running command
+            units: s
+            default: 0.1
+
+        returns
+        ----------
+        None
+        '''
+        self.client = client
+        self.pollInterval = fltPollInterval
+        self.pending = collections.deque()
+        self.failures = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._boolStopped = False
+
+    def submit(self,
+               strCommandID: str,
+               strAction: str,
+               strSuccessMessage: str = None):
+        '''
+        adds a queued command to the poller
+
+        arguments
+        ----------
+        strCommandID: str
+            the ID of the command returned by the robot
+
+        strAction: str
+            the action used in log and error messages
+
+        strSuccessMessage: str
+            the message logged once the command succeeds
+            default: None
+
+        returns
+        ----------
+        future: concurrent.futures.Future
+            resolved with the command data, or with an exception if the command failed
+        '''
+        future = Future()
+        future.commandID = strCommandID
+
+        with self._condition:
+            if self._boolStopped:
+                raise Exception("Command poller has been stopped.")
+            self.pending.append((strCommandID, strAction, strSuccessMessage, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._run,
+                                                name = f"commandPoller-{self.client.runID}",
+                                                daemon = True)
+                self._thread.start()
+            self._condition.notify()
+
+        return future
+
+    def outstanding(self):
+        '''
+        gets the futures of all commands that have not finished yet
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        lstFutures: list
+            the pending futures in the order they were queued
+        '''
+        with self._condition:
+            return [tupPending[3] for tupPending in self.pending]
+
+    def collectFailures(self):
+        '''
+        gets and clears the exceptions of commands that failed since the last call
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        lstFailures: list
+            the exceptions in the order the commands failed
+        '''
+        with self._condition:
+            lstFailures = list(self.failures)
+            self.failures.clear()
+        return lstFailures
+
+    def stop(self):
+        '''
+        stops the poller thread and fails any command still pending
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        None
+        '''
+        with self._condition:
+            self._boolStopped = True
+            self._condition.notify_all()
+            lstPending = list(self.pending)
+            self.pending.clear()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+        for strCommandID, strAction, strSuccessMessage, future in lstPending:
+            future.set_exception(Exception(f"Failed to {strAction}.\nCommand {strCommandID} was still pending when the poller stopped."))
+
+    def _pollStatuses(self,
+                      lstPending: list):
+        '''
+        gets the current data of pending commands
+
+        a single pending command is polled directly, several are read from one
+        page of the run's command list
+
+        arguments
+        ----------
+        lstPending: list
+            the pending entries, oldest first
+
+        returns
+        ----------
+        dicStatuses: dict
+            the command data by command ID, commands that could not be read are missing
+        '''
+        strOldestID = lstPending[0][0]
+        dicStatuses = {}
+
+        try:
+            if len(lstPending) > 1:
+                lstCommands = self.client.getRunCommands(intPageLength = len(lstPending))
+                dicStatuses = {dicCommand["id"]: dicCommand for dicCommand in lstCommands}
+            # the page may start past the oldest command, fall back to asking for it
+            if strOldestID not in dicStatuses:
+                dicStatuses[strOldestID] = self.client.getCommand(strOldestID)
+        except Exception as e:
+            # LOG - warning
+            LOGGER.warning(f"Failed to poll command {strOldestID}: {str(e)}")
+
+        return dicStatuses
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self.pending and not self._boolStopped:
+                    self._condition.wait()
+                if self._boolStopped:
+                    return
+                lstPending = list(self.pending)
+
+            dicStatuses = self._pollStatuses(lstPending)
+
+            # commands finish in order, resolve the finished ones from the front
+            intResolved = 0
+            for strCommandID, strAction, strSuccessMessage, future in lstPending:
+                dicData = dicStatuses.get(strCommandID, {"status": "unknown"})
+                if dicData["status"] not in ("succeeded", "failed"):
+                    break
+
+                with self._condition:
+                    self.pending.popleft()
+                intResolved += 1
+
+                if dicData["status"] == "succeeded":
+                    # LOG - info
+                    if strSuccessMessage:
+                        LOGGER.info(strSuccessMessage)
+                    future.set_result(dicData)
+                else:
+                    error_info = dicData.get("error", dicData)
+                    LOGGER.error(f"Failed to {strAction}.\nResponse error: {error_info}")
+                    exception = Exception(f"Failed to {strAction}.\nResponse error: {error_info}")
+                    with self._condition:
+                        self.failures.append(exception)
+                    future.set_exception(exception)
+
+            if intResolved:
+                # the next command may already be done, check it straight away
+                continue
+
+            with self._condition:
+                if not self._boolStopped:
+                    self._condition.wait(self.pollInterval)
+
 class opentronsClient:
     '''
     each object will represent a single experiment
@@ -11,7 +309,13 @@ class opentronsClient:
 
     def __init__(self,
                  strRobotIP: str,
-                 dicHeaders: dict = {"opentrons-version": "3"},):
+                 dicHeaders: dict = {"opentrons-version": "3"},
+                 intMaxConnections: int = 4,
+                 fltConnectTimeout: float = 5.0,
+                 fltReadTimeout: float = 300.0,
+                 boolSharedSession: bool = True,
+                 boolWaitUntilComplete: bool = True,
+                 fltPollInterval: float = 0.1,):
         '''
         initializes the object with the robot IP and headers
 
@@ -23,12 +327,50 @@ class opentronsClient:
         dicHeaders: dict
             the headers to be used in the requests
 
+        intMaxConnections: int
+            the maximum number of keep-alive connections to the robot
+            default: 4
+
+        fltConnectTimeout: float
+            the time to wait for a connection to the robot
+            units: s
+            default: 5.0
+
+        fltReadTimeout: float
+            the time to wait for the robot to answer a request
+            commands are sent with waitUntilComplete so this must cover the longest move
+            units: s
+            default: 300.0
+
+        boolSharedSession: bool
+            whether to share the connection pool with other clients of the same robot
+            default: True
+
+        boolWaitUntilComplete: bool
+            whether motion commands block until the robot finishes them
+            when False they are queued on the run and return a future instead
+            default: True
+
+        fltPollInterval: float
+            the time between polls of queued commands
+            units: s
+            default: 0.1
+
         returns
         ----------
         None
         '''
         self.robotIP = strRobotIP
         self.headers = dicHeaders
+        self.timeout = (fltConnectTimeout, fltReadTimeout)
+        self.waitUntilComplete = boolWaitUntilComplete
+        self.poller = commandPoller(self, fltPollInterval = fltPollInterval)
+
+        if boolSharedSession:
+            self.session = getSharedSession(strRobotIP = strRobotIP,
+                                            intMaxConnections = intMaxConnections)
+        else:
+            self.session = makeSession(intMaxConnections = intMaxConnections)
         self.runID = None
         self.commandURL = None
 
@@ -53,9 +395,10 @@ class opentronsClient:
 
         strRunURL = f"http://{self.robotIP}:31950/runs"
         # create a new run
-        response = requests.post(url=strRunURL,
-                                 headers=self.headers
-                                 )
+        response = self.session.post(url=strRunURL,
+                                     headers=self.headers,
+                                     timeout=self.timeout
+                                     )
 
         if response.status_code == 201:
             dicResponse = json.loads(response.text)
@@ -71,6 +414,224 @@ class opentronsClient:
         else:
             raise Exception(f"Failed to create a new run.\nError code: {response.status_code}\n Error message: {response.text}")
 
+    def _postCommand(self,
+                     dicCommand: dict,
+                     strAction: str,
+                     strSuccessMessage: str = None,
+                     boolWaitUntilComplete: bool = None):
+        '''
+        posts a command to the run and checks the response
+
+        arguments
+        ----------
+        dicCommand: dict
+            the command to be posted
+
+        strAction: str
+            the action used in log and error messages
+
+        strSuccessMessage: str
+            the message logged once the command succeeds
+            default: None
+
+        boolWaitUntilComplete: bool
+            whether to block until the command finishes
+            default: None (use the client setting)
+
+        returns
+        ----------
+        dicData: dict or concurrent.futures.Future
+            the command data when blocking, otherwise the future of the queued command
+        '''
+
+        if boolWaitUntilComplete is None:
+            boolWaitUntilComplete = self.waitUntilComplete
+
+        strCommand = json.dumps(dicCommand)
+
+        # LOG - debug
+        LOGGER.debug(f"Command: {strCommand}")
+
+        response = self.session.post(
+            url = self.commandURL,
+            headers = self.headers,
+            timeout = self.timeout,
+            params = {"waitUntilComplete": boolWaitUntilComplete},
+            data = strCommand
+        )
+
+        # LOG - debug
+        LOGGER.debug(f"Response: {response.text}")
+
+        if response.status_code != 201:
+            raise Exception(f"Failed to {strAction}.\nError code: {response.status_code}\n Error message: {response.text}")
+
+        dicData = json.loads(response.text)['data']
+        if dicData['status'] == "failed":
+            error_info = dicData.get('error', dicData)
+            # log the error
+            LOGGER.error(f"Failed to {strAction}.\nResponse error: {error_info}")
+            # raise exception
+            raise Exception(f"Failed to {strAction}.\nResponse error: {error_info}")
+
+        if not boolWaitUntilComplete:
+            # LOG - debug
+            LOGGER.debug(f"Queued command {dicData['id']} to {strAction}")
+            return self.poller.submit(strCommandID = dicData['id'],
+                                      strAction = strAction,
+                                      strSuccessMessage = strSuccessMessage)
+
+        # LOG - info
+        if strSuccessMessage:
+            LOGGER.info(strSuccessMessage)
+
+        return dicData
+
+    def getCommand(self,
+                   strCommandID: str):
+        '''
+        gets a command of the current run
+
+        arguments
+        ----------
+        strCommandID: str
+            the ID of the command
+
+        returns
+        ----------
+        dicData: dict
+            the command data, including its status
+        '''
+
+        response = self.session.get(
+            url = f"{self.commandURL}/{strCommandID}",
+            headers = self.headers,
+            timeout = self.timeout
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to get command {strCommandID}.\nError code: {response.status_code}\n Error message: {response.text}")
+
+        return json.loads(response.text)['data']
+
+    def getRunCommands(self,
+                       intPageLength: int = 20,
+                       intCursor: int = None):
+        '''
+        gets a page of the current run's command list
+
+        arguments
+        ----------
+        intPageLength: int
+            the number of commands to get
+            default: 20
+
+        intCursor: int
+            the index of the first command
+            default: None (let the robot start at the command that is running)
+
+        returns
+        ----------
+        lstCommands: list
+            the command summaries, including their status, in run order
+        '''
+
+        dicParams = {"pageLength": intPageLength}
+        if intCursor is not None:
+            dicParams["cursor"] = intCursor
+
+        response = self.session.get(
+            url = self.commandURL,
+            headers = self.headers,
+            timeout = self.timeout,
+            params = dicParams
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to get run commands.\nError code: {response.status_code}\n Error message: {response.text}")
+
+        return json.loads(response.text)['data']
+
+    @contextlib.contextmanager
+    def commandBatch(self,
+                     fltTimeout: float = None):
+        '''
+        queues every run command sent inside the block and waits for all of them at the end
+
+        the robot works through the queue back to back instead of idling for a
+        round-trip after each command, progress is read from the run's command list
+
+        commands that do not go through the run (homeRobot, lights) are not
+        queued and must not be mixed into a batch
+
+        arguments
+        ----------
+        fltTimeout: float
+            the maximum time to wait for the batch once it has been sent
+            units: s
+            default: None (wait forever)
+
+        returns
+        ----------
+        None
+        '''
+
+        boolWaitUntilComplete = self.waitUntilComplete
+        self.waitUntilComplete = False
+        try:
+            yield
+        except BaseException:
+            self.waitUntilComplete = boolWaitUntilComplete
+            # let the commands already queued settle before reporting the error
+            try:
+                self.waitForCommands(fltTimeout = fltTimeout)
+            except Exception as e:
+                LOGGER.error(f"Queued command failed while aborting batch: {str(e)}")
+            raise
+        self.waitUntilComplete = boolWaitUntilComplete
+        self.waitForCommands(fltTimeout = fltTimeout)
+
+    def waitForCommands(self,
+                        fltTimeout: float = None):
+        '''
+        blocks until every queued command has finished
+
+        arguments
+        ----------
+        fltTimeout: float
+            the maximum time to wait
+            units: s
+            default: None (wait forever)
+
+        returns
+        ----------
+        None
+        '''
+
+        lstFutures = self.poller.outstanding()
+        setDone, setNotDone = wait(lstFutures, timeout = fltTimeout)
+        if setNotDone:
+            raise Exception(f"{len(setNotDone)} commands still running after {fltTimeout} s.")
+
+        # raise the first failure that has not been reported yet
+        lstFailures = self.poller.collectFailures()
+        if lstFailures:
+            raise lstFailures[0]
+
+    def close(self):
+        '''
+        stops polling queued commands
+
+        arguments
+        ----------
+        None
+
+        returns
+        ----------
+        None
+        '''
+        self.poller.stop()
+
     def getRunInfo(self):
         '''
         gets the information for the current run
@@ -88,9 +649,10 @@ class opentronsClient:
         # LOG - info
         LOGGER.info(f"Getting information for run: {self.runID}")
 
-        response = requests.get(
+        response = self.session.get(
             url = f"http://{self.robotIP}:31950/runs/{self.runID}",
-            headers = self.headers
+            headers = self.headers,
+            timeout = self.timeout
         )
 
         # LOG - debug
@@ -163,9 +725,10 @@ class opentronsClient:
         # LOG - debug
         LOGGER.debug(f"Command: {strCommand}")
 
-        response = requests.post(
+        response = self.session.post(
             url = self.commandURL,
             headers = self.headers,
+            timeout = self.timeout,
             params = {"waitUntilComplete": True},
             data = strCommand
         )
@@ -233,9 +796,10 @@ class opentronsClient:
         # LOG - debug
         LOGGER.debug(f"Command: {strCommand}")
 
-        response = requests.post(
+        response = self.session.post(
             url = f"http://{self.robotIP}:31950/runs/{self.runID}/labware_definitions",
             headers = self.headers,
+            timeout = self.timeout,
             data = strCommand
         )
 
@@ -308,9 +872,10 @@ class opentronsClient:
         # LOG - debug
         LOGGER.debug(f"Command: {strCommand}")
 
-        response = requests.post(
+        response = self.session.post(
             url = self.commandURL,
             headers = self.headers,
+            timeout = self.timeout,
             params = {"waitUntilComplete": True},
             data = strCommand
         )
@@ -357,9 +922,10 @@ class opentronsClient:
         # LOG - debug
         LOGGER.debug(f"Command: {strCommand}")
 
-        response = requests.post(
+        response = self.session.post(
             url = f"http://{self.robotIP}:31950/robot/home",
             headers = self.headers,
+            timeout = self.timeout,
             data = strCommand
         )
 
@@ -420,7 +986,8 @@ class opentronsClient:
 
         returns
         ----------
-        None
+        handle: concurrent.futures.Future or None
+            the queued command when the client does not wait for completion
         '''
 
         # *** WIP ***
@@ -444,42 +1011,12 @@ class opentronsClient:
             }
         }
 
-        jsonCommand = json.dumps(dicCommand)
-
         # LOG - info
         LOGGER.info(f"Picking up tip from labware: {strLabwareName}")
-        # LOG - debug
-        LOGGER.debug(f"Command: {jsonCommand}")
 
-        jsonResponse = requests.post(
-            url = self.commandURL,
-            headers = self.headers,
-            params = {"waitUntilComplete": True},
-            data = jsonCommand
-        )
-
-        # LOG - debug
-        LOGGER.debug(f"Response: {jsonResponse.text}")
-
-        if jsonResponse.status_code == 201:
-            # convert response to dictionary
-            dicResponse = json.loads(jsonResponse.text)
-            if dicResponse['data']['status'] == "failed":
-                # log the error
-                if 'error' in dicResponse['data']:
-                    error_info = dicResponse['data']['error']
-                    LOGGER.error(f"Failed to pick up tip.\nResponse error: {error_info}")
-                    # raise exception
-                    raise Exception(f"Failed to pick up tip.\nResponse error: {error_info}")
-                else:
-                    LOGGER.error(f"Failed to pick up tip.\nResponse: {dicResponse}")
-                    # raise exception
-                    raise Exception(f"Failed to pick up tip.\nResponse: {dicResponse}")
-            else:
-                # LOG - info
-                LOGGER.info(f"Tip picked up from labware: {strLabwareName}, well: {strWellName}")
-        else:
-            raise Exception(f"Failed to pick up tip.\nError code: {jsonResponse.status_code}\n Error message: {jsonResponse.text}")
+        return self._postCommand(dicCommand = dicCommand,
+                                 strAction = "pick up tip",
+                                 strSuccessMessage = f"Tip picked up from labware: {strLabwareName}, well: {strWellName}")
 
     def dropTip(self,
                 strPipetteName: str,
@@ -536,6 +1073,11 @@ class opentronsClient:
         strIntent: str
             the intent of the command
             default: "setup"
+
+        returns
+        ----------
+        handle: concurrent.futures.Future or None
+            the queued command when the client does not wait for completion
         '''
 
         # *** BUILD IN CHECK TO SEE IF THERE IS A TIP TO DROP ***
@@ -561,38 +1103,12 @@ class opentronsClient:
             }
         }
 
-        # dump to string
-        strCommand = json.dumps(dicCommand)
-
         # LOG - info
         LOGGER.info(f"Dropping tip into labware: {strLabwareName}")
-        # LOG - debug
-        LOGGER.debug(f"Command: {strCommand}")
 
-        # make request
-        response = requests.post(
-            url = self.commandURL,
-            headers = self.headers,
-            params = {"waitUntilComplete": True},
-            data = strCommand
-        )
-
-        # LOG - debug
-        LOGGER.debug(f"Response: {response.text}")
-
-        if response.status_code == 201:
-            # convert response to dictionary
-            dicResponse = json.loads(response.text)
-            if dicResponse['data']['status'] == "failed":
-                # log the error
-                LOGGER.error(f"Failed to drop tip.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-                # raise exception
-                raise Exception(f"Failed to drop tip.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-            else:
-                # LOG - info
-                LOGGER.info(f"Tip dropped into labware: {strLabwareName}, well: {strWellName}")
-        else:
-            raise Exception(f"Failed to drop tip.\nError code: {response.status_code}\n Error message: {response.text}")
+        return self._postCommand(dicCommand = dicCommand,
+                                 strAction = "drop tip",
+                                 strSuccessMessage = f"Tip dropped into labware: {strLabwareName}, well: {strWellName}")
 
     def aspirate(self,
                  strLabwareName: str,
@@ -651,7 +1167,8 @@ class opentronsClient:
 
         returns
         ----------
-        None
+        handle: concurrent.futures.Future or None
+            the queued command when the client does not wait for completion
         '''
 
         # make command dictionary
@@ -675,40 +1192,12 @@ class opentronsClient:
             }
         }
 
-        # dump to string
-        strCommand = json.dumps(dicCommand)
-
         # LOG - info
         LOGGER.info(f"Aspirating from labware: {strLabwareName}, well: {strWellName}")
-        # LOG - debug
-        LOGGER.debug(f"Command: {strCommand}")
-
-        # make request
-        response = requests.post(
-            url = self.commandURL,
-            headers = self.headers,
-            params = {"waitUntilComplete": True},
-            data = strCommand
-        )
-
-        # LOG - debug
-        LOGGER.debug(f"Response: {response.text}")
 
-        if response.status_code == 201:
-            # convert response to dictionary
-            dicResponse = json.loads(response.text)
-            if dicResponse['data']['status'] == "failed":
-                # log the error
-                LOGGER.error(f"Failed to aspirate.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-                # raise exception
-                raise Exception(f"Failed to aspirate.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-            else:
-                # LOG - info
-                LOGGER.info(f"Aspiration successful.")
-        else:
-            raise Exception(
-                f"Failed to aspirate.\nError code: {response.status_code}\n Error message: {response.text}"
-            )
+        return self._postCommand(dicCommand = dicCommand,
+                                 strAction = "aspirate",
+                                 strSuccessMessage = "Aspiration successful.")
 
     def dispense(self,
                  strLabwareName: str,
@@ -767,7 +1256,8 @@ class opentronsClient:
 
         returns
         ----------
-        None
+        handle: concurrent.futures.Future or None
+            the queued command when the client does not wait for completion
         '''
 
         # make command dictionary
@@ -791,38 +1281,12 @@ class opentronsClient:
             }
         }
 
-        # dump to string
-        strCommand = json.dumps(dicCommand)
-
         # LOG - info
         LOGGER.info(f"Dispensing into labware: {strLabwareName}, well: {strWellName}")
-        # LOG - debug
-        LOGGER.debug(f"Command: {strCommand}")
-
-        # make request
-        response = requests.post(
-            url = self.commandURL,
-            headers = self.headers,
-            params = {"waitUntilComplete": True},
-            data = strCommand
-        )
 
-        # LOG - debug
-        LOGGER.debug(f"Response: {response.text}")
-
-        if response.status_code == 201:
-            # convert response to dictionary
-            dicResponse = json.loads(response.text)
-            if dicResponse['data']['status'] == "failed":
-                # log the error
-                LOGGER.error(f"Failed to dispense.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-                # raise exception
-                raise Exception(f"Failed to dispense.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-            else:
-                # LOG - info
-                LOGGER.info("Dispense successful.")
-        else:
-            raise Exception(f"Failed to dispense.\nError code: {response.status_code}\n Error message: {response.text}")
+        return self._postCommand(dicCommand = dicCommand,
+                                 strAction = "dispense",
+                                 strSuccessMessage = "Dispense successful.")
 
     def blowout(self,
                 strLabwareName: str,
@@ -871,7 +1335,8 @@ class opentronsClient:
 
         returns
         ----------
-        None
+        handle: concurrent.futures.Future or None
+            the queued command when the client does not wait for completion
         '''
 
         # make command dictionary
@@ -894,39 +1359,12 @@ class opentronsClient:
             }
         }
 
-        # dump to string
-        strCommand = json.dumps(dicCommand)
-
         # LOG - info
         LOGGER.info(f"Blowing out from labware: {strLabwareName}, well: {strWellName}")
-        # LOG - debug
-        LOGGER.debug(f"Command: {strCommand}")
 
-        # make request
-        response = requests.post(
-            url = self.commandURL,
-            headers = self.headers,
-            params = {"waitUntilComplete": True},
-            data = strCommand
-        )
-
-        # LOG - debug
-        LOGGER.debug(f"Response: {response.text}")
-
-        if response.status_code == 201:
-            # convert response to dictionary
-            dicResponse = json.loads(response.text)
-            # if the response failed
-            if dicResponse['data']['status'] == "failed":
-                # log the error
-                LOGGER.error(f"Failed to blowout.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-                # raise exception
-                raise Exception(f"Failed to blowout.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-            else:
-                # LOG - info
-                LOGGER.info("Blowout successful.")
-        else:
-            raise Exception(f"Failed to blowout.\nError code: {response.status_code}\n Error message: {response.text}")
+        return self._postCommand(dicCommand = dicCommand,
+                                 strAction = "blowout",
+                                 strSuccessMessage = "Blowout successful.")
 
     def moveToWell(self,
                    strLabwareName: str,
@@ -975,7 +1413,8 @@ class opentronsClient:
 
         returns
         ----------
-        None
+        handle: concurrent.futures.Future or None
+            the queued command when the client does not wait for completion
         '''
 
         # Check if we need to apply slot-specific offsets
@@ -1019,41 +1458,12 @@ class opentronsClient:
             }
         }
 
-        # dump to string
-        strCommand = json.dumps(dicCommand)
-
         # LOG - info
         LOGGER.info(f"Moving pipette to labware: {strLabwareName}, well: {strWellName}")
-        # LOG - debug
-        LOGGER.debug(f"Command: {strCommand}")
 
-        # make request
-        response = requests.post(
-            url = self.commandURL,
-            headers = self.headers,
-            params = {"waitUntilComplete": True},
-            data = strCommand
-        )
-
-        # LOG - debug
-        LOGGER.debug(f"Response: {response.text}")
-
-        if response.status_code == 201:
-            # convert response to dictionary
-            dicResponse = json.loads(response.text)
-            # if the response failed
-            if dicResponse['data']['status'] == "failed":
-                # log the error
-                LOGGER.error(f"Failed to move pipette.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-                # raise exception
-                raise Exception(f"Failed to move pipette.\nResponse error code: {dicResponse.error.errorCode}\n Error type: {dicResponse.error.errorType}\n Error message: {dicResponse.error.detail}")
-            else:
-                # LOG - info
-                LOGGER.info("Move successful.")
-        else:
-            raise Exception(
-                f"Failed to move pipette.\nError code: {response.status_code}\n Error message: {response.text}"
-            )
+        return self._postCommand(dicCommand = dicCommand,
+                                 strAction = "move pipette",
+                                 strSuccessMessage = "Move successful.")
 
     def addLabwareOffsets(self,
                           strLabwareName : str,
@@ -1130,9 +1540,10 @@ class opentronsClient:
         LOGGER.debug(f"Command: {strCommand}")
 
         # make request
-        response = requests.post(
+        response = self.session.post(
             url = f"http://{self.robotIP}:31950/runs/{self.runID}/labware_offsets",
             headers = self.headers,
+            timeout = self.timeout,
             data = strCommand
         )
 
@@ -1197,9 +1608,10 @@ class opentronsClient:
         LOGGER.debug(f"Command: {strCommand}")
 
         # make request
-        response = requests.post(
+        response = self.session.post(
             url = f"http://{self.robotIP}:31950/robot/lights",
             headers = self.headers,
+            timeout = self.timeout,
             data = strCommand
         )
 
@@ -1250,9 +1662,10 @@ class opentronsClient:
         # LOG - debug
         LOGGER.debug(f"Command: {strCommand}")
 
-        response = requests.post(
+        response = self.session.post(
             url = f"http://{self.robotIP}:31950/runs/{self.runID}/actions",
             headers = self.headers,
+            timeout = self.timeout,
             data = strCommand
         )
 
@@ -1,5 +1,9 @@
+import collections
+import itertools
 import logging
+import threading
 import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 import serial
 import serial.tools.list_ports
 
@@ -10,6 +14,44 @@ class ArduinoException(Exception):
 class ArduinoTimeout(Exception):
     pass
 
+class _PendingCommand:
+    """A command written to the Arduino that has not been answered yet."""
+
+    def __init__(self, commandId:int, command:str, future:Future):
+        self.commandId = commandId
+        self.command = command
+        self.future = future
+        self.lines = []
+        self.sentAt = time.monotonic()
+
+
+class _LineReader:
+    """Reads whole lines from a serial port, keeping partial lines between reads.
+
+    Each read blocks in the serial driver until at least one byte arrives or
+    the port's timeout expires, then takes everything already waiting, so an
+    idle port uses no CPU and a busy one is read in bulk.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = bytearray()
+
+    def readLines(self) -> list:
+        """Wait for data and return the complete lines received, possibly none."""
+        waiting = getattr(self.connection, "in_waiting", 0) or 0
+        self.buffer += self.connection.read(max(1, waiting))
+
+        lines = []
+        end = self.buffer.find(b"\n")
+        while end >= 0:
+            line = self.buffer[:end].decode(errors="replace").strip()
+            del self.buffer[:end + 1]
+            if line:
+                lines.append(line)
+            end = self.buffer.find(b"\n")
+        return lines
+
 class Arduino:
     """Class for the arduino robot relate activities for the openTron setup."""
 
@@ -22,6 +64,7 @@ class Arduino:
         nozzlePumps: list = [0,1,2], # Water, HCL, WasteOut
         rinsePumps: list = [3,5,4], # Water, HCL, WasteOut
         pump_slope: dict = {0: 7.97/5, 1: 8.00/5, 2: 7.87/5, 3: 7.92/5, 4: 8.18/5, 5: 7.48/5}, # mL/s
+        taggedProtocol: bool = False,
     ):
         """Initialize the arduino robotic parts. The robot consist of
         cartridges that are inserted into the openTron robot. Each cartridge
@@ -29,6 +72,13 @@ class Arduino:
         through a setpoint and an ultrasonic transducer.
         Pumps and ultrasonic drivers that are all connected to relays.
 
+        Commands are pipelined: a reader thread matches responses to the
+        commands waiting for them, so several commands can be in flight at
+        once. Plain firmware answers commands in order. Firmware that
+        supports tagged commands ("@<id> <command>", answered with lines
+        prefixed "@<id> ") may answer them in any order, which lets timers on
+        different pumps and bases overlap.
+
         The robot assumes that cartridges are numbered from 0 and up.
         The robot assumes that relays are used both for pumps and ultrasonic
         sensors.
@@ -58,7 +108,18 @@ class Arduino:
             pump_intercept (dict, optional): Dictionary with pump number as
                 key and intercept as value.
                 Defaults to {0: 0.0, 1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0, 5: 0.0}.
+            taggedProtocol (bool, optional): Whether the firmware supports
+                tagged commands. Defaults to False.
         """
+        self.taggedProtocol = taggedProtocol
+        self.mockConnection = False
+        self._writeLock = threading.Lock()
+        self._pendingLock = threading.Lock()
+        self._pending = collections.OrderedDict()
+        self._commandIds = itertools.count(1)
+        self._reader = None
+        self._statsLock = threading.Lock()
+        self._latencyStats = {}
         self.SERIAL_PORT = self.__define_arduino_port(arduinoPort)
         self.BAUD_RATE = 115200
         self.list_of_cartridges = basePlates
@@ -85,7 +146,9 @@ class Arduino:
                 baudrate=self.BAUD_RATE,
                 timeout=timeout_s,
             )
+            self.mockConnection = False
             time.sleep(3)  # Loadtime compensation, don't know if needed
+            self.__startReader()
 
             # Set target temperatures for heaters again
             for heaterNum, temp in enumerate(self.heaterSetPoints):
@@ -95,6 +158,7 @@ class Arduino:
             LOGGER.error(f"Failed to connect to Arduino on port {self.SERIAL_PORT}: {str(e)}")
             LOGGER.warning("Using mock Arduino client")
             # Create a mock connection object
+            self.mockConnection = True
             self.connection = type('obj', (object,), {
                 'write': lambda x: None,
                 'read': lambda: b'0\n',
@@ -106,12 +170,19 @@ class Arduino:
 
     def disconnect(self) -> None:
         """Disconnects from serial port of arduino"""
+        reader, self._reader = self._reader, None
         try:
+            if hasattr(self.connection, 'cancel_read'):
+                self.connection.cancel_read()
             if hasattr(self.connection, 'close') and callable(self.connection.close):
                 self.connection.close()
         except Exception as e:
             LOGGER.error(f"Failed to disconnect: {str(e)}")
 
+        if reader is not None and reader is not threading.current_thread():
+            reader.join(timeout=5)
+        self.__failPending(ArduinoException("Arduino connection closed"))
+
 
     def refreshConnection(self) -> None:
         try:
@@ -121,6 +192,7 @@ class Arduino:
         except Exception as e:
             LOGGER.error(f"Failed to refresh connection: {str(e)}")
             # Create a mock connection object
+            self.mockConnection = True
             self.connection = type('obj', (object,), {
                 'write': lambda x: None,
                 'read': lambda: b'0\n',
@@ -130,11 +202,46 @@ class Arduino:
             })
 
 
+    def submitCommand(self, command:str) -> Future:
+        """Write a command without waiting for the Arduino to answer it.
+
+        Args:
+            command (str): Command and arguments, e.g. "get_base_temp 0"
+
+        Returns:
+            Future: Resolves to the data lines sent before the final "0", or
+                fails with ArduinoException if the Arduino rejects the command.
+                Cancelling it drops the answer, which is still read when it
+                arrives so later answers stay matched to their commands
+        """
+        future = Future()
+        if self.mockConnection:
+            # The mock Arduino accepts everything
+            future.set_result(["0"])
+            return future
+
+        # Plain firmware answers in order, so queue and write under one lock
+        with self._writeLock:
+            with self._pendingLock:
+                commandId = next(self._commandIds)
+                self._pending[commandId] = _PendingCommand(commandId, command, future)
+            future.commandId = commandId
+            line = f"@{commandId} {command}\n" if self.taggedProtocol else f"{command}\n"
+            try:
+                self.connection.write(line.encode())
+            except Exception as e:
+                self.__forget(future)
+                future.set_exception(ArduinoException(f"Failed to write to Arduino: {str(e)}"))
+        return future
+
+
     def getPumpOn(self, pumpNumber:int, retries:int=3) -> bool:
         LOGGER.info(f"Getting status of pump {pumpNumber}")
-        self.connection.write(f"get_pump_state {pumpNumber}\n".encode())
+        request = self.submitCommand(f"get_pump_state {pumpNumber}")
 
-        res = self.__getSafeResponse(retries=retries, timeout_s=3)
+        res = self.__getSafeResponse(request, retries=retries, timeout_s=3)
+        if not res:
+            raise ArduinoTimeout(f"No state received for pump {pumpNumber}")
 
         if res[0] == "1":
             LOGGER.info(f"Pump {pumpNumber} is ON")
@@ -149,29 +256,31 @@ class Arduino:
     def setPump(self, pumpNumber:int, turnOn:bool, retries:int=3) -> None:
         LOGGER.info(f'{"Enabling" if turnOn else "Disabling"} pump {pumpNumber}')
         if turnOn:
-            self.connection.write(f"set_pump_on {pumpNumber}\n".encode())
+            request = self.submitCommand(f"set_pump_on {pumpNumber}")
         else:
-            self.connection.write(f"set_pump_off {pumpNumber}\n".encode())
+            request = self.submitCommand(f"set_pump_off {pumpNumber}")
 
-        self.__getSafeResponse(retries, Arduino.setPump, (self, pumpNumber, turnOn, 0), not turnOn)
+        self.__getSafeResponse(request, retries, Arduino.setPump, (self, pumpNumber, turnOn, 0), not turnOn)
         LOGGER.debug(f'Pump {pumpNumber} is {"on" if turnOn else "off"}')
 
 
-    def setPumpOnTimer(self, pumpNumber:int, timeOn_ms:int, retries:int=3) -> None:
+    def setPumpOnTimer(self, pumpNumber:int, timeOn_ms:int, retries:int=3, blocking:bool=True):
+        """Run a pump for a time. With blocking=False returns a Future instead of waiting."""
         LOGGER.info(f"Enabling pump {pumpNumber} for {timeOn_ms}ms")
-        self.connection.write(f"set_pump_on_time {pumpNumber} {timeOn_ms}\n".encode())
+        request = self.submitCommand(f"set_pump_on_time {pumpNumber} {timeOn_ms}")
+        if not blocking:
+            return request
 
-        self.__getSafeResponse(retries, Arduino.setPumpOnTimer, (self, pumpNumber, timeOn_ms, 0), True, timeout_s=timeOn_ms/1000 + 3) # Ensures Arduino completes successfully
+        self.__getSafeResponse(request, retries, Arduino.setPumpOnTimer, (self, pumpNumber, timeOn_ms, 0), True, timeout_s=timeOn_ms/1000 + 3) # Ensures Arduino completes successfully
         LOGGER.debug(f"Pump {pumpNumber} ran for {timeOn_ms}ms")
 
 
-    def setTemp(self, baseNumber:int, targetTemp:float, retries:int=3) -> None:
+    def setTemp(self, baseNumber:int, targetTemp:float, retries:int=3, blocking:bool=True):
+        """Set a base's temperature. With blocking=False returns a Future instead of waiting."""
         targetTemp = round(targetTemp, 1) # All that's supported by the PID
 
         LOGGER.info(f"Setting base {baseNumber} temperature to {targetTemp}C")
-        self.connection.write(f"set_base_temp {baseNumber} {targetTemp}\n".encode())
-
-        self.__getSafeResponse(retries, Arduino.setTemp, (self, baseNumber, targetTemp, 0), False) # Ensures Arduino completes successfully
+        request = self.submitCommand(f"set_base_temp {baseNumber} {targetTemp}")
 
         # Update the object to reset the temperatures whenever the connection resets
         try:
@@ -185,14 +294,23 @@ class Arduino:
             self.heaterSetPoints = [0] * (baseNumber + 1)
             self.heaterSetPoints[baseNumber] = targetTemp
 
+        if not blocking:
+            return request
+
+        self.__getSafeResponse(request, retries, Arduino.setTemp, (self, baseNumber, targetTemp, 0), False) # Ensures Arduino completes successfully
         LOGGER.debug(f"Base {baseNumber} temperature set successfully")
 
 
-    def getTemp(self, baseNumber:int, retries:int=3) -> float:
+    def getTemp(self, baseNumber:int, retries:int=3, blocking:bool=True):
+        """Read a base's temperature. With blocking=False returns a Future of the reading."""
         LOGGER.info(f"Getting temperature from base {baseNumber}")
-        self.connection.write(f"get_base_temp {baseNumber}\n".encode())
+        request = self.submitCommand(f"get_base_temp {baseNumber}")
+        if not blocking:
+            return self.__then(request, lambda res: float(res[0]))
 
-        res = self.__getSafeResponse(retries=retries, timeout_s=3)
+        res = self.__getSafeResponse(request, retries=retries, timeout_s=3)
+        if not res:
+            raise ArduinoTimeout(f"No temperature received from base {baseNumber}")
         temperature = float(res[0])
         LOGGER.debug(f"Base {baseNumber} returned a temperature reading of {temperature}C")
 
@@ -202,53 +320,160 @@ class Arduino:
     def setUltrasonic(self, baseNumber:int, turnOn:bool, retries:int=3) -> None:
         LOGGER.info(f'{"Enabling" if turnOn else "Disabling"} base {baseNumber}\'s sonicator')
         if turnOn:
-            self.connection.write(f"set_ultrasonic_on {baseNumber}\n".encode())
+            request = self.submitCommand(f"set_ultrasonic_on {baseNumber}")
         else:
-            self.connection.write(f"set_ultrasonic_off {baseNumber}\n".encode())
+            request = self.submitCommand(f"set_ultrasonic_off {baseNumber}")
 
-        self.__getSafeResponse(retries, Arduino.setUltrasonic, (self, baseNumber, turnOn, 0), not turnOn)
+        self.__getSafeResponse(request, retries, Arduino.setUltrasonic, (self, baseNumber, turnOn, 0), not turnOn)
         LOGGER.debug(f'Base {baseNumber}\'s sonicator is {"on" if turnOn else "off"}')
 
 
-    def setUltrasonicOnTimer(self, baseNumber:int, timeOn_ms:int, retries:int=3) -> None:
+    def setUltrasonicOnTimer(self, baseNumber:int, timeOn_ms:int, retries:int=3, blocking:bool=True):
+        """Run a base's sonicator for a time. With blocking=False returns a Future instead of waiting."""
         LOGGER.info(f"Enabling base {baseNumber}'s sonicator for {timeOn_ms}ms")
-        self.connection.write(f"set_ultrasonic_on_time {baseNumber} {timeOn_ms}\n".encode())
+        request = self.submitCommand(f"set_ultrasonic_on_time {baseNumber} {timeOn_ms}")
+        if not blocking:
+            return request
 
-        self.__getSafeResponse(retries, Arduino.setUltrasonicOnTimer, (self, baseNumber, timeOn_ms, 0), True, timeout_s=timeOn_ms/1000 + 3) # Ensures Arduino completes successfully
+        self.__getSafeResponse(request, retries, Arduino.setUltrasonicOnTimer, (self, baseNumber, timeOn_ms, 0), True, timeout_s=timeOn_ms/1000 + 3) # Ensures Arduino completes successfully
         LOGGER.debug(f"Base {baseNumber}'s sonicator ran for {timeOn_ms}ms")
 
 
-    def __getResponse(self, timeout_s:int=3):
-        # Check if we're using a mock connection
-        if not hasattr(self.connection, 'in_waiting') or isinstance(self.connection.in_waiting, int) and not callable(self.connection.in_waiting):
-            # This is a mock connection, return a dummy response
-            LOGGER.debug("Using mock Arduino connection")
-            return ["0"]
+    def __startReader(self) -> None:
+        """Start the thread that reads responses for the current connection."""
+        self._reader = threading.Thread(target=self.__readLoop, args=(self.connection,),
+                                        name=f"arduino-reader-{self.SERIAL_PORT}", daemon=True)
+        self._reader.start()
 
-        # Collect all data sent over serial line
-        # Exit when '0' or '1' is sent on it's own line
-        returnData = []
-        line = b""
-        startTime = time.time()
 
-        try:
-            while (time.time() - startTime < timeout_s):
-                if self.connection.in_waiting > 0:
-                    line += self.connection.read()
-                    if line.endswith(b'\n'):
-                        line = line.decode().strip()
-                        if line == "0":
-                            return returnData
-                        elif line == "1":
-                            LOGGER.error("Arduino function recieved bad arguments")
-                            raise ArduinoException("Arduino function recieved bad arguments")
-                        else:
-                            returnData.append(line)
+    def __readLoop(self, connection) -> None:
+        """Read lines from the Arduino and hand them to the commands waiting for them."""
+        reader = _LineReader(connection)
+        while self.connection is connection:
+            try:
+                lines = reader.readLines()
+            except Exception as e:
+                if self.connection is connection:
+                    LOGGER.error(f"Error reading from Arduino: {str(e)}")
+                    self.__failPending(ArduinoException(f"Error reading from Arduino: {str(e)}"))
+                return
+
+            for line in lines:
+                self.__handleLine(line)
+
+
+    def __handleLine(self, line:str) -> None:
+        """Add a response line to its command, resolving the command on "0" or "1"."""
+        commandId = None
+        if self.taggedProtocol and line.startswith("@"):
+            tag, _, line = line[1:].partition(" ")
+            commandId = int(tag) if tag.isdigit() else None
+
+        with self._pendingLock:
+            if commandId is None:
+                # Untagged output belongs to the oldest command
+                pending = next(iter(self._pending.values()), None)
+            else:
+                pending = self._pending.get(commandId)
+            if pending is None:
+                LOGGER.warning(f"Unexpected output from Arduino: {line}")
+                return
+            if line in ("0", "1"):
+                del self._pending[pending.commandId]
+                self.__recordLatency(pending)
+
+        if line in ("0", "1") and pending.future.cancelled():
+            LOGGER.debug(f"Dropped the answer to cancelled command: {pending.command}")
+        elif line == "0":
+            pending.future.set_result(pending.lines)
+        elif line == "1":
+            LOGGER.error(f"Arduino function recieved bad arguments: {pending.command}")
+            pending.future.set_exception(ArduinoException("Arduino function recieved bad arguments"))
+        else:
+            pending.lines.append(line)
+
 
+    def __recordLatency(self, pending:_PendingCommand) -> None:
+        """Add a finished command's round trip to the latency statistics."""
+        latency = time.monotonic() - pending.sentAt
+        name = pending.command.split(" ", 1)[0]
+        with self._statsLock:
+            stats = self._latencyStats.setdefault(name, {"count": 0, "total_s": 0.0, "min_s": latency, "max_s": latency})
+            stats["count"] += 1
+            stats["total_s"] += latency
+            stats["min_s"] = min(stats["min_s"], latency)
+            stats["max_s"] = max(stats["max_s"], latency)
+            stats["last_s"] = latency
+        LOGGER.debug(f"Arduino answered {pending.command} in {latency*1000:.1f}ms")
+
+
+    def getLatencyStats(self) -> dict:
+        """Get the round-trip time of answered commands, from write to final line.
+
+        Returns:
+            dict: Per command name, e.g. "get_base_temp": count, mean_s,
+                min_s, max_s and last_s. Timers include their run time.
+        """
+        with self._statsLock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "mean_s": stats["total_s"] / stats["count"],
+                    "min_s": stats["min_s"],
+                    "max_s": stats["max_s"],
+                    "last_s": stats["last_s"],
+                }
+                for name, stats in self._latencyStats.items()
+            }
+
+
+    def __forget(self, future:Future) -> None:
+        """Stop waiting for a command's response."""
+        with self._pendingLock:
+            self._pending.pop(getattr(future, "commandId", None), None)
+
+
+    def __failPending(self, exception:Exception) -> None:
+        """Fail every command still waiting for a response."""
+        with self._pendingLock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for command in pending:
+            if not command.future.done():
+                command.future.set_exception(exception)
+
+
+    @staticmethod
+    def __then(future:Future, transform) -> Future:
+        """Get a Future resolved with transform applied to another Future's result.
+
+        Cancelling the returned Future cancels the original one.
+        """
+        result = Future()
+
+        def _resolve(done):
+            if result.cancelled():
+                return
+            try:
+                result.set_result(transform(done.result()))
+            except Exception as e:
+                result.set_exception(e)
+
+        result.add_done_callback(lambda result: result.cancelled() and future.cancel())
+        future.add_done_callback(_resolve)
+        return result
+
+
+    def __getResponse(self, request:Future, timeout_s:int=3):
+        # Wait for the reader thread to collect the data sent before the final '0'
+        try:
+            return request.result(timeout=timeout_s)
+        except FutureTimeout:
+            self.__forget(request)
             # Timed out, EMI may have fried the I2C line and caused the arduino to freeze
             # Try restarting the Serial connection to reset the arduino
-            self.refreshConnection()
             LOGGER.error("Arduino response timed out, resetting the Arduino")
+            self.refreshConnection()
             raise ArduinoTimeout("Arduino response timed out")
         except Exception as e:
             LOGGER.error(f"Error reading from Arduino: {str(e)}")
@@ -256,9 +481,9 @@ class Arduino:
             return ["0"]
 
 
-    def __getSafeResponse(self, retries=3, retryFunc=None, retryArgs=None, resetIsSuccess=False, timeout_s=3):
+    def __getSafeResponse(self, request, retries=3, retryFunc=None, retryArgs=None, resetIsSuccess=False, timeout_s=3):
         try:
-            return self.__getResponse(timeout_s=timeout_s) # Ensures Arduino completes successfully
+            return self.__getResponse(request, timeout_s=timeout_s) # Ensures Arduino completes successfully
         except ArduinoTimeout:
             if retries == 0 or resetIsSuccess: return []
 
@@ -267,7 +492,7 @@ class Arduino:
                 tryCount = 0
                 while tryCount < retries:
                     try:
-                        return retryFunc(retryArgs)
+                        return retryFunc(*retryArgs)
                     except Exception as e:
                         LOGGER.error(f"Retry attempt {tryCount+1} failed: {str(e)}")
                         tryCount += 1
@@ -275,18 +500,20 @@ class Arduino:
             return []
 
 
-    def dispense_ml(self, pumpNumber:int, volume:float):
+    def dispense_ml(self, pumpNumber:int, volume:float, blocking:bool=True):
         """Dispense the given volume in ml.
         Args:
             pump (int): Pump number
             volume (float): Volume in ml to be dispensed.
+            blocking (bool): Wait for the pump to stop. When False a Future
+                is returned instead.
         """
         # Calculate the time to turn on the pump
         time_on = int(volume / self.pump_slope[pumpNumber] * 1000)
 
         LOGGER.info(f"Dispensing {volume}ml from pump {pumpNumber}")
 
-        self.setPumpOnTimer(pumpNumber, time_on)
+        return self.setPumpOnTimer(pumpNumber, time_on, blocking=blocking)
 
 
     def __define_arduino_port(self, search_string: str) -> str:
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Hardware-Aware Experiment Scheduler
+
+This module decides when queued experiments may run. Each experiment is mapped
+to the physical resources it occupies (OT-2 robot, Arduino bases and pumps,
+potentiostat channel). Experiments that share a resource run one after another,
+experiments on independent devices run in parallel.
+
+Resource names:
+    - "ot2": the OT-2 run, claimed when the experiment has "ot2_actions"
+    - "arduino:base{n}": heater/ultrasonic base n ("base{n}_temp", "ultrasonic{n}_ms")
+    - "arduino:pump{n}": pump n ("pump{n}_ml")
+    - "potentiostat:{channel}": potentiostat channel ("channel" parameter, default 0)
+"""
+
+import asyncio
+import bisect
+import itertools
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Tuple
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+_ARDUINO_KEY = re.compile(r"^(base|pump|ultrasonic)(\d+)_")
+
+
+class ExperimentQueueFull(Exception):
+    """Raised when the scheduler cannot take more submissions."""
+    pass
+
+
+def arduino_resources(control: Dict[str, Any]) -> FrozenSet[str]:
+    """
+    Get the Arduino devices addressed by a control dictionary.
+
+    Args:
+        control: Keys such as "base0_temp", "pump1_ml" or "ultrasonic0_ms".
+            Keys set to 0 or None leave their device idle and are ignored
+
+    Returns:
+        FrozenSet[str]: Resource names such as "arduino:base0"
+    """
+    resources = set()
+    for key, value in (control or {}).items():
+        match = _ARDUINO_KEY.match(key)
+        if not match or not value:
+            continue
+        device, number = match.groups()
+        # Ultrasonic transducers sit on the heater bases
+        if device == "ultrasonic":
+            device = "base"
+        resources.add(f"arduino:{device}{number}")
+    return frozenset(resources)
+
+
+def resources_for_params(params: Dict[str, Any], measurement: bool = True) -> FrozenSet[str]:
+    """
+    Get the physical resources used by a set of experiment parameters.
+
+    Args:
+        params: Experiment parameters, as sent in the "parameters" field
+        measurement: Whether the potentiostat is used. False for workflow
+            steps that only move liquids and set up the cell
+
+    Returns:
+        FrozenSet[str]: Resource names the experiment must hold while running
+    """
+    resources = set()
+
+    if measurement:
+        resources.add(f"potentiostat:{params.get('channel', 0)}")
+
+    ot2_actions = params.get("ot2_actions") or []
+    if ot2_actions:
+        resources.add("ot2")
+    # Wash steps run the Arduino pumps from within the OT-2 action list
+    for action in ot2_actions:
+        resources |= arduino_resources(action.get("arduino_actions"))
+
+    resources |= arduino_resources(params.get("arduino_control"))
+
+    return frozenset(resources)
+
+
+def resources_for_experiment(experiment_data: Dict[str, Any]) -> FrozenSet[str]:
+    """
+    Get the physical resources used by an experiment request.
+
+    Args:
+        experiment_data: Experiment dictionary with "uo_type" and "parameters"
+
+    Returns:
+        FrozenSet[str]: Resource names the experiment must hold while running
+    """
+    return resources_for_params(experiment_data.get("parameters", {}))
+
+
+class _Job:
+    """An experiment waiting for, or holding, its resources."""
+
+    def __init__(self, job_id: str, experiment_data: Dict[str, Any],
+                 priority: int, resources: FrozenSet[str], future: asyncio.Future):
+        self.job_id = job_id
+        self.experiment_data = experiment_data
+        self.priority = priority
+        self.resources = resources
+        self.future = future
+
+
+class ExperimentScheduler:
+    """
+    Priority scheduler that serialises experiments sharing a device.
+
+    Pending jobs are considered in priority order (higher first, FIFO within a
+    priority). A job starts as soon as none of its resources are held by a
+    running job or reserved by a higher-ranked pending job, and fewer than
+    max_concurrent jobs are running. Reserving the resources of blocked jobs
+    keeps a steady stream of small jobs from starving a job that needs several
+    devices at once.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        max_concurrent: int = 5,
+        max_queued: int = 100
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            runner: Coroutine function called as runner(job_id, experiment_data)
+            max_concurrent: Maximum number of jobs running at once
+            max_queued: Maximum number of jobs waiting to start
+        """
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._sequence = itertools.count()
+        self._pending: List[Tuple[int, int, str]] = []
+        self._jobs: Dict[str, _Job] = {}
+        self._busy: Dict[str, str] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def submit(
+        self,
+        job_id: str,
+        experiment_data: Dict[str, Any],
+        priority: int = 0
+    ) -> asyncio.Future:
+        """
+        Queue an experiment. Must be called from the event loop.
+
+        Args:
+            job_id: Unique identifier of the job
+            experiment_data: Experiment dictionary passed to the runner
+            priority: Higher values start earlier
+
+        Returns:
+            asyncio.Future: Resolves to the runner's return value
+
+        Raises:
+            ExperimentQueueFull: If max_queued jobs are already waiting
+        """
+        if len(self._pending) >= self.max_queued:
+            raise ExperimentQueueFull(
+                f"Experiment queue is full ({self.max_queued} experiments waiting)"
+            )
+
+        job = _Job(job_id, experiment_data, priority,
+                   resources_for_experiment(experiment_data),
+                   asyncio.get_running_loop().create_future())
+        self._jobs[job_id] = job
+        bisect.insort(self._pending, (-priority, next(self._sequence), job_id))
+        LOGGER.info(f"Queued job {job_id} (priority {priority}) "
+                    f"needing {sorted(job.resources)}")
+
+        self._schedule()
+        return job.future
+
+    def _schedule(self) -> None:
+        """Start every pending job whose resources are free."""
+        reserved = set(self._busy)
+        started = []
+
+        for entry in self._pending:
+            if len(self._running) >= self.max_concurrent:
+                break
+            job = self._jobs[entry[2]]
+            if job.resources & reserved:
+                # Hold its resources so lower-ranked jobs can't overtake it
+                reserved |= job.resources
+                continue
+            reserved |= job.resources
+            started.append(entry)
+            self._start(job)
+
+        for entry in started:
+            self._pending.remove(entry)
+
+    def _start(self, job: _Job) -> None:
+        """Claim the job's resources and run it."""
+        for resource in job.resources:
+            self._busy[resource] = job.job_id
+        self._running[job.job_id] = asyncio.ensure_future(self._run(job))
+        LOGGER.info(f"Started job {job.job_id}")
+
+    async def _run(self, job: _Job) -> None:
+        """Run a job, then release its resources and start whatever it unblocked."""
+        try:
+            result = await self.runner(job.job_id, job.experiment_data)
+            if not job.future.done():
+                job.future.set_result(result)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            for resource in job.resources:
+                self._busy.pop(resource, None)
+            self._running.pop(job.job_id, None)
+            self._jobs.pop(job.job_id, None)
+            self._schedule()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of waiting and running jobs and the held resources."""
+        return {
+            "queue_depth": len(self._pending),
+            "running": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "busy_resources": sorted(self._busy)
+        }
+
+    def cancel_all(self) -> None:
+        """Drop pending jobs and cancel running ones."""
+        for _, _, job_id in self._pending:
+            self._jobs.pop(job_id).future.cancel()
+        self._pending.clear()
+        for task in list(self._running.values()):
+            task.cancel()
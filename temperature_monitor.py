@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Temperature Monitor
+
+This module samples the temperature of the Arduino heater bases in the
+background and keeps a timestamped history in a fixed-size ring buffer, so
+the thermal conditions around a measurement can be recorded and a workflow
+can wait until a base has settled instead of sleeping for a fixed time.
+
+Every base is read once per sample interval. When the Arduino client can
+pipeline commands (getTemp(..., blocking=False)) all bases are requested at
+once, so a sample costs one round trip and other commands are interleaved
+with it rather than queued behind it. Failed readings are stored as NaN.
+
+The firmware runs pump and sonicator timers to completion before it reads
+the next command, and its serial receive buffer only holds 64 bytes. So no
+new reads are sent while earlier ones are unanswered; those samples are
+stored as NaN. Reads left unanswered for request_timeout_s are cancelled.
+"""
+
+import logging
+import threading
+import time
+from concurrent import futures
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+
+class TemperatureMonitor:
+    """
+    Background sampler of heater base temperatures.
+
+    Timestamps are time.monotonic() seconds. Waiting threads are woken by a
+    condition variable whenever a sample is stored, so waiting costs nothing
+    between samples.
+    """
+
+    def __init__(self, arduino: Any, bases: Iterable[int] = (0, 1),
+                 interval_s: float = 1.0, capacity: int = 3600,
+                 request_timeout_s: float = 60.0):
+        """
+        Initialize the monitor.
+
+        Args:
+            arduino: Arduino client with getTemp(baseNumber)
+            bases: Base numbers to sample
+            interval_s: Time between samples (s)
+            capacity: Number of samples kept per base
+            request_timeout_s: Give up on unanswered pipelined reads after this long (s)
+        """
+        self.arduino = arduino
+        self.bases = list(bases)
+        self.interval_s = interval_s
+        self.capacity = capacity
+        self.request_timeout_s = request_timeout_s
+        # Pipelined reads not answered yet, and when they were sent
+        self._outstanding: List[futures.Future] = []
+        self._outstanding_since = 0.0
+        self._column = {base: i for i, base in enumerate(self.bases)}
+        self._times = np.full(capacity, np.nan)
+        self._temps = np.full((capacity, len(self.bases)), np.nan)
+        self._next = 0
+        self._count = 0
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="temperature-monitor", daemon=True)
+        self._thread.start()
+        LOGGER.info(f"Sampling base temperatures {self.bases} every {self.interval_s} s")
+
+    def stop(self) -> None:
+        """Stop sampling and wake every waiting thread."""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval_s + 5)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the sampler thread is running."""
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self) -> None:
+        """Sample until stopped, keeping a steady cadence."""
+        next_sample = time.monotonic()
+        while not self._stop.is_set():
+            self.sample()
+            next_sample += self.interval_s
+            # Don't try to catch up after a slow sample
+            next_sample = max(next_sample, time.monotonic())
+            self._stop.wait(next_sample - time.monotonic())
+
+    def _read_all(self) -> np.ndarray:
+        """Read every base, pipelined when the client supports it."""
+        readings = np.full(len(self.bases), np.nan)
+        if self._outstanding and not self._clear_outstanding():
+            # The Arduino is still busy with earlier reads; don't queue more
+            return readings
+
+        try:
+            requests = [self.arduino.getTemp(base, blocking=False) for base in self.bases]
+        except TypeError:
+            requests = None
+
+        if requests is not None:
+            self._outstanding = requests
+            self._outstanding_since = time.monotonic()
+            # Reads not answered within the interval are left for later samples
+            futures.wait(requests, timeout=self.interval_s)
+
+        for i, base in enumerate(self.bases):
+            try:
+                if requests is None:
+                    readings[i] = float(self.arduino.getTemp(base))
+                elif requests[i].done():
+                    readings[i] = float(requests[i].result())
+                else:
+                    LOGGER.warning(f"No temperature from base {base} yet, skipping reads until it answers")
+            except Exception as e:
+                LOGGER.warning(f"Failed to read temperature of base {base}: {str(e)}")
+        return readings
+
+    def _clear_outstanding(self) -> bool:
+        """
+        Check whether earlier pipelined reads are finished, cancelling them once too old.
+
+        Their late readings are dropped; they no longer describe the current sample.
+
+        Returns:
+            bool: True if no earlier reads are pending any more
+        """
+        if any(not request.done() for request in self._outstanding):
+            if time.monotonic() - self._outstanding_since < self.request_timeout_s:
+                return False
+            LOGGER.warning(f"No temperature readings for {self.request_timeout_s} s, cancelling the requests")
+            for request in self._outstanding:
+                request.cancel()
+        self._outstanding = []
+        return True
+
+    def sample(self) -> np.ndarray:
+        """
+        Read every base once and store the readings.
+
+        Returns:
+            np.ndarray: Temperatures in bases order, NaN where a read failed
+        """
+        readings = self._read_all()
+        with self._condition:
+            self._times[self._next] = time.monotonic()
+            self._temps[self._next] = readings
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self._condition.notify_all()
+        return readings
+
+    def history(self, base: int, since_s: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the stored readings of a base in chronological order.
+
+        Args:
+            base: Base number
+            since_s: Only readings from the last since_s seconds
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Timestamps and temperatures
+        """
+        with self._condition:
+            return self._history(self._column[base], since_s)
+
+    def _history(self, column: int, since_s: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Unroll the ring buffer; the caller holds the condition."""
+        order = (np.arange(self._count) + self._next - self._count) % self.capacity
+        times = self._times[order]
+        temps = self._temps[order, column]
+        if since_s is not None:
+            recent = times >= time.monotonic() - since_s
+            times, temps = times[recent], temps[recent]
+        return times, temps
+
+    def latest(self, base: int) -> Optional[float]:
+        """Get the most recent reading of a base, or None before the first sample."""
+        with self._condition:
+            if not self._count:
+                return None
+            return float(self._temps[(self._next - 1) % self.capacity, self._column[base]])
+
+    def _stable_for(self, column: int, target: float, tolerance: float) -> float:
+        """Get how long a base has been within tolerance of target, in s."""
+        times, temps = self._history(column)
+        outside = np.flatnonzero(~(np.abs(temps - target) <= tolerance))
+        if len(outside) and outside[-1] == len(temps) - 1:
+            return -1.0
+        # Settled from the first in-band reading after the last excursion
+        first = outside[-1] + 1 if len(outside) else 0
+        if first >= len(times):
+            return -1.0
+        return float(times[-1] - times[first])
+
+    def wait_until_stable(self, base: int, target: float, tolerance: float = 0.5,
+                          hold_s: float = 30.0, timeout_s: Optional[float] = None) -> bool:
+        """
+        Wait until a base has stayed within tolerance of a target temperature.
+
+        Args:
+            base: Base number
+            target: Target temperature (°C)
+            tolerance: Allowed deviation from target (°C)
+            hold_s: How long every reading must have been in range (s)
+            timeout_s: Give up after this long (s). None waits indefinitely
+
+        Returns:
+            bool: True once the base is stable, False on timeout or when the monitor stops
+        """
+        column = self._column[base]
+        LOGGER.info(f"Waiting for base {base} to hold {target}±{tolerance}°C for {hold_s} s")
+        start = time.monotonic()
+        with self._condition:
+            stable = self._condition.wait_for(
+                lambda: self._stop.is_set() or self._stable_for(column, target, tolerance) >= hold_s,
+                timeout=timeout_s
+            )
+            stable = stable and not self._stop.is_set()
+
+        if stable:
+            LOGGER.info(f"Base {base} stable at {target}°C after {time.monotonic() - start:.1f} s")
+        else:
+            LOGGER.warning(f"Base {base} did not settle at {target}±{tolerance}°C "
+                           f"(last reading {self.latest(base)}°C)")
+        return stable
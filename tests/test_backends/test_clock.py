@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from backends import CPBackend, CVABackend
+from backends.clock import AcceleratedClock, RealClock, VirtualClock, make_clock
+
+def test_virtual_clock_advances_on_sleep():
+    clock = VirtualClock(start=10.0)
+    clock.sleep(5.0)
+    clock.sleep_until(20.0)
+    assert clock.time() == 20.0
+
+def test_make_clock():
+    assert isinstance(make_clock(None), RealClock)
+    assert isinstance(make_clock("virtual"), VirtualClock)
+    assert make_clock({"type": "accelerated", "speedup": 50}).speedup == 50
+    with pytest.raises(ValueError):
+        make_clock("sundial")
+
+def test_cp_run_on_virtual_clock_is_instant():
+    """A 600 s CP measurement finishes without waiting in real time."""
+    clock = VirtualClock()
+    backend = CPBackend(clock=clock)
+    start = time.monotonic()
+    results = backend._execute_measurement({"duration": 600, "sample_interval": 0.1})
+    assert time.monotonic() - start < 5
+    assert len(results["voltage"]) == 6001
+    assert clock.time() == pytest.approx(600.0)
+
+def test_backend_clock_from_config(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text('{"clock": {"type": "accelerated", "speedup": 1000}}')
+    backend = CVABackend(config_path=str(config))
+    assert isinstance(backend.clock, AcceleratedClock)
@@ -0,0 +1,204 @@
+"""
+Tests for the Arduino serial protocol against a fake serial port.
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import ot2_arduino
+from ot2_arduino import Arduino, ArduinoException
+
+
+class FakeSerial:
+    """Serial port with Arduino firmware behind it.
+
+    Timers ("*_on_time") take their time in ms; other commands answer at once.
+    Tagged firmware runs commands concurrently, plain firmware one at a time.
+    """
+
+    tagged = False
+    instances = []
+
+    def __init__(self, port=None, baudrate=None, timeout=None):
+        self.port = port
+        self.timeout = timeout
+        self.written = []
+        self.reads = 0
+        self._output = bytearray()
+        self._outputReady = threading.Condition()
+        self._commands = queue.Queue()
+        self._closed = False
+        self._outputLock = threading.Lock()
+        if baudrate is not None:
+            FakeSerial.instances.append(self)
+            threading.Thread(target=self._firmware, daemon=True).start()
+
+    def write(self, data):
+        for line in data.decode().splitlines():
+            self.written.append(line)
+            self._commands.put(line)
+
+    @property
+    def in_waiting(self):
+        return len(self._output)
+
+    def read(self, size=1):
+        # Blocks like a real port: until data arrives or the timeout expires
+        with self._outputReady:
+            self.reads += 1
+            self._outputReady.wait_for(lambda: self._output or self._closed, timeout=self.timeout)
+            if self._closed:
+                raise OSError("port closed")
+            data = bytes(self._output[:size])
+            del self._output[:size]
+            return data
+
+    def close(self):
+        with self._outputReady:
+            self._closed = True
+            self._outputReady.notify_all()
+        self._commands.put(None)
+
+    def _send(self, data):
+        with self._outputReady:
+            self._output += data
+            self._outputReady.notify_all()
+
+    def _firmware(self):
+        while True:
+            line = self._commands.get()
+            if line is None:
+                return
+            if self.tagged:
+                threading.Thread(target=self._execute, args=(line,), daemon=True).start()
+            else:
+                self._execute(line)
+
+    def _execute(self, line):
+        tag = ""
+        if line.startswith("@"):
+            tag, line = line.split(" ", 1)
+            tag += " "
+        command, *args = line.split()
+        if command.endswith("_on_time"):
+            threading.Event().wait(int(args[1]) / 1000)
+        with self._outputLock:
+            if command == "get_base_temp":
+                if not args[0].isdigit():
+                    self._send(f"{tag}1\n".encode())
+                    return
+                # Sent in two pieces, like a slow serial line
+                self._send(f"{tag}2".encode())
+                threading.Event().wait(0.01)
+                self._send(b"5.5\n")
+            self._send(f"{tag}0\n".encode())
+
+
+@pytest.fixture
+def arduino_factory(monkeypatch):
+    """Build Arduinos connected to a FakeSerial."""
+    monkeypatch.setattr(ot2_arduino.serial, "Serial", FakeSerial)
+    monkeypatch.setattr(ot2_arduino.serial.tools.list_ports, "comports",
+                        lambda: [SimpleNamespace(device="/dev/ttyFAKE", description="Fake COM3 Arduino")])
+    monkeypatch.setattr(ot2_arduino.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(Arduino, "heaterSetPoints", [])
+    FakeSerial.instances = []
+    arduinos = []
+
+    def build(tagged):
+        FakeSerial.tagged = tagged
+        arduino = Arduino(taggedProtocol=tagged)
+        arduinos.append(arduino)
+        return arduino
+
+    yield build
+    for arduino in arduinos:
+        arduino.disconnect()
+
+
+def test_tagged_commands_overlap(arduino_factory):
+    """Timers on different devices run together and answers arrive out of order."""
+    arduino = arduino_factory(tagged=True)
+    assert not arduino.mockConnection
+
+    start = time.monotonic()
+    pump = arduino.setPumpOnTimer(0, 300, blocking=False)
+    sonicator = arduino.setUltrasonicOnTimer(1, 300, blocking=False)
+    temperature = arduino.getTemp(0, blocking=False)
+
+    assert temperature.result(timeout=1) == 25.5
+    assert not pump.done() and not sonicator.done()
+    pump.result(timeout=2)
+    sonicator.result(timeout=2)
+    assert time.monotonic() - start < 0.55
+
+    assert FakeSerial.instances[-1].written == [
+        f"@{pump.commandId} set_pump_on_time 0 300",
+        f"@{sonicator.commandId} set_ultrasonic_on_time 1 300",
+        f"@{sonicator.commandId + 1} get_base_temp 0",
+    ]
+
+
+def test_plain_firmware_answers_in_order(arduino_factory):
+    """Untagged responses go to the oldest command, data lines included."""
+    arduino = arduino_factory(tagged=False)
+
+    pump = arduino.setPumpOnTimer(2, 100, blocking=False)
+    temperature = arduino.getTemp(1, blocking=False)
+    assert temperature.result(timeout=2) == 25.5
+    assert pump.done()
+
+    assert arduino.getTemp(0) == 25.5
+    assert FakeSerial.instances[-1].written == ["set_pump_on_time 2 100",
+                                                "get_base_temp 1", "get_base_temp 0"]
+
+
+def test_bad_arguments_fail_the_command(arduino_factory):
+    """A "1" answer fails only the command it belongs to."""
+    arduino = arduino_factory(tagged=True)
+
+    rejected = arduino.submitCommand("get_base_temp x")
+    accepted = arduino.submitCommand("get_base_temp 0")
+    with pytest.raises(ArduinoException):
+        rejected.result(timeout=1)
+    assert accepted.result(timeout=1) == ["25.5"]
+
+
+def test_idle_reader_waits_and_tracks_latency(arduino_factory):
+    """The reader blocks while the port is idle and times each command."""
+    arduino = arduino_factory(tagged=False)
+    port = FakeSerial.instances[-1]
+
+    reads = port.reads
+    threading.Event().wait(0.2)
+    assert port.reads == reads
+
+    arduino.setPumpOnTimer(0, 100)
+    arduino.getTemp(0)
+    arduino.getTemp(1)
+    stats = arduino.getLatencyStats()
+    assert stats["set_pump_on_time"]["count"] == 1
+    assert 0.1 <= stats["set_pump_on_time"]["max_s"] < 1
+    assert stats["get_base_temp"]["count"] == 2
+    assert stats["get_base_temp"]["min_s"] <= stats["get_base_temp"]["mean_s"] <= stats["get_base_temp"]["max_s"]
+
+
+def test_cancelled_command_keeps_answers_in_order(arduino_factory):
+    """The answer to a cancelled read is dropped, not given to the next command."""
+    arduino = arduino_factory(tagged=False)
+
+    pump = arduino.setPumpOnTimer(0, 200, blocking=False)
+    stale = arduino.getTemp(0, blocking=False)
+    assert stale.cancel()
+    pump.result(timeout=2)
+
+    assert arduino.getTemp(1) == 25.5
+    assert arduino.setPumpOnTimer(1, 10, blocking=False).result(timeout=2) == []
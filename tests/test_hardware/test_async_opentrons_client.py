@@ -0,0 +1,128 @@
+"""
+Tests for the asyncio OT-2 client against local fake robot servers.
+"""
+
+import asyncio
+import os
+import sys
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from opentronsHTTPAPI_asyncClientBuilder import AsyncOpentronsClient, closeSharedSessions
+
+
+class FakeRobot:
+    """Fake OT-2 whose moves take a fixed time, served on a local port."""
+
+    def __init__(self, move_time=0.05):
+        self.move_time = move_time
+        self.commands = []
+        self.peers = set()
+        self.runner = None
+        self.port = None
+
+    async def create_run(self, request):
+        return web.json_response({"data": {"id": "run1"}}, status=201)
+
+    async def post_command(self, request):
+        self.peers.add(request.transport.get_extra_info("peername"))
+        command = (await request.json())["data"]
+        self.commands.append(command)
+        if command["commandType"] == "moveToWell":
+            await asyncio.sleep(self.move_time)
+        failed = command["params"].get("wellName") == "Z9"
+        return web.json_response({"data": {"id": f"cmd{len(self.commands)}",
+                                           "status": "failed" if failed else "succeeded",
+                                           "error": {"detail": "well does not exist"},
+                                           "result": {"labwareId": "lw1", "pipetteId": "pip1"}}},
+                                 status=201)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/runs", self.create_run)
+        app.router.add_post("/runs/run1/commands", self.post_command)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+@pytest.fixture
+def route_robots(monkeypatch):
+    """Route each fake robot IP to the port of its local server."""
+    ports = {}
+    original_request = aiohttp.ClientSession._request
+
+    def _request(session, method, url, *args, **kwargs):
+        for ip, port in ports.items():
+            url = url.replace(f"{ip}:31950", f"127.0.0.1:{port}")
+        return original_request(session, method, url, *args, **kwargs)
+
+    monkeypatch.setattr(aiohttp.ClientSession, "_request", _request)
+    return ports
+
+
+async def _prepare(ip):
+    client = await AsyncOpentronsClient.create(ip)
+    await client.loadLabware(intSlot=1, strLabwareName="opentrons_96_tiprack_1000ul")
+    await client.loadPipette(strPipetteName="p1000_single_gen2", strMount="right")
+    return client
+
+
+async def _visit(client, wells):
+    for well in wells:
+        await client.moveToWell(strLabwareName="opentrons_96_tiprack_1000ul_1",
+                                strWellName=well,
+                                strPipetteName="p1000_single_gen2")
+
+
+def test_drives_several_robots_from_one_loop(route_robots):
+    """Moves on two robots overlap on one event loop, over one pooled connection each."""
+    async def scenario():
+        robots = {"10.0.0.1": FakeRobot(), "10.0.0.2": FakeRobot()}
+        for ip, robot in robots.items():
+            await robot.start()
+            route_robots[ip] = robot.port
+
+        clients = [await _prepare(ip) for ip in robots]
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(_visit(client, ["A1", "A2", "A3", "A4"]) for client in clients))
+        elapsed = asyncio.get_running_loop().time() - start
+
+        await closeSharedSessions()
+        for robot in robots.values():
+            await robot.stop()
+        return robots, elapsed
+
+    robots, elapsed = asyncio.run(scenario())
+
+    for robot in robots.values():
+        assert len(robot.commands) == 6
+        assert len(robot.peers) == 1
+    # 4 moves of 50 ms per robot: sequential would take at least 0.4 s
+    assert elapsed < 0.4
+
+
+def test_failed_command_raises(route_robots):
+    async def scenario():
+        robot = FakeRobot()
+        await robot.start()
+        route_robots["10.0.0.3"] = robot.port
+        try:
+            async with AsyncOpentronsClient("10.0.0.3", boolSharedSession=False) as client:
+                await client.loadLabware(intSlot=1, strLabwareName="opentrons_96_tiprack_1000ul")
+                await client.loadPipette(strPipetteName="p1000_single_gen2", strMount="right")
+                with pytest.raises(Exception, match="well does not exist"):
+                    await _visit(client, ["Z9"])
+        finally:
+            await robot.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,216 @@
+"""
+Tests for the OT-2 HTTP client against a local fake robot server.
+"""
+
+import json
+import os
+import sys
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import opentronsHTTPAPI_clientBuilder
+from opentronsHTTPAPI_clientBuilder import opentronsClient, closeSharedSessions
+
+
+class FakeRobotHandler(BaseHTTPRequestHandler):
+    """Minimal subset of the OT-2 HTTP API used by opentronsClient."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _advance(self, command_id):
+        robot = self.server.robot
+        # queued commands report running once, then finish
+        status = robot.statuses[command_id]
+        if status == "queued":
+            robot.statuses[command_id] = "running"
+        elif status == "running":
+            well = robot.commands[int(command_id[3:]) - 1]["params"].get("wellName")
+            robot.statuses[command_id] = "failed" if well == "Z9" else "succeeded"
+        data = {"id": command_id, "status": robot.statuses[command_id]}
+        if data["status"] == "failed":
+            data["error"] = {"detail": "well does not exist"}
+        return data
+
+    def do_GET(self):
+        robot = self.server.robot
+        url = urlparse(self.path)
+        if url.path == "/runs/run1/commands":
+            # like the robot, the page starts at the command that is running
+            robot.list_requests += 1
+            page_length = int(parse_qs(url.query)["pageLength"][0])
+            ids = [f"cmd{i + 1}" for i in range(len(robot.commands))]
+            unfinished = [i for i, command_id in enumerate(ids)
+                          if robot.statuses[command_id] in ("queued", "running")]
+            start = unfinished[0] if unfinished else max(len(ids) - page_length, 0)
+            self._send(200, {"data": [self._advance(command_id)
+                                      for command_id in ids[start:start + page_length]]})
+            return
+        self._send(200, {"data": self._advance(url.path.rsplit("/", 1)[-1])})
+
+    def do_POST(self):
+        robot = self.server.robot
+        robot.connections.add(self.client_address)
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/runs":
+            self._send(201, {"data": {"id": "run1"}})
+        elif self.path.startswith("/runs/run1/commands"):
+            command = body["data"]
+            robot.commands.append(command)
+            command_id = f"cmd{len(robot.commands)}"
+            wait = parse_qs(urlparse(self.path).query).get("waitUntilComplete", ["True"])[0]
+            robot.waits.append(wait)
+            status = "succeeded" if wait == "True" else "queued"
+            robot.statuses[command_id] = status
+            result = {"labwareId": "lw1", "pipetteId": "pip1"}
+            self._send(201, {"data": {"id": command_id,
+                                      "commandType": command["commandType"],
+                                      "status": status,
+                                      "result": result}})
+        elif self.path == "/robot/lights":
+            self._send(200, {"on": body.get("on")})
+        else:
+            self._send(404, {"message": "not found"})
+
+
+class FakeRobot:
+    def __init__(self):
+        self.connections = set()
+        self.commands = []
+        self.statuses = {}
+        self.waits = []
+        self.list_requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeRobotHandler)
+        self.server.robot = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return "127.0.0.1"
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+
+@pytest.fixture
+def robot(monkeypatch):
+    fake = FakeRobot()
+    fake.thread.start()
+    # The client always talks to port 31950, point it at the fake server instead
+    original_request = opentronsHTTPAPI_clientBuilder.requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        url = url.replace(":31950", f":{fake.port}")
+        return original_request(session, method, url, *args, **kwargs)
+
+    monkeypatch.setattr(opentronsHTTPAPI_clientBuilder.requests.Session, "request", request)
+    yield fake
+    closeSharedSessions()
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+def test_commands_reuse_one_connection(robot):
+    """Consecutive commands are sent over a single keep-alive connection."""
+    client = opentronsClient(strRobotIP=robot.address)
+    client.loadLabware(intSlot=1, strLabwareName="opentrons_96_tiprack_1000ul")
+    client.loadPipette(strPipetteName="p1000_single_gen2", strMount="right")
+    for _ in range(5):
+        client.moveToWell(strLabwareName="opentrons_96_tiprack_1000ul_1",
+                          strWellName="A1",
+                          strPipetteName="p1000_single_gen2")
+
+    assert len(robot.commands) == 7
+    assert len(robot.connections) == 1
+
+
+def test_clients_share_session_per_robot(robot):
+    """Clients pointed at the same robot share one pooled session."""
+    client_a = opentronsClient(strRobotIP=robot.address)
+    client_b = opentronsClient(strRobotIP=robot.address)
+    client_c = opentronsClient(strRobotIP=robot.address, boolSharedSession=False)
+
+    assert client_a.session is client_b.session
+    assert client_c.session is not client_a.session
+    assert client_a.timeout == (5.0, 300.0)
+
+
+def test_queued_commands_resolve_in_background(robot):
+    """Commands sent without waiting return futures resolved by the poller."""
+    client = opentronsClient(strRobotIP=robot.address,
+                             boolWaitUntilComplete=False,
+                             fltPollInterval=0.01)
+    client.loadLabware(intSlot=1, strLabwareName="opentrons_96_tiprack_1000ul")
+    client.loadPipette(strPipetteName="p1000_single_gen2", strMount="right")
+
+    handles = [
+        client.moveToWell(strLabwareName="opentrons_96_tiprack_1000ul_1",
+                          strWellName=well,
+                          strPipetteName="p1000_single_gen2")
+        for well in ["A1", "A2", "A3"]
+    ]
+    client.waitForCommands(fltTimeout=5)
+
+    assert [handle.result()["status"] for handle in handles] == ["succeeded"] * 3
+    client.close()
+
+
+def test_failed_queued_command_raises(robot):
+    """A command that fails on the robot surfaces through its future and waitForCommands."""
+    client = opentronsClient(strRobotIP=robot.address,
+                             boolWaitUntilComplete=False,
+                             fltPollInterval=0.01)
+    client.loadLabware(intSlot=1, strLabwareName="opentrons_96_tiprack_1000ul")
+    client.loadPipette(strPipetteName="p1000_single_gen2", strMount="right")
+
+    handle = client.moveToWell(strLabwareName="opentrons_96_tiprack_1000ul_1",
+                               strWellName="Z9",
+                               strPipetteName="p1000_single_gen2")
+    with pytest.raises(Exception, match="Failed to move pipette"):
+        client.waitForCommands(fltTimeout=5)
+    with pytest.raises(Exception, match="well does not exist"):
+        handle.result()
+    client.close()
+
+
+def test_command_batch_queues_commands_and_tracks_the_run(robot):
+    """Commands in a batch are queued without waiting and resolved from the run's command list."""
+    client = opentronsClient(strRobotIP=robot.address, fltPollInterval=0.01)
+    client.loadLabware(intSlot=1, strLabwareName="opentrons_96_tiprack_1000ul")
+    client.loadPipette(strPipetteName="p1000_single_gen2", strMount="right")
+
+    with client.commandBatch(fltTimeout=5):
+        handles = [
+            client.moveToWell(strLabwareName="opentrons_96_tiprack_1000ul_1",
+                              strWellName=well,
+                              strPipetteName="p1000_single_gen2")
+            for well in ["A1", "A2", "A3", "A4"]
+        ]
+
+    assert all(handle.done() for handle in handles)
+    assert [handle.result()["status"] for handle in handles] == ["succeeded"] * 4
+    assert robot.waits[-4:] == ["False"] * 4
+    assert robot.list_requests > 0
+    # the client is back to blocking commands after the batch
+    assert client.moveToWell(strLabwareName="opentrons_96_tiprack_1000ul_1",
+                             strWellName="A5",
+                             strPipetteName="p1000_single_gen2")["status"] == "succeeded"
+    client.close()
@@ -0,0 +1,55 @@
+"""
+Tests for the labware registry and deck well index.
+"""
+
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from labware_registry import DeckLayout, LabwareError, LabwareRegistry
+
+LABWARE_DIR = os.path.join(os.path.dirname(__file__), '..', 'labware')
+
+
+def test_well_positions_in_deck_frame():
+    registry = LabwareRegistry(LABWARE_DIR)
+    deck = DeckLayout()
+    deck.place(2, registry.load("nis_15_wellplate_3895ul"), name="reactor_plate")
+
+    # A1 sits at (18.38, 74.24, 3.81) in the plate, 10.54 mm deep; slot 2 starts at x = 132.5
+    np.testing.assert_allclose(deck.well_position("reactor_plate", "A1", origin="bottom"),
+                               [150.88, 74.24, 3.81])
+    np.testing.assert_allclose(deck.well_position(2, "A1", origin="top", offset={"z": 5}),
+                               [150.88, 74.24, 19.35])
+    assert len(deck.well_positions("reactor_plate")) == 15
+    assert not deck.has_well("reactor_plate", "D1")
+    with pytest.raises(LabwareError):
+        deck.well_position("reactor_plate", "D1")
+
+
+def test_definitions_are_cached_by_content(tmp_path):
+    for load_name in ("nis_15_wellplate_3895ul", "nistall_4_tiprack_1ul"):
+        shutil.copy(os.path.join(LABWARE_DIR, f"{load_name}.json"), tmp_path)
+    registry = LabwareRegistry(str(tmp_path))
+
+    plate = registry.load("nis_15_wellplate_3895ul")
+    assert registry.load("nis_15_wellplate_3895ul") is plate
+    assert registry.load("nistall_4_tiprack_1ul").is_tiprack
+
+    # Rewriting a file with the same content reuses the parsed definition
+    path = tmp_path / "nis_15_wellplate_3895ul.json"
+    content = path.read_bytes()
+    path.write_bytes(content)
+    os.utime(path, ns=(0, 0))
+    assert registry.load("nis_15_wellplate_3895ul") is plate
+
+    path.write_bytes(content.replace(b'"depth": 10.54', b'"depth": 12.0', 1))
+    assert registry.load("nis_15_wellplate_3895ul") is not plate
+
+    with pytest.raises(LabwareError):
+        registry.load("missing_labware")
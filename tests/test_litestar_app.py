@@ -0,0 +1,99 @@
+"""
+Tests for running experiments off the Litestar event loop.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+import pytest
+from litestar.testing import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+EXPERIMENT = {"uo_type": "OCV", "parameters": {"duration": 1}}
+
+
+class SlowDispatcher:
+    """Dispatcher whose experiments run until they are released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def execute_experiment(self, experiment_data):
+        self.started.set()
+        self.release.wait(timeout=10)
+        return {"status": "success", "results": {"voltage": [0.8]}}
+
+    def cleanup(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def litestar_app(tmp_path_factory):
+    # Importing the app opens api_server.log in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("api"))
+    try:
+        return importlib.import_module("api.litestar_app")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(litestar_app, monkeypatch):
+    manager = litestar_app.ExperimentManager(max_concurrent=1, max_queued=1)
+    manager.dispatcher = SlowDispatcher()
+    monkeypatch.setattr(litestar_app, "experiment_manager", manager)
+    with TestClient(app=litestar_app.app) as client:
+        yield client
+        manager.dispatcher.release.set()
+
+
+def _wait_for_status(client, experiment_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get(f"/experiments/{experiment_id}").json()["data"]
+        if data["status"] == status:
+            return data
+        time.sleep(0.02)
+    pytest.fail(f"Experiment {experiment_id} never became {status}")
+
+
+def test_requests_are_answered_while_an_experiment_runs(client, litestar_app):
+    dispatcher = litestar_app.experiment_manager.dispatcher
+    response = client.post("/experiments", json=EXPERIMENT)
+    assert response.status_code == 201
+    experiment_id = response.json()["experiment_id"]
+    assert dispatcher.started.wait(timeout=5)
+
+    # The dispatcher is still blocked, yet the event loop answers at once
+    start = time.monotonic()
+    response = client.get(f"/experiments/{experiment_id}")
+    assert time.monotonic() - start < 1.0
+    assert response.json()["data"]["status"] == "running"
+    assert client.get("/health").json()["experiments"]["running"] == 1
+
+    dispatcher.release.set()
+    data = _wait_for_status(client, experiment_id, "completed")
+    assert data["result"]["results"]["voltage"] == [0.8]
+
+
+def test_queue_bound_is_enforced(client, litestar_app):
+    dispatcher = litestar_app.experiment_manager.dispatcher
+    running = client.post("/experiments", json=EXPERIMENT).json()["experiment_id"]
+    assert dispatcher.started.wait(timeout=5)
+
+    # One experiment may wait behind the running one; the next is refused
+    queued = client.post("/experiments", json=EXPERIMENT)
+    assert queued.status_code == 201
+    refused = client.post("/experiments", json=EXPERIMENT)
+    assert refused.status_code == 503
+    assert len(client.get("/experiments").json()["data"]["experiments"]) == 2
+
+    dispatcher.release.set()
+    _wait_for_status(client, running, "completed")
+    _wait_for_status(client, queued.json()["experiment_id"], "completed")
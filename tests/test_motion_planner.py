@@ -0,0 +1,55 @@
+"""
+Tests for the gantry travel-time model and visit-order optimiser.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from motion_planner import GantryModel, MotionPlanner
+
+WELLS = {"A1": (0.0, 0.0), "A2": (100.0, 0.0), "A3": (10.0, 0.0), "A4": (110.0, 0.0)}
+
+
+def _position(action):
+    if action.get("well") not in WELLS:
+        return None
+    return np.array(WELLS[action["well"]] + (50.0,))
+
+
+def _move(well, **extra):
+    return dict({"action": "move_to", "labware": "plate", "well": well}, **extra)
+
+
+def test_travel_time_model():
+    model = GantryModel(z_speed=100.0, clearance=10.0, overhead=0.0)
+    # 10 mm up, 100 mm across, 10 mm down at 100 mm/s
+    assert model.travel_time([0, 0, 50], [100, 0, 50]) == pytest.approx(1.2)
+    # Straight down within the same well
+    assert model.travel_time([0, 0, 50], [0, 0, 30]) == pytest.approx(0.2)
+
+
+def test_reorders_only_marked_visits():
+    planner = MotionPlanner(_position, GantryModel(overhead=0.0))
+    wash = {"action": "wash", "arduino_actions": {"pump0_ml": 1.0}}
+    actions = [
+        {"action": "pick_up_tip", "labware": "plate", "well": "A1"},
+        _move("A2", reorderable=True), wash,
+        _move("A3", reorderable=True),
+        _move("A4", reorderable=True),
+        {"action": "drop_tip", "labware": "plate", "well": "A1"},
+    ]
+
+    planned = planner.optimize(actions)
+
+    assert [action.get("well") for action in planned] == ["A1", "A3", "A2", None, "A4", "A1"]
+    # The wash stays with the well it was written after
+    assert planned[planned.index(wash) - 1]["well"] == "A2"
+    assert planner.estimate(planned)[0] < planner.estimate(actions)[0]
+
+    unmarked = [dict(action, reorderable=False) for action in actions]
+    assert planner.optimize(unmarked) == unmarked
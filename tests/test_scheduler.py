@@ -0,0 +1,96 @@
+"""
+Tests for the hardware-aware experiment scheduler.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scheduler import ExperimentScheduler, ExperimentQueueFull, resources_for_experiment
+
+
+def _experiment(channel=0, **arduino_control):
+    return {"uo_type": "CVA",
+            "parameters": {"channel": channel, "arduino_control": arduino_control}}
+
+
+def test_resources_for_experiment():
+    experiment = _experiment(channel=1, base0_temp=25.0, ultrasonic0_ms=100, pump2_ml=1.0)
+    experiment["parameters"]["ot2_actions"] = [{"action": "home"}]
+
+    assert resources_for_experiment(experiment) == {
+        "potentiostat:1", "ot2", "arduino:base0", "arduino:pump2"
+    }
+    assert resources_for_experiment({"parameters": {}}) == {"potentiostat:0"}
+    # Generated workflows list every device, with 0 for the idle ones
+    assert resources_for_experiment(_experiment(pump0_ml=0.0, ultrasonic0_ms=0)) == {"potentiostat:0"}
+
+
+def _run(jobs, max_concurrent=5):
+    """Submit (job_id, experiment, priority) tuples and record start/end order."""
+    events = []
+
+    async def runner(job_id, experiment_data):
+        events.append(("start", job_id))
+        await asyncio.sleep(0.01)
+        events.append(("end", job_id))
+        return job_id
+
+    async def scenario():
+        scheduler = ExperimentScheduler(runner, max_concurrent=max_concurrent)
+        futures = [scheduler.submit(*job) for job in jobs]
+        return await asyncio.gather(*futures)
+
+    results = asyncio.run(scenario())
+    return results, events
+
+
+def test_conflicting_jobs_run_serially_independent_in_parallel():
+    results, events = _run([
+        ("a", _experiment(channel=0, base0_temp=25.0), 0),
+        ("b", _experiment(channel=1, base0_temp=30.0), 0),
+        ("c", _experiment(channel=2, base1_temp=30.0), 0),
+    ])
+
+    assert results == ["a", "b", "c"]
+    # a and c share nothing and start together; b waits for base0
+    assert events[:2] == [("start", "a"), ("start", "c")]
+    assert events.index(("start", "b")) > events.index(("end", "a"))
+
+
+def test_priority_order():
+    _, events = _run([
+        ("running", _experiment(channel=0), 0),
+        ("low", _experiment(channel=1), 0),
+        ("high", _experiment(channel=2), 5),
+    ], max_concurrent=1)
+
+    starts = [job for kind, job in events if kind == "start"]
+    assert starts == ["running", "high", "low"]
+
+
+def test_blocked_job_reserves_its_resources():
+    _, events = _run([
+        ("running", _experiment(channel=1), 0),
+        ("big", _experiment(channel=1, base0_temp=25.0), 0),
+        ("small", _experiment(channel=2, base0_temp=25.0), 0),
+    ])
+
+    # base0 is free, but small must not take it ahead of the older big job
+    assert events.index(("start", "small")) > events.index(("start", "big"))
+
+
+def test_queue_limit():
+    async def scenario():
+        scheduler = ExperimentScheduler(asyncio.sleep, max_concurrent=1, max_queued=1)
+        scheduler.submit("a", _experiment(), 0)
+        scheduler.submit("b", _experiment(), 0)
+        with pytest.raises(ExperimentQueueFull):
+            scheduler.submit("c", _experiment(), 0)
+        scheduler.cancel_all()
+
+    asyncio.run(scenario())
@@ -0,0 +1,119 @@
+"""
+Tests for the background temperature monitor.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from temperature_monitor import TemperatureMonitor
+
+
+class FakeArduino:
+    """Arduino whose base 0 heats towards 40 °C and base 1 stays at 25 °C."""
+
+    def __init__(self, heat_s=0.2):
+        self.start = time.monotonic()
+        self.heat_s = heat_s
+        self.requests = 0
+
+    def getTemp(self, baseNumber, blocking=True):
+        self.requests += 1
+        if baseNumber == 0:
+            progress = min(1.0, (time.monotonic() - self.start) / self.heat_s)
+            temperature = 25.0 + 15.0 * progress
+        else:
+            temperature = 25.0
+        if blocking:
+            return temperature
+        future = Future()
+        future.set_result(temperature)
+        return future
+
+
+def test_ring_buffer_keeps_latest_samples():
+    monitor = TemperatureMonitor(FakeArduino(), bases=[0, 1], capacity=4)
+    for _ in range(6):
+        monitor.sample()
+
+    times, temps = monitor.history(1)
+    assert len(times) == 4
+    assert np.all(np.diff(times) >= 0)
+    assert np.all(temps == 25.0)
+    assert monitor.latest(0) >= 25.0
+
+
+def test_wait_until_stable():
+    monitor = TemperatureMonitor(FakeArduino(heat_s=0.2), bases=[0, 1], interval_s=0.01)
+    monitor.start()
+    try:
+        start = time.monotonic()
+        assert monitor.wait_until_stable(0, 40.0, tolerance=0.5, hold_s=0.1, timeout_s=5)
+        # Heating alone takes most of the wait, plus the hold time
+        assert time.monotonic() - start >= 0.25
+        assert abs(monitor.latest(0) - 40.0) <= 0.5
+
+        # Never reaches 60 °C
+        assert not monitor.wait_until_stable(1, 60.0, hold_s=0.0, timeout_s=0.1)
+    finally:
+        monitor.stop()
+
+
+def test_stop_wakes_waiters():
+    monitor = TemperatureMonitor(FakeArduino(), bases=[0], interval_s=0.01)
+    monitor.start()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(monitor.wait_until_stable(0, 90.0)))
+    waiter.start()
+    time.sleep(0.05)
+    monitor.stop()
+    waiter.join(timeout=2)
+    assert result == [False]
+
+
+class BusyArduino(FakeArduino):
+    """Arduino that doesn't answer reads until released, like one running a timer."""
+
+    def __init__(self):
+        super().__init__()
+        self.pending = []
+
+    def getTemp(self, baseNumber, blocking=True):
+        self.requests += 1
+        future = Future()
+        self.pending.append(future)
+        return future
+
+    def release(self):
+        for future in self.pending:
+            if not future.cancelled():
+                future.set_result(30.0)
+
+
+def test_no_reads_queued_while_unanswered():
+    arduino = BusyArduino()
+    monitor = TemperatureMonitor(arduino, bases=[0, 1], interval_s=0.01, request_timeout_s=0.5)
+
+    first = monitor.sample()
+    for _ in range(5):
+        assert np.all(np.isnan(monitor.sample()))
+    assert np.all(np.isnan(first))
+    # One read per base, however many samples were taken
+    assert arduino.requests == 2
+
+    # Once answered, reads resume
+    arduino.release()
+    monitor.sample()
+    assert arduino.requests == 4
+
+    # Reads that stay unanswered are cancelled after request_timeout_s
+    time.sleep(0.5)
+    monitor.sample()
+    assert all(future.cancelled() for future in arduino.pending[2:4])
+    assert arduino.requests == 6
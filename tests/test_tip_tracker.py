@@ -0,0 +1,70 @@
+"""
+Tests for the tip tracker.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from labware_registry import DeckLayout, standard_tiprack_definition
+from tip_tracker import OutOfTipsError, TipTracker
+
+
+def _add_rack(tracker, name="tip_rack", load_name="opentrons_96_tiprack_300ul", slot=1):
+    deck = DeckLayout()
+    definition = standard_tiprack_definition("opentrons_96_tiprack_300ul")
+    deck.place(slot, definition, name=name)
+    positions = deck.well_positions(name)
+    return tracker.add_rack(name, load_name, slot, definition.well_names,
+                            [positions[well] for well in definition.well_names])
+
+
+def test_allocates_in_order_or_nearest(tmp_path):
+    tracker = TipTracker(str(tmp_path / "tips.json"))
+    _add_rack(tracker)
+
+    assert tracker.allocate("tip_rack") == ("tip_rack", "A1")
+    tracker.picked_up("tip_rack", "A1")
+    assert tracker.allocate("tip_rack") == ("tip_rack", "B1")
+
+    # H12 is the front-right corner of the rack
+    near_h12 = np.array([14.38 + 9 * 11, 74.38 - 9 * 7, 0.0])
+    assert tracker.allocate(near=near_h12) == ("tip_rack", "H12")
+
+    tracker.dropped("tip_rack", "A1")
+    assert tracker.allocate("tip_rack") == ("tip_rack", "A1")
+
+
+def test_state_survives_restarts(tmp_path):
+    state_file = str(tmp_path / "tips.json")
+    tracker = TipTracker(state_file)
+    _add_rack(tracker)
+    for well in ("A1", "B1", "C1"):
+        tracker.picked_up("tip_rack", well)
+    tracker.dropped("trash", "A1")
+
+    restored = _add_rack(TipTracker(state_file))
+    assert restored.remaining == 93
+    assert restored.next_tip() == "D1"
+
+    # A different rack type under the same name starts full
+    replaced = _add_rack(TipTracker(state_file), load_name="opentrons_96_tiprack_1000ul")
+    assert replaced.remaining == 96
+
+
+def test_empty_rack_raises_and_resets():
+    tracker = TipTracker(state_file=None)
+    rack = _add_rack(tracker)
+    for well in rack.wells:
+        tracker.picked_up("tip_rack", well)
+
+    with pytest.raises(OutOfTipsError):
+        tracker.allocate("tip_rack")
+    assert tracker.return_well("tip_rack") == "H12"
+
+    tracker.reset()
+    assert tracker.allocate() == ("tip_rack", "A1")
@@ -0,0 +1,220 @@
+"""
+Tests for scheduling Arduino control actions with dependencies.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from utils import utils
+from utils.utils import plan_arduino_actions, schedule_arduino_actions
+
+
+class BlockingArduino:
+    """Arduino client whose methods return when the device is done."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _run(self, name, seconds):
+        self.calls.append((name, time.monotonic()))
+        time.sleep(seconds)
+
+    def setTemp(self, baseNumber, targetTemp):
+        self._run(f"base{baseNumber}", 0)
+
+    def dispense_ml(self, pumpNumber, volume):
+        self._run(f"pump{pumpNumber}", volume / 10)
+
+    def setUltrasonicOnTimer(self, baseNumber, timeOn_ms):
+        self._run(f"ultrasonic{baseNumber}", timeOn_ms / 1000)
+
+
+class PipelinedArduino(BlockingArduino):
+    """Arduino client that can return a Future instead of waiting."""
+
+    def _timer(self, name, seconds, blocking):
+        if blocking:
+            return self._run(name, seconds)
+        self.calls.append((name, time.monotonic()))
+        done = futures.Future()
+        threading.Timer(seconds, done.set_result, args=(["0"],)).start()
+        return done
+
+    def dispense_ml(self, pumpNumber, volume, blocking=True):
+        return self._timer(f"pump{pumpNumber}", volume / 10, blocking)
+
+    def setUltrasonicOnTimer(self, baseNumber, timeOn_ms, blocking=True):
+        return self._timer(f"ultrasonic{baseNumber}", timeOn_ms / 1000, blocking)
+
+
+def test_default_plan_is_sequential():
+    order, dependencies, measure_after = plan_arduino_actions(
+        {"base0_temp": 60, "pump0_ml": 2.5, "ultrasonic0_ms": 3000})
+    assert order == ["base0_temp", "pump0_ml", "ultrasonic0_ms"]
+    assert dependencies == {"base0_temp": [], "pump0_ml": ["base0_temp"], "ultrasonic0_ms": ["pump0_ml"]}
+    assert measure_after == order
+
+
+def test_plan_starts_actions_after_their_dependencies():
+    order, _, _ = plan_arduino_actions({
+        "base0_temp": 60, "pump0_ml": 2.5, "ultrasonic0_ms": 3000,
+        "depends_on": {"base0_temp": ["ultrasonic0_ms"], "ultrasonic0_ms": ["pump0_ml"]}})
+    assert order == ["pump0_ml", "ultrasonic0_ms", "base0_temp"]
+
+
+@pytest.mark.parametrize("control", [
+    {"pump0_ml": 1, "measure_after": ["pump1_ml"]},
+    {"pump0_ml": 1, "depends_on": {"pump0_ml": ["ultrasonic0_ms"]}},
+    {"pump0_ml": 1, "ultrasonic0_ms": 10,
+     "depends_on": {"pump0_ml": ["ultrasonic0_ms"], "ultrasonic0_ms": ["pump0_ml"]}},
+])
+def test_invalid_plans(control):
+    with pytest.raises(ValueError):
+        plan_arduino_actions(control)
+
+
+@pytest.mark.parametrize("arduino_class", [BlockingArduino, PipelinedArduino])
+def test_independent_actions_overlap(arduino_class):
+    """Sonication doesn't wait for the pump; the temperature waits for both."""
+    arduino = arduino_class()
+    control = {
+        "pump0_ml": 2.0,
+        "ultrasonic1_ms": 200,
+        "base1_temp": 40,
+        "depends_on": {"base1_temp": ["pump0_ml", "ultrasonic1_ms"]},
+        "measure_after": ["pump0_ml"]
+    }
+
+    # A shared lock only serialises writes for clients that return futures
+    lock = threading.Lock() if arduino_class is PipelinedArduino else None
+    start = time.monotonic()
+    actions = schedule_arduino_actions(control, arduino, lock=lock)
+    futures.wait(actions.values(), timeout=2)
+    elapsed = time.monotonic() - start
+
+    assert all(action.result() for action in actions.values())
+    assert elapsed < 0.35
+    started = dict(arduino.calls)
+    assert started["base1"] >= max(started["pump0"], started["ultrasonic1"]) + 0.15
+
+
+def test_failed_action_does_not_block_dependents():
+    arduino = BlockingArduino()
+    arduino.dispense_ml = lambda pumpNumber, volume: 1 / 0
+
+    actions = schedule_arduino_actions({"pump0_ml": 1, "base0_temp": 30}, arduino)
+    futures.wait(actions.values(), timeout=2)
+    assert actions["pump0_ml"].result() is False
+    assert actions["base0_temp"].result() is True
+
+
+class FrozenArduino(PipelinedArduino):
+    """Arduino that accepts commands but never answers them."""
+
+    pump_slope = [10.0]
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.refreshes = 0
+
+    def _timer(self, name, seconds, blocking):
+        self.calls.append((name, time.monotonic()))
+        request = futures.Future()
+        self.requests.append(request)
+        return request
+
+    def refreshConnection(self):
+        self.refreshes += 1
+
+
+def test_unanswered_action_times_out(monkeypatch):
+    monkeypatch.setattr(utils, "ACTION_TIMEOUT_MARGIN_S", 0.1)
+    arduino = FrozenArduino()
+
+    start = time.monotonic()
+    actions = schedule_arduino_actions({"pump0_ml": 1.0, "ultrasonic0_ms": 100}, arduino)
+    done, _ = futures.wait(actions.values(), timeout=2)
+    elapsed = time.monotonic() - start
+
+    # Each action gets its own duration plus the margin, one after the other
+    assert len(done) == 2
+    assert 0.4 <= elapsed < 1.0
+    assert [action.result() for action in actions.values()] == [False, False]
+    assert arduino.refreshes == 2
+    assert all(request.cancelled() for request in arduino.requests)
+
+
+class SerialArduino(PipelinedArduino):
+    """Plain firmware: runs one command at a time and answers in order."""
+
+    pump_slope = [10.0]
+
+    def __init__(self):
+        super().__init__()
+        self.refreshes = 0
+        self.queue = []
+        self.condition = threading.Condition()
+        threading.Thread(target=self._firmware, daemon=True).start()
+
+    def _timer(self, name, seconds, blocking):
+        request = futures.Future()
+        with self.condition:
+            self.queue.append((name, seconds, request))
+            self.condition.notify()
+        return request
+
+    def setTemp(self, baseNumber, targetTemp, blocking=True):
+        return self._timer(f"base{baseNumber}", 0, blocking)
+
+    def _firmware(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue)
+                name, seconds, request = self.queue.pop(0)
+            self.calls.append((name, time.monotonic()))
+            time.sleep(seconds)
+            if not request.done():
+                request.set_result(["0"])
+
+    def refreshConnection(self):
+        self.refreshes += 1
+
+
+def test_deadline_counts_from_when_plain_firmware_starts_the_action(monkeypatch):
+    monkeypatch.setattr(utils, "ACTION_TIMEOUT_MARGIN_S", 0.1)
+    arduino = SerialArduino()
+
+    # The sonicator is written at once but waits 0.3 s behind the pump
+    actions = schedule_arduino_actions({"base0_temp": 60, "pump0_ml": 3.0, "ultrasonic1_ms": 300,
+                                        "depends_on": {"ultrasonic1_ms": []}}, arduino)
+    done, _ = futures.wait(actions.values(), timeout=2)
+
+    assert len(done) == 3
+    assert all(action.result() for action in actions.values())
+    assert [name for name, _ in arduino.calls] == ["base0", "pump0", "ultrasonic1"]
+    assert arduino.refreshes == 0
+
+
+def test_no_reset_while_other_actions_are_in_flight(monkeypatch):
+    monkeypatch.setattr(utils, "ACTION_TIMEOUT_MARGIN_S", 0.1)
+    arduino = FrozenArduino()
+    refreshed_with = []
+    arduino.refreshConnection = lambda: refreshed_with.append(
+        [request.done() for request in arduino.requests])
+
+    actions = schedule_arduino_actions({"pump0_ml": 1.0, "ultrasonic0_ms": 100,
+                                        "depends_on": {"ultrasonic0_ms": []}}, arduino)
+    done, _ = futures.wait(actions.values(), timeout=2)
+
+    assert len(done) == 2
+    assert [action.result() for action in actions.values()] == [False, False]
+    # Only the last expiry resets the Arduino, once nothing else is pending
+    assert refreshed_with == [[True, True]]
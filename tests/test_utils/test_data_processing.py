@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import savgol_filter
+
+from utils.data_processing import (CVCycleTracker, StreamingSmoother, analyze_cv_batch, analyze_cv_files,
+                                   cv_cycle_features, pad_series, smooth_data)
+from utils.result_store import save_results
+
+def _voltammogram(n, seed):
+    rng = np.random.default_rng(seed)
+    voltage = np.concatenate((np.linspace(-0.2, 0.8, n // 2), np.linspace(0.8, -0.2, n - n // 2)))
+    current = np.sin(4 * voltage) * np.repeat([1.0, -1.0], [n // 2, n - n // 2]) + rng.normal(0, 0.02, n)
+    return voltage, current
+
+def _reference(voltage, current, window_size=5):
+    """One voltammogram at a time, as process_cv_data does it."""
+    smooth = pd.Series(current).rolling(window=window_size, center=True).mean().bfill().ffill().values
+    anodic, cathodic = np.argmax(smooth), np.argmin(smooth)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        didv = np.gradient(smooth, voltage)
+    return voltage[anodic], smooth[anodic], voltage[cathodic], smooth[cathodic], np.nanmax(didv[np.isfinite(didv)])
+
+@pytest.mark.parametrize("window_size", [4, 5])
+def test_batch_matches_single_analysis(window_size):
+    cvs = [_voltammogram(n, seed) for seed, n in enumerate([40, 101, 250, 64])]
+    features = analyze_cv_batch([v for v, _ in cvs], [c for _, c in cvs],
+                                experiment=["a", "a", "b", "c"], cycle=[1, 2, 1, 1],
+                                scan_rate=0.05, window_size=window_size)
+
+    assert list(features["n_points"]) == [40, 101, 250, 64]
+    assert list(features["cycle"]) == [1, 2, 1, 1]
+    for row, (voltage, current) in zip(features.itertuples(), cvs):
+        e_pa, i_pa, e_pc, i_pc, max_didv = _reference(voltage, current, window_size)
+        assert (row.e_pa, row.e_pc) == (e_pa, e_pc)
+        assert row.i_pa == pytest.approx(i_pa)
+        assert row.i_pc == pytest.approx(i_pc)
+        assert row.delta_ep == pytest.approx(e_pa - e_pc)
+        assert row.peak_ratio == pytest.approx(i_pa / abs(i_pc))
+        assert row.max_didv == pytest.approx(max_didv)
+
+def test_padded_input_and_short_series():
+    cvs = [_voltammogram(30, 0), _voltammogram(3, 1)]
+    voltage, lengths = pad_series([v for v, _ in cvs])
+    current, _ = pad_series([c for _, c in cvs])
+    assert voltage.shape == (2, 30)
+    assert np.isnan(voltage[1, 3:]).all()
+
+    features = analyze_cv_batch(voltage, current, lengths=lengths)
+    assert features.loc[0, "e_pa"] == analyze_cv_batch([cvs[0][0]], [cvs[0][1]]).loc[0, "e_pa"]
+    # Too short for the smoothing window
+    assert np.isnan(features.loc[1, "i_pa"])
+
+def test_analyze_cv_files(tmp_path):
+    voltage, current = _voltammogram(80, 3)
+    cycles = [{"cycle": i + 1, "voltage": voltage.tolist(), "current": (current * (i + 1)).tolist()} for i in range(2)]
+    single = save_results({"results": {"type": "single", "results": cycles, "parameters": {"scan_rate": 0.1}}},
+                          str(tmp_path / "cva_1.json"))
+    nested = save_results({"results": {"type": "nested", "parameters": {"scan_rate": 0.2},
+                                       "results": [{"loop_value": 25, "results": cycles[:1]},
+                                                   {"loop_value": 40, "results": cycles[1:]}]}},
+                          str(tmp_path / "cva_2.json"))
+
+    features = analyze_cv_files([single, nested])
+    assert list(features["experiment"]) == ["cva_1", "cva_1", "cva_2", "cva_2"]
+    assert features["loop_value"].isna().tolist() == [True, True, False, False]
+    assert list(features["loop_value"][2:]) == [25, 40]
+    assert list(features["scan_rate"]) == [0.1, 0.1, 0.2, 0.2]
+    assert features.loc[1, "i_pa"] == pytest.approx(2 * features.loc[0, "i_pa"])
+
+@pytest.mark.parametrize("window_size", [1, 4, 5, 9])
+def test_moving_average_matches_pandas(window_size):
+    data = np.random.default_rng(4).normal(size=60).cumsum()
+    expected = pd.Series(data).rolling(window=window_size, center=True).mean().bfill().ffill().values
+    np.testing.assert_allclose(smooth_data(data, window_size), expected)
+
+    # In place
+    smooth_data(data, window_size, out=data)
+    np.testing.assert_allclose(data, expected)
+
+@pytest.mark.parametrize("window_size, polyorder", [(5, 2), (7, 3), (3, 0)])
+def test_savgol_matches_scipy(window_size, polyorder):
+    data = np.random.default_rng(5).normal(size=60).cumsum()
+    np.testing.assert_allclose(smooth_data(data, window_size, method="savgol", polyorder=polyorder),
+                               savgol_filter(data, window_size, polyorder, mode="interp"))
+    with pytest.raises(ValueError):
+        smooth_data(data, 4, method="savgol")
+
+@pytest.mark.parametrize("window_size, method", [(4, "moving_average"), (5, "moving_average"), (7, "savgol")])
+def test_streaming_smoother_matches_batch(window_size, method):
+    data = np.random.default_rng(6).normal(size=50).cumsum()
+    smoother = StreamingSmoother(window_size, method=method, out=np.empty(data.size))
+
+    pieces = [smoother.push(value) for value in data]
+    assert sum(len(piece) for piece in pieces) == data.size - (window_size - 1 - window_size // 2)
+    pieces.append(smoother.flush())
+
+    expected = smooth_data(data, window_size, method=method)
+    np.testing.assert_allclose(np.concatenate(pieces), expected)
+    np.testing.assert_allclose(smoother.out, expected)
+
+def test_short_series_are_nan():
+    assert np.isnan(smooth_data(np.arange(3.0), 5)).all()
+    smoother = StreamingSmoother(5)
+    for value in range(3):
+        assert len(smoother.push(value)) == 0
+    assert np.isnan(smoother.flush()).all()
+
+def test_cycle_features_and_charge():
+    time = np.linspace(0.0, 2.0, 201)
+    voltage, _ = _voltammogram(201, 0)
+    current = np.where(time < 1.0, 1e-3, -5e-4)
+
+    features = cv_cycle_features(time, voltage, current)
+    assert features["anodic_charge"] == pytest.approx(1e-3, rel=0.02)
+    assert features["cathodic_charge"] == pytest.approx(-5e-4, rel=0.02)
+    assert features["charge"] == pytest.approx(features["anodic_charge"] + features["cathodic_charge"])
+    assert features["i_pa"] == pytest.approx(1e-3)
+
+def test_cycle_tracker_detects_stable_cv():
+    time = np.linspace(0.0, 10.0, 120)
+    voltage, current = _voltammogram(120, 7)
+    tracker = CVCycleTracker(tolerance=0.01, stable_cycles=2)
+
+    # The current settles towards its final shape, halving the change each cycle
+    history = [tracker.add_cycle(time, voltage, current * (1 + 0.2 * 0.5 ** cycle)) for cycle in range(8)]
+
+    assert np.isnan(history[0]["drift_rms"])
+    assert history[1]["drift_rms"] == pytest.approx(0.1 / 1.2)
+    assert history[1]["drift_i_pa"] < 0
+    stable = [features["cycle"] for features in history if features["stable"]]
+    # Cycles 6 and 7 change by less than 1 %
+    assert stable[0] == 7 and tracker.stable
+    assert not CVCycleTracker().add_cycle(time, voltage, current)["stable"]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from utils.eis_fitting import CIRCUITS, circuit_impedance, fit_spectra, fit_spectrum
+
+FREQUENCY = np.logspace(-1, 5, 60)
+
+def _noisy(impedance, level, seed):
+    rng = np.random.default_rng(seed)
+    return impedance * (1 + level * (rng.normal(size=impedance.shape) + 1j * rng.normal(size=impedance.shape)))
+
+@pytest.mark.parametrize("circuit", list(CIRCUITS))
+def test_jacobian_matches_finite_differences(circuit):
+    params = np.array([[10, 1000, 1e-5, 200, 1e-3][:len(CIRCUITS[circuit])]])
+    impedance, jacobian = circuit_impedance(circuit, params, FREQUENCY, jacobian=True)
+    for k in range(params.shape[1]):
+        shifted = params.copy()
+        shifted[0, k] *= 1 + 1e-6
+        numeric = (circuit_impedance(circuit, shifted, FREQUENCY) - impedance) / (params[0, k] * 1e-6)
+        assert np.max(np.abs(numeric - jacobian[..., k])) <= 1e-5 * np.max(np.abs(jacobian[..., k]))
+
+def test_batch_recovers_randles_parameters():
+    rng = np.random.default_rng(0)
+    true = np.column_stack((rng.uniform(5, 50, 40), rng.uniform(100, 5000, 40), 10 ** rng.uniform(-7, -4, 40)))
+    impedance = _noisy(circuit_impedance("randles", true, FREQUENCY), 0.005, 1)
+
+    table = fit_spectra(FREQUENCY, impedance, "randles")
+    assert list(table.columns) == ["Rs", "Rct", "Cdl", "chi_square", "iterations", "converged"]
+    assert table["converged"].all()
+    np.testing.assert_allclose(table[["Rs", "Rct", "Cdl"]].values, true, rtol=0.02)
+
+    # One spectrum at a time gives the same answers
+    single = fit_spectrum(FREQUENCY, impedance[3], "randles")
+    assert single["Rct"] == pytest.approx(table["Rct"][3], rel=1e-6)
+
+def test_two_time_constants_are_ordered():
+    true = np.array([10, 300, 1e-3, 1000, 1e-6])
+    impedance = _noisy(circuit_impedance("r_rc_rc", true, FREQUENCY)[0], 0.002, 2)
+
+    fit = fit_spectrum(FREQUENCY, impedance, "r_rc_rc")
+    assert fit["converged"]
+    # The faster element comes first
+    np.testing.assert_allclose([fit[name] for name in CIRCUITS["r_rc_rc"]],
+                               [10, 1000, 1e-6, 300, 1e-3], rtol=0.03)
+
+def test_warm_start_follows_a_drifting_spectrum():
+    rct = np.linspace(500, 800, 10)
+    true = np.column_stack((np.full(10, 20.0), rct, np.full(10, 2e-5)))
+    impedance = _noisy(circuit_impedance("randles", true, FREQUENCY), 0.002, 3)
+    impedance[:, ::9] = np.nan
+
+    cold = fit_spectra(FREQUENCY, impedance, "randles")
+    warm = fit_spectra(FREQUENCY, impedance, "randles", warm_start=True)
+    np.testing.assert_allclose(warm["Rct"], rct, rtol=0.01)
+    np.testing.assert_allclose(warm["Rct"], cold["Rct"], rtol=1e-4)
+    assert warm["iterations"][1:].sum() <= cold["iterations"][1:].sum()
+
+def test_unknown_circuit():
+    with pytest.raises(ValueError):
+        fit_spectra(FREQUENCY, np.ones(len(FREQUENCY), dtype=complex), "warburg")
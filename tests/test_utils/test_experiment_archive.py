@@ -0,0 +1,97 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils.experiment_archive import ExperimentArchive
+from utils.result_store import save_results
+
+def _backend_result(path, uo_type, temperature, cell, timestamp, result_format="columnar"):
+    voltage = np.linspace(-0.2, 1.0, 500)
+    return save_results({
+        "uo": {"uo_type": uo_type, "parameters": {
+            "cell": cell, "scan_rate": 0.05, "arduino_control": {"base0_temp": temperature}}},
+        "results": {"voltage": voltage, "current": (voltage * temperature).tolist()},
+        "timestamp": timestamp,
+        "experiment_type": uo_type
+    }, str(path), result_format=result_format)
+
+@pytest.fixture
+def tree(tmp_path):
+    results = tmp_path / "results"
+    _backend_result(results / "cva_20250419_100000.json", "CVA", 60, "A1", "20250419_100000")
+    _backend_result(results / "cva_20250419_110000.json", "CVA", 25, "A1", "20250419_110000")
+    _backend_result(results / "cva_20250420_090000.json", "CVA", 60, "B2", "20250420_090000", "json")
+    _backend_result(results / "ocv_20250420_100000.json", "OCV", 60, "A1", "20250420_100000")
+    # Dispatcher copy and a run record
+    save_results({"status": "success", "experiment_id": "20250421_PEIS_ab12", "uo_type": "PEIS",
+                  "timestamp": "2025-04-21T08:00:00",
+                  "results": {"impedance_real": np.ones(64), "parameters": {"dc_voltage": 0.5}}},
+                 str(results / "20250421_PEIS_ab12" / "results.json"))
+    os.makedirs(tmp_path / "data" / "20250419_000")
+    with open(tmp_path / "data" / "20250419_000" / "metadata.json", "w") as f:
+        json.dump({"date": "20250419", "time": "15:34:53", "runNumber": "000", "experimentID": "20250419_000",
+                   "cell": "A1", "status": "running", "notes": "OER"}, f)
+    # Not a result
+    os.makedirs(results / "streams" / "run")
+    with open(results / "streams" / "run" / "meta.json", "w") as f:
+        json.dump({"columns": ["time"], "count": 0}, f)
+    return tmp_path
+
+def test_find_by_metadata(tree):
+    with ExperimentArchive(str(tree / "results" / "archive")) as archive:
+        assert archive.scan([str(tree / "results"), str(tree / "data")]) == 6
+
+        hot = archive.find("CVA", parameters={"arduino_control.base0_temp": 60})
+        assert [run["cell"] for run in hot] == ["A1", "B2"]
+        assert [run["timestamp"] for run in hot] == ["2025-04-19T10:00:00", "2025-04-20T09:00:00"]
+        assert len(archive.find("CVA", cell="A1", parameters={"arduino_control.base0_temp": (50, 70)})) == 1
+        assert len(archive.find(cell="A1", since="2025-04-19T12:00:00")) == 2
+        assert [run["experiment_id"] for run in archive.find("PEIS")] == ["20250421_PEIS_ab12"]
+        assert archive.find(parameters={"notes": "OER"})[0]["experiment_id"] == "20250419_000"
+
+        record = archive.get(hot[0]["id"])
+        assert record["parameters"]["scan_rate"] == 0.05
+        assert record["arrays"]["results.voltage"] == {"dtype": "<f8", "shape": [500]}
+
+def test_arrays_load_as_memory_mapped_slices(tree):
+    with ExperimentArchive(str(tree / "archive")) as archive:
+        archive.scan([str(tree / "results")])
+        for run in archive.find("CVA", parameters={"arduino_control.base0_temp": 60}):
+            current = archive.load_array(run["id"], "results.current", 100, 110)
+            assert isinstance(current, np.memmap)
+            np.testing.assert_allclose(current, np.linspace(-0.2, 1.0, 500)[100:110] * 60)
+
+        # Plain JSON results were converted into the archive's store
+        converted = archive.find(cell="B2")[0]
+        assert converted["path"].startswith(str(tree / "archive"))
+        assert archive.load(converted["id"])["uo"]["parameters"]["cell"] == "B2"
+        with pytest.raises(KeyError):
+            archive.load_array(converted["id"], "results.missing")
+
+def test_rescan_only_reindexes_changed_files(tree):
+    path = tree / "results" / "cva_20250419_110000.json"
+    with ExperimentArchive(str(tree / "archive")) as archive:
+        archive.scan([str(tree / "results")])
+        before = archive.find(cell="A1", experiment_type="CVA")
+
+        _backend_result(path, "CVA", 80, "A1", "20250419_110000")
+        os.utime(path, (0, os.path.getmtime(path) + 10))
+        archive.scan([str(tree / "results")])
+
+        after = archive.find(cell="A1", experiment_type="CVA")
+        assert len(after) == len(before) == 2
+        assert len(archive.find(parameters={"arduino_control.base0_temp": 80})) == 1
+        assert not archive.find(parameters={"arduino_control.base0_temp": 25})
+
+def test_plain_json_results_with_the_same_name_are_kept_apart(tmp_path):
+    _backend_result(tmp_path / "a" / "cva.json", "CVA", 25, "A1", "20250419_100000", "json")
+    _backend_result(tmp_path / "b" / "cva.json", "CVA", 60, "B2", "20250419_110000", "json")
+    with ExperimentArchive(str(tmp_path / "archive")) as archive:
+        archive.scan([str(tmp_path / "a"), str(tmp_path / "b")])
+        runs = archive.find("CVA")
+        assert len({run["path"] for run in runs}) == 2
+        for run, temperature in zip(runs, (25, 60)):
+            np.testing.assert_allclose(archive.load_array(run["id"], "results.current", 0, 3),
+                                       np.linspace(-0.2, 1.0, 500)[:3] * temperature)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+from utils.experiment_events import (
+    CYCLE, END, SAMPLES, EventBroadcaster, emit, emitting_to, is_streaming
+)
+
+def _samples(count):
+    return {"offset": 0, "count": count, "columns": {"voltage": [0.0] * count}}
+
+def test_emit_is_thread_local():
+    received = []
+    assert not is_streaming()
+    emit(SAMPLES, _samples(1))  # no listener: ignored
+
+    with emitting_to(lambda event_type, data: received.append(event_type)):
+        emit(CYCLE, {"cycle": 1})
+        other = threading.Thread(target=emit, args=(CYCLE, {"cycle": 2}))
+        other.start()
+        other.join()
+
+    assert received == [CYCLE]
+
+def test_slow_subscriber_drops_samples_but_keeps_control_events():
+    async def scenario():
+        broadcaster = EventBroadcaster(maxsize=2)
+        subscription = broadcaster.subscribe("exp")
+        for _ in range(5):
+            broadcaster.publish("exp", SAMPLES, _samples(10))
+        broadcaster.publish("exp", END, {"status": "completed"})
+        first = await subscription.get()
+        second = await subscription.get()
+        broadcaster.unsubscribe("exp", subscription)
+        return first, second, broadcaster.has_subscribers("exp")
+
+    first, second, subscribed = asyncio.run(scenario())
+
+    assert first["event"] == SAMPLES and first["dropped_samples"] == 40
+    assert second["event"] == END
+    assert not subscribed
+
+def test_events_from_worker_threads_reach_subscribers():
+    async def scenario():
+        broadcaster = EventBroadcaster()
+        subscription = broadcaster.subscribe("exp")
+
+        def measure():
+            with emitting_to(broadcaster.listener_for("exp")):
+                emit(CYCLE, {"cycle": 1})
+                emit(SAMPLES, _samples(3))
+
+        await asyncio.get_running_loop().run_in_executor(None, measure)
+        return [await subscription.get() for _ in range(2)]
+
+    events = asyncio.run(scenario())
+    assert [event["event"] for event in events] == [CYCLE, SAMPLES]
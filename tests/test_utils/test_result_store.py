@@ -0,0 +1,65 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils.result_store import arrays_dir_for, export_json, load_results, save_results
+from utils.sample_sink import SampleSink
+
+def _results():
+    voltage = np.linspace(0.0, 1.0, 200)
+    return {
+        "status": "success",
+        "results": [{"cycle": 1, "voltage": voltage, "current": (voltage * 1e-6).tolist()}],
+        "parameters": {"frequency_range": [0.1, 1000.0], "cycles": 1},
+    }
+
+def test_series_stored_as_memory_mapped_columns(tmp_path):
+    path = save_results(_results(), str(tmp_path / "run" / "results.json"))
+
+    with open(path) as f:
+        sidecar = json.load(f)
+    assert sidecar["status"] == "success"
+    # Short lists stay inline, long series move to .npy columns
+    assert sidecar["parameters"]["frequency_range"] == [0.1, 1000.0]
+    assert sorted(os.listdir(arrays_dir_for(path))) == ["results.0.current.npy", "results.0.voltage.npy"]
+
+    loaded = load_results(path)
+    voltage = loaded["results"][0]["voltage"]
+    assert isinstance(voltage, np.memmap)
+    assert voltage.dtype == np.float64
+    np.testing.assert_allclose(loaded["results"][0]["current"], np.linspace(0.0, 1.0, 200) * 1e-6)
+
+def test_json_export_and_legacy_files(tmp_path):
+    path = save_results(_results(), str(tmp_path / "results.json"))
+    exported = export_json(path, str(tmp_path / "export.json"))
+
+    with open(exported) as f:
+        data = json.load(f)
+    assert len(data["results"][0]["voltage"]) == 200
+
+    # Plain JSON results load unchanged
+    assert load_results(exported)["results"][0]["voltage"] == data["results"][0]["voltage"]
+
+    with pytest.raises(ValueError):
+        save_results({}, str(tmp_path / "x.json"), result_format="hdf5")
+
+def test_streamed_series_are_referenced_not_copied(tmp_path):
+    with SampleSink(str(tmp_path / "streams" / "ocv"), ["time", "voltage"]) as sink:
+        sink.extend({"time": np.arange(100.0), "voltage": np.linspace(1.2, 0.8, 100)})
+    series = sink.read()
+
+    # Saved twice, as the backend and the uploader do
+    for path in (tmp_path / "ocv.json", tmp_path / "run" / "results.json"):
+        save_results({"results": {"time": series["time"], "voltage": series["voltage"],
+                                  "voltage_smooth": np.asarray(series["voltage"]) + 0}}, str(path))
+        assert sorted(os.listdir(arrays_dir_for(str(path)))) == ["results.voltage_smooth.npy"]
+
+        loaded = load_results(str(path))["results"]
+        np.testing.assert_allclose(loaded["voltage"], np.linspace(1.2, 0.8, 100))
+        np.testing.assert_allclose(load_results(str(path), mmap=False)["results"]["time"], np.arange(100.0))
+
+    # Slices of a stream are stored like any other series
+    path = save_results({"voltage": series["voltage"][10:]}, str(tmp_path / "slice.json"))
+    assert os.listdir(arrays_dir_for(path)) == ["voltage.npy"]
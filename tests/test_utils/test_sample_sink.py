@@ -0,0 +1,31 @@
+import json
+
+import numpy as np
+
+from utils.sample_sink import SampleSink, read_samples
+
+def test_blocks_are_readable_while_writing(tmp_path):
+    directory = str(tmp_path / "ocv")
+    sink = SampleSink(directory, ["time", "voltage"], block_size=4, max_delay=None)
+
+    for i in range(6):
+        sink.append(i * 0.1, 1.0 + i)
+
+    # One full block is on disk, the remaining two samples are still buffered
+    partial = read_samples(directory)
+    np.testing.assert_allclose(partial["voltage"], [1.0, 2.0, 3.0, 4.0])
+
+    sink.extend({"time": np.arange(6, 10) * 0.1, "voltage": np.arange(7.0, 11.0)})
+    sink.close()
+
+    series = read_samples(directory)
+    np.testing.assert_allclose(series["voltage"], np.arange(1.0, 11.0))
+    np.testing.assert_allclose(series["time"], np.arange(10) * 0.1)
+    with open(tmp_path / "ocv" / "meta.json") as f:
+        meta = json.load(f)
+    assert meta["complete"] and meta["count"] == 10
+
+def test_empty_sink(tmp_path):
+    with SampleSink(str(tmp_path / "cp"), ["time", "voltage"]) as sink:
+        pass
+    assert len(sink.read()["time"]) == 0
@@ -0,0 +1,70 @@
+"""
+Tests for how the workflow executor orders a node's OT-2 and Arduino work.
+"""
+
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture(scope="module")
+def workflow_executor(tmp_path_factory):
+    # Importing the executor opens workflow_execution.log in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("executor"))
+    try:
+        return importlib.import_module("workflow_executor")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def executor(workflow_executor, tmp_path):
+    path = tmp_path / "workflow.json"
+    path.write_text(json.dumps({"nodes": [], "edges": []}))
+    executor = workflow_executor.WorkflowExecutor(str(path), tip_state_file=None)
+
+    executor.events = []
+    lock = threading.Lock()
+
+    def record(event):
+        with lock:
+            executor.events.append(event)
+
+    def ot2_actions(actions):
+        record("ot2 start")
+        time.sleep(0.2)
+        record("ot2 end")
+
+    executor._execute_ot2_actions = ot2_actions
+    executor._execute_arduino_control = lambda control: record("arduino")
+    return executor
+
+
+def _node(arduino_control):
+    return {"id": "n1", "params": {
+        "ot2_actions": [{"action": "move_to", "labware": "reactor", "well": "A1"}],
+        "arduino_control": arduino_control
+    }}
+
+
+def test_base_setpoint_runs_alongside_the_robot(executor):
+    executor._execute_node(_node({"base1_temp": 60, "pump0_ml": 0, "ultrasonic0_ms": 0}))
+    assert executor.events.index("arduino") < executor.events.index("ot2 end")
+
+
+@pytest.mark.parametrize("arduino_control", [
+    {"pump2_ml": 5},
+    {"ultrasonic1_ms": 3000},
+    {"base1_temp": 60, "pump0_ml": 2.5},
+])
+def test_pumps_and_sonication_wait_for_the_robot(executor, arduino_control):
+    executor._execute_node(_node(arduino_control))
+    assert executor.events == ["ot2 start", "ot2 end", "arduino"]
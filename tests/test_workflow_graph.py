@@ -0,0 +1,81 @@
+"""
+Tests for the workflow DAG engine.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from workflow_graph import WorkflowGraph, WorkflowGraphError
+
+
+def _nodes(*ids, **resources):
+    return [{"id": node_id, "resources": resources.get(node_id, ["ot2"])} for node_id in ids]
+
+
+def _edges(*pairs):
+    return [{"source": source, "target": target} for source, target in pairs]
+
+
+def _resources(node):
+    return frozenset(node["resources"])
+
+
+def test_diamond_runs_shared_node_once():
+    graph = WorkflowGraph(_nodes("a", "b", "c", "d"),
+                          _edges(("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")))
+    executed = []
+
+    finished = graph.run(lambda node: executed.append(node["id"]), resources=_resources)
+
+    assert executed == ["a", "b", "c", "d"]
+    assert finished == executed
+
+
+def test_long_chain_and_cycle_detection():
+    ids = [f"n{i}" for i in range(5000)]
+    graph = WorkflowGraph(_nodes(*ids), _edges(*zip(ids, ids[1:])))
+    assert graph.order == ids
+
+    with pytest.raises(WorkflowGraphError, match="cycle"):
+        WorkflowGraph(_nodes("a", "b", "c"), _edges(("a", "b"), ("b", "c"), ("c", "b")))
+    with pytest.raises(WorkflowGraphError, match="unknown node"):
+        WorkflowGraph(_nodes("a"), _edges(("a", "z")))
+
+
+def test_independent_branches_overlap_only_on_disjoint_hardware():
+    graph = WorkflowGraph(_nodes("robot", "heat", "robot2", heat=["arduino:base0"]), [])
+    running = set()
+    together = set()
+    lock = threading.Lock()
+
+    def execute(node):
+        with lock:
+            together.update(frozenset((node["id"], other)) for other in running)
+            running.add(node["id"])
+        time.sleep(0.05)
+        with lock:
+            running.discard(node["id"])
+
+    graph.run(execute, resources=_resources)
+
+    assert frozenset(("robot", "heat")) in together
+    assert frozenset(("robot", "robot2")) not in together
+
+
+def test_failure_stops_successors():
+    graph = WorkflowGraph(_nodes("a", "b"), _edges(("a", "b")))
+    executed = []
+
+    def execute(node):
+        executed.append(node["id"])
+        raise RuntimeError("tip not found")
+
+    with pytest.raises(RuntimeError, match="tip not found"):
+        graph.run(execute, resources=_resources)
+    assert executed == ["a"]
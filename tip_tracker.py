@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tip Tracker
+
+This module keeps track of which wells of each tip rack still hold a tip, so
+workflows can ask for the next tip ("well": "auto") instead of hard-coding
+wells. The state is saved to a JSON file after every change and survives
+restarts; a rack's state is discarded when a different rack type or slot is
+loaded under its name.
+
+Tips are handed out nearest to the current gantry position when it is known,
+and in column order (A1, B1, ..., H1, A2, ...) otherwise. Tips dropped back
+into a tip rack (e.g. reusable electrode tips) become available again.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = os.path.join("data", "tip_state.json")
+
+
+class OutOfTipsError(Exception):
+    """Raised when no rack has a tip left."""
+    pass
+
+
+class TipRack:
+    """
+    Tip availability of one rack.
+    """
+
+    def __init__(self, name: str, load_name: str, slot: int,
+                 wells: List[str], positions: np.ndarray):
+        """
+        Initialize a full rack.
+
+        Args:
+            name: Name the workflow uses for the rack, e.g. "tip_rack"
+            load_name: Labware type
+            slot: Deck slot
+            wells: Well names in pick-up order
+            positions: Absolute tip positions, shape (len(wells), 3)
+        """
+        self.name = name
+        self.load_name = load_name
+        self.slot = slot
+        self.wells = list(wells)
+        self.index = {well: i for i, well in enumerate(self.wells)}
+        self.positions = np.asarray(positions, dtype=float).reshape(len(self.wells), 3)
+        self.available = np.ones(len(self.wells), dtype=bool)
+        self.remaining = len(self.wells)
+        # Everything before the cursor has been used
+        self._cursor = 0
+
+    def take(self, well: str) -> None:
+        """Mark a tip as picked up."""
+        i = self.index[well]
+        if self.available[i]:
+            self.available[i] = False
+            self.remaining -= 1
+
+    def put_back(self, well: str) -> None:
+        """Mark a well as holding a tip again."""
+        i = self.index[well]
+        if not self.available[i]:
+            self.available[i] = True
+            self.remaining += 1
+            self._cursor = min(self._cursor, i)
+
+    def next_tip(self) -> Optional[str]:
+        """Get the first available tip in pick-up order, amortised O(1)."""
+        while self._cursor < len(self.wells) and not self.available[self._cursor]:
+            self._cursor += 1
+        return self.wells[self._cursor] if self._cursor < len(self.wells) else None
+
+    def nearest_tip(self, position: np.ndarray) -> Optional[str]:
+        """Get the available tip closest to a position in the x/y plane."""
+        if not self.remaining:
+            return None
+        distances = np.hypot(*(self.positions[:, :2] - np.asarray(position, dtype=float)[:2]).T)
+        distances[~self.available] = np.inf
+        return self.wells[int(np.argmin(distances))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the saved form of the rack."""
+        return {
+            "load_name": self.load_name,
+            "slot": self.slot,
+            "used": [well for well, available in zip(self.wells, self.available) if not available]
+        }
+
+
+class TipTracker:
+    """
+    Allocates tips across racks and persists which tips are used.
+
+    Methods may be called from several threads.
+    """
+
+    def __init__(self, state_file: Optional[str] = DEFAULT_STATE_FILE):
+        """
+        Initialize the tracker.
+
+        Args:
+            state_file: JSON file the state is loaded from and saved to. None keeps it in memory
+        """
+        self.state_file = state_file
+        self.racks: Dict[str, TipRack] = {}
+        # (rack, well) of the tip on the pipette
+        self.held: Optional[Tuple[str, str]] = None
+        self._lock = threading.RLock()
+        self._saved = self._load_state()
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Read the saved state, if any."""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f"Ignoring unreadable tip state {self.state_file}: {str(e)}")
+            return {}
+
+    def add_rack(self, name: str, load_name: str, slot: int,
+                 wells: List[str], positions: np.ndarray) -> TipRack:
+        """
+        Track a rack, restoring its saved state if the same rack type is in the same slot.
+
+        Args:
+            name: Name the workflow uses for the rack
+            load_name: Labware type
+            slot: Deck slot
+            wells: Well names in pick-up order
+            positions: Absolute tip positions
+
+        Returns:
+            TipRack: The tracked rack
+        """
+        with self._lock:
+            rack = TipRack(name, load_name, slot, wells, positions)
+            saved = self._saved.get("racks", {}).get(name)
+            if saved and saved.get("load_name") == load_name and saved.get("slot") == slot:
+                for well in saved.get("used", []):
+                    if well in rack.index:
+                        rack.take(well)
+            self.racks[name] = rack
+            if self._saved.get("held") and self._saved["held"][0] == name:
+                self.held = tuple(self._saved["held"])
+            LOGGER.info(f"Tracking tip rack {name} ({load_name}) in slot {slot}: "
+                        f"{rack.remaining}/{len(rack.wells)} tips left")
+            return rack
+
+    def is_tiprack(self, name: str) -> bool:
+        """Check whether a labware name is a tracked tip rack."""
+        return name in self.racks
+
+    def allocate(self, rack_name: Optional[str] = None, near: Optional[np.ndarray] = None) -> Tuple[str, str]:
+        """
+        Choose the next tip without taking it.
+
+        Args:
+            rack_name: Rack to take from. None searches every rack
+            near: Current gantry position, if known
+
+        Returns:
+            Tuple[str, str]: Rack name and well
+
+        Raises:
+            OutOfTipsError: If the racks are empty
+        """
+        with self._lock:
+            if rack_name is not None and rack_name not in self.racks:
+                raise OutOfTipsError(f"{rack_name} is not a tracked tip rack")
+            racks = [self.racks[rack_name]] if rack_name is not None else list(self.racks.values())
+
+            best = None
+            for rack in racks:
+                if not rack.remaining:
+                    continue
+                if near is None:
+                    return rack.name, rack.next_tip()
+                well = rack.nearest_tip(near)
+                distance = float(np.hypot(*(rack.positions[rack.index[well], :2] - np.asarray(near)[:2])))
+                if best is None or distance < best[0]:
+                    best = (distance, rack.name, well)
+
+            if best is None:
+                raise OutOfTipsError(f"No tips left in {rack_name or 'any tip rack'}")
+            return best[1], best[2]
+
+    def picked_up(self, rack_name: str, well: str) -> None:
+        """Record that the pipette took a tip."""
+        with self._lock:
+            if rack_name in self.racks:
+                self.racks[rack_name].take(well)
+            self.held = (rack_name, well)
+            self.save()
+
+    def dropped(self, labware: str, well: Optional[str] = None) -> None:
+        """
+        Record that the pipette dropped its tip.
+
+        Args:
+            labware: Where the tip was dropped
+            well: Well the tip was dropped into; tips dropped into a tracked rack are available again
+        """
+        with self._lock:
+            if labware in self.racks and well is not None:
+                self.racks[labware].put_back(well)
+            self.held = None
+            self.save()
+
+    def return_well(self, rack_name: str) -> Optional[str]:
+        """
+        Choose where to drop the held tip in a rack: where it came from, or the first empty well.
+
+        Args:
+            rack_name: Rack the tip is returned to
+
+        Returns:
+            Optional[str]: Well name, or None if the rack is full
+        """
+        with self._lock:
+            rack = self.racks.get(rack_name)
+            if rack is None:
+                return None
+            if self.held and self.held[0] == rack_name and not rack.available[rack.index[self.held[1]]]:
+                return self.held[1]
+            empty = np.flatnonzero(~rack.available)
+            return rack.wells[int(empty[0])] if len(empty) else None
+
+    def reset(self, rack_name: Optional[str] = None) -> None:
+        """Mark a rack, or every rack, as full after a refill."""
+        with self._lock:
+            for rack in ([self.racks[rack_name]] if rack_name else self.racks.values()):
+                for well in rack.wells:
+                    rack.put_back(well)
+                LOGGER.info(f"Tip rack {rack.name} reset to {len(rack.wells)} tips")
+            self.save()
+
+    def save(self) -> None:
+        """Write the state file atomically."""
+        if not self.state_file:
+            return
+        with self._lock:
+            racks = dict(self._saved.get("racks", {}))
+            racks.update({name: rack.to_dict() for name, rack in self.racks.items()})
+            self._saved = {"racks": racks, "held": list(self.held) if self.held else None}
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+            # Write then rename, so a crash never leaves a truncated state file
+            tmp_path = self.state_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._saved, f, indent=2)
+            os.replace(tmp_path, self.state_file)
@@ -7,28 +7,192 @@ This module provides functions for processing and analyzing experimental data.
 """
 
 import numpy as np
-from typing import Dict, Any, List, Tuple, Optional
-import json
+from typing import TYPE_CHECKING, Dict, Any, List, Sequence, Tuple, Optional
 import os
 from datetime import datetime
-import pandas as pd
+from functools import lru_cache
 from scipy import signal
 import logging
 
+from utils.result_store import load_results, save_results
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
-def smooth_data(data: np.ndarray, window_size: int = 5) -> np.ndarray:
+SMOOTHING_METHODS = ("moving_average", "savgol")
+
+@lru_cache(maxsize=32)
+def _smoothing_weights(window_size: int, method: str, polyorder: int) -> np.ndarray:
+    """
+    Least-squares fit matrix of one window.
+    
+    Row 0 gives the smoothed centre value as a weighted sum of the window.
+    For Savitzky-Golay, all rows give the polynomial coefficients around the
+    centre, used to evaluate the ends of a series. Read-only, as it is shared.
+    """
+    if method not in SMOOTHING_METHODS:
+        raise ValueError(f"Unknown smoothing method: {method}")
+    if window_size < 1:
+        raise ValueError("Window size must be positive")
+    if method == "moving_average":
+        weights = np.full((1, window_size), 1.0 / window_size)
+    else:
+        if window_size % 2 == 0 or polyorder >= window_size:
+            raise ValueError("Savitzky-Golay needs an odd window size larger than polyorder")
+        half = window_size // 2
+        vandermonde = np.vander(np.arange(-half, half + 1), polyorder + 1, increasing=True)
+        weights = np.linalg.pinv(vandermonde)
+    weights.setflags(write=False)
+    return weights
+
+def _smoothed_ends(first: np.ndarray, last: np.ndarray, window_size: int, method: str,
+                   polyorder: int, centre_first: float, centre_last: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Smoothed values of the samples before the first and after the last full window.
+    
+    The moving average repeats the nearest full-window value; Savitzky-Golay
+    evaluates the polynomial fitted to the first and last window.
     """
-    Smooth data using a moving average filter.
+    left = window_size // 2
+    right = window_size - 1 - left
+    if method == "moving_average":
+        return np.full(left, centre_first), np.full(right, centre_last)
+    weights = _smoothing_weights(window_size, method, polyorder)
+    powers = np.arange(polyorder + 1)
+    head = (np.arange(-left, 0)[:, None] ** powers) @ (weights @ first)
+    tail = (np.arange(1, right + 1)[:, None] ** powers) @ (weights @ last)
+    return head, tail
+
+def smooth_data(data: np.ndarray, window_size: int = 5, method: str = "moving_average",
+                polyorder: int = 2, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Smooth data with a centred moving average or a Savitzky-Golay filter.
+    
+    The moving average repeats the nearest full-window average at both ends;
+    Savitzky-Golay evaluates the polynomial fitted to the first and last
+    window there. Series shorter than the window come back as NaN.
     
     Args:
         data (np.ndarray): Input data array
-        window_size (int): Size of the moving average window
+        window_size (int): Size of the smoothing window; odd for Savitzky-Golay
+        method (str): "moving_average" or "savgol"
+        polyorder (int): Polynomial order for Savitzky-Golay
+        out (Optional[np.ndarray]): Array to write the result into, may be data itself
         
     Returns:
-        np.ndarray: Smoothed data
+        np.ndarray: Smoothed data (out, if given)
+    """
+    data = np.asarray(data, dtype=float)
+    weights = _smoothing_weights(window_size, method, polyorder)
+    if out is None:
+        out = np.empty_like(data)
+    if data.size < window_size:
+        out[...] = np.nan
+        return out
+    
+    left = window_size // 2
+    # The only full-size temporary; computed before out is written, so out may alias data
+    centre = np.convolve(data, weights[0][::-1], mode="valid")
+    head, tail = _smoothed_ends(data[:window_size], data[-window_size:], window_size, method,
+                                polyorder, centre[0], centre[-1])
+    out[left:left + centre.size] = centre
+    out[:left] = head
+    out[left + centre.size:] = tail
+    return out
+
+class StreamingSmoother:
     """
-    return pd.Series(data).rolling(window=window_size, center=True).mean().fillna(method='bfill').fillna(method='ffill').values
+    Incremental version of smooth_data for samples that arrive one at a time.
+    
+    Each sample costs O(window_size). A sample's smoothed value is known once
+    the samples after it in its window have arrived, so values trail the
+    input by half a window; flush() returns the rest when acquisition ends.
+    The concatenated output equals smooth_data over the whole series.
+    """
+    
+    def __init__(self, window_size: int = 5, method: str = "moving_average",
+                 polyorder: int = 2, out: Optional[np.ndarray] = None):
+        """
+        Initialize the smoother.
+        
+        Args:
+            window_size (int): Size of the smoothing window; odd for Savitzky-Golay
+            method (str): "moving_average" or "savgol"
+            polyorder (int): Polynomial order for Savitzky-Golay
+            out (Optional[np.ndarray]): Preallocated array the smoothed values are written into
+        """
+        self.window_size = window_size
+        self.method = method
+        self.polyorder = polyorder
+        self.out = out
+        self.count = 0  # smoothed values produced
+        self._weights = _smoothing_weights(window_size, method, polyorder)[0]
+        # Twice the window, so the latest window is always one contiguous slice
+        self._buffer = np.empty(2 * window_size)
+        self._position = 0
+        self._samples = 0
+        self._first = None
+        self._last_centre = np.nan
+    
+    def _window(self) -> np.ndarray:
+        """The latest window_size samples, oldest first."""
+        return self._buffer[self._position - self.window_size:self._position]
+    
+    def _emit(self, values: np.ndarray) -> np.ndarray:
+        """Store smoothed values in out, if given."""
+        if self.out is not None:
+            self.out[self.count:self.count + len(values)] = values
+            values = self.out[self.count:self.count + len(values)]
+        self.count += len(values)
+        return values
+    
+    def push(self, value: float) -> np.ndarray:
+        """
+        Add a sample.
+        
+        Args:
+            value (float): New sample
+            
+        Returns:
+            np.ndarray: Smoothed values that became known, usually one
+        """
+        if self._position == len(self._buffer):
+            # Move the last window_size - 1 samples to the front
+            keep = self.window_size - 1
+            self._buffer[:keep] = self._buffer[self._position - keep:self._position]
+            self._position = keep
+        self._buffer[self._position] = value
+        self._position += 1
+        self._samples += 1
+        if self._samples < self.window_size:
+            return self._emit(np.empty(0))
+        
+        window = self._window()
+        self._last_centre = float(self._weights @ window)
+        if self._samples > self.window_size:
+            return self._emit(np.array([self._last_centre]))
+        
+        # First full window: the values before its centre are known too
+        self._first = window.copy()
+        head, _ = _smoothed_ends(window, window, self.window_size, self.method,
+                                 self.polyorder, self._last_centre, self._last_centre)
+        return self._emit(np.append(head, self._last_centre))
+    
+    def flush(self) -> np.ndarray:
+        """
+        End the series and get the smoothed values of the last samples.
+        
+        Returns:
+            np.ndarray: The remaining smoothed values; NaN for all samples if
+                fewer than window_size arrived
+        """
+        if self._samples < self.window_size:
+            return self._emit(np.full(self._samples, np.nan))
+        _, tail = _smoothed_ends(self._first, self._window(), self.window_size, self.method,
+                                 self.polyorder, self._last_centre, self._last_centre)
+        return self._emit(tail)
 
 def calculate_derivatives(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
@@ -107,6 +271,328 @@ def process_cv_data(voltage: np.ndarray, current: np.ndarray,
         "scan_rate": scan_rate
     }
 
+def pad_series(series: Sequence[np.ndarray], fill_value: float = np.nan) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack series of different lengths into one padded 2-D array.
+    
+    Args:
+        series (Sequence[np.ndarray]): 1-D arrays
+        fill_value (float): Value after the end of each series
+        
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Array of shape (len(series), longest)
+            and the length of each series
+    """
+    lengths = np.array([len(values) for values in series], dtype=np.intp)
+    padded = np.full((len(series), lengths.max(initial=0)), fill_value, dtype=float)
+    # Scatter every sample into its row in one pass
+    rows = np.repeat(np.arange(len(series)), lengths)
+    columns = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    if len(rows):
+        padded[rows, columns] = np.concatenate([np.asarray(values, dtype=float) for values in series])
+    return padded, lengths
+
+def _batch_moving_average(data: np.ndarray, lengths: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Centered moving average of each row of a padded array.
+    
+    Matches smooth_data: the ends, where the window doesn't fit, repeat the
+    nearest full-window average.
+    """
+    n_rows, n_columns = data.shape
+    left = window_size // 2
+    right = window_size - 1 - left
+    index = np.arange(n_columns)
+    
+    # Window sums from a cumulative sum; padding is zeroed so it can't leak in
+    valid = index < lengths[:, None]
+    cumulative = np.zeros((n_rows, n_columns + 1))
+    np.cumsum(np.where(valid, data, 0.0), axis=1, out=cumulative[:, 1:])
+    
+    first = np.full(n_rows, left)
+    last = np.maximum(lengths - 1 - right, first - 1)
+    centers = np.clip(index[None, :], first[:, None], np.maximum(last, first)[:, None])
+    averages = (np.take_along_axis(cumulative, np.minimum(centers + right + 1, n_columns), axis=1)
+                - np.take_along_axis(cumulative, np.maximum(centers - left, 0), axis=1)) / window_size
+    
+    # Rows shorter than the window have no full window at all
+    averages[(last < first) | (lengths == 0)] = np.nan
+    averages[~valid] = np.nan
+    return averages
+
+def _batch_gradient(y: np.ndarray, x: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    np.gradient(y, x) of each row of padded arrays.
+    
+    Second-order central differences inside, first-order differences at both
+    ends of each row.
+    """
+    gradient = np.full(y.shape, np.nan)
+    if y.shape[1] < 2:
+        return gradient
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_back = x[:, 1:-1] - x[:, :-2]
+        h_forward = x[:, 2:] - x[:, 1:-1]
+        # Same weights as np.gradient, so repeated x values give the same NaNs
+        gradient[:, 1:-1] = (
+            -h_forward / (h_back * (h_back + h_forward)) * y[:, :-2]
+            + (h_forward - h_back) / (h_back * h_forward) * y[:, 1:-1]
+            + h_back / (h_forward * (h_back + h_forward)) * y[:, 2:]
+        )
+        
+        rows = np.flatnonzero(lengths >= 2)
+        end = lengths[rows] - 1
+        gradient[rows, 0] = (y[rows, 1] - y[rows, 0]) / (x[rows, 1] - x[rows, 0])
+        gradient[rows, end] = (y[rows, end] - y[rows, end - 1]) / (x[rows, end] - x[rows, end - 1])
+    
+    gradient[np.arange(y.shape[1])[None, :] >= lengths[:, None]] = np.nan
+    return gradient
+
+def analyze_cv_batch(voltage: Any, current: Any, lengths: Optional[np.ndarray] = None,
+                     experiment: Optional[Sequence[Any]] = None, cycle: Optional[Sequence[Any]] = None,
+                     scan_rate: Optional[Any] = None, window_size: int = 5) -> "pd.DataFrame":
+    """
+    Extract peak features from many cyclic voltammograms at once.
+    
+    Every voltammogram is smoothed like process_cv_data, and the anodic and
+    cathodic peaks are taken as the maximum and minimum of the smoothed current.
+    All voltammograms are processed together in vectorised passes over one
+    padded array, instead of one call per voltammogram.
+    
+    Args:
+        voltage (Any): Ragged sequence of voltage arrays, or a padded 2-D array
+        current (Any): Current arrays in the same layout as voltage
+        lengths (Optional[np.ndarray]): Number of samples in each row of a
+            padded array. Required for padded input
+        experiment (Optional[Sequence[Any]]): Experiment label of each voltammogram
+        cycle (Optional[Sequence[Any]]): Cycle number of each voltammogram
+        scan_rate (Optional[Any]): Scan rate in V/s, one value or one per voltammogram
+        window_size (int): Size of the moving average window
+        
+    Returns:
+        pd.DataFrame: One row per voltammogram with the columns experiment,
+            cycle, n_points, scan_rate, e_pa, i_pa, e_pc, i_pc, delta_ep,
+            e_half, peak_ratio and max_didv
+    """
+    import pandas as pd
+    
+    if lengths is None:
+        voltage, lengths = pad_series(voltage)
+        current, _ = pad_series(current)
+    else:
+        voltage = np.asarray(voltage, dtype=float)
+        current = np.asarray(current, dtype=float)
+        lengths = np.asarray(lengths, dtype=np.intp)
+    count = len(lengths)
+    
+    current_smooth = _batch_moving_average(current, lengths, window_size)
+    didv = _batch_gradient(current_smooth, voltage, lengths)
+    
+    # Peaks of rows without data stay NaN
+    has_data = ~np.all(np.isnan(current_smooth), axis=1)
+    rows = np.arange(count)
+    anodic = np.zeros(count, dtype=np.intp)
+    cathodic = np.zeros(count, dtype=np.intp)
+    if has_data.any():
+        anodic[has_data] = np.nanargmax(current_smooth[has_data], axis=1)
+        cathodic[has_data] = np.nanargmin(current_smooth[has_data], axis=1)
+    
+    e_pa = np.where(has_data, voltage[rows, anodic], np.nan)
+    i_pa = np.where(has_data, current_smooth[rows, anodic], np.nan)
+    e_pc = np.where(has_data, voltage[rows, cathodic], np.nan)
+    i_pc = np.where(has_data, current_smooth[rows, cathodic], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peak_ratio = i_pa / np.abs(i_pc)
+        max_didv = np.nanmax(np.where(np.isfinite(didv), didv, np.nan), axis=1, initial=-np.inf)
+    max_didv[~np.isfinite(max_didv)] = np.nan
+    
+    return pd.DataFrame({
+        "experiment": list(experiment) if experiment is not None else rows,
+        "cycle": list(cycle) if cycle is not None else np.ones(count, dtype=int),
+        "n_points": lengths,
+        "scan_rate": np.broadcast_to(np.asarray(scan_rate if scan_rate is not None else np.nan, dtype=float), (count,)),
+        "e_pa": e_pa,
+        "i_pa": i_pa,
+        "e_pc": e_pc,
+        "i_pc": i_pc,
+        "delta_ep": e_pa - e_pc,
+        "e_half": (e_pa + e_pc) / 2,
+        "peak_ratio": peak_ratio,
+        "max_didv": max_didv
+    })
+
+def analyze_cv_files(filepaths: Sequence[str], window_size: int = 5) -> "pd.DataFrame":
+    """
+    Extract peak features from every cycle of saved CVA results.
+    
+    Columnar results are memory-mapped, so only the samples are read, and
+    all cycles of all files are analysed in one analyze_cv_batch call.
+    
+    Args:
+        filepaths (Sequence[str]): Result files written by the CVA backend
+        window_size (int): Size of the moving average window
+        
+    Returns:
+        pd.DataFrame: Features as returned by analyze_cv_batch, with the
+            experiment column holding the file name and a loop_value column
+            for nested-loop runs
+    """
+    voltages, currents, experiments, cycles, loop_values, scan_rates = [], [], [], [], [], []
+    
+    for filepath in filepaths:
+        try:
+            data = load_experiment_data(filepath)
+        except Exception as e:
+            logger.error(f"Failed to load {filepath}: {str(e)}")
+            continue
+        results = data.get("results", {})
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        scan_rate = results.get("parameters", {}).get("scan_rate", np.nan)
+        
+        # Nested runs hold one list of cycles per loop value
+        groups = results.get("results", [])
+        if results.get("type") != "nested":
+            groups = [{"results": groups}]
+        for group in groups:
+            for entry in group.get("results", []):
+                voltages.append(entry["voltage"])
+                currents.append(entry["current"])
+                experiments.append(name)
+                cycles.append(entry.get("cycle"))
+                loop_values.append(group.get("loop_value"))
+                scan_rates.append(scan_rate)
+    
+    features = analyze_cv_batch(voltages, currents, experiment=experiments, cycle=cycles,
+                                scan_rate=np.array(scan_rates, dtype=float), window_size=window_size)
+    features.insert(2, "loop_value", loop_values)
+    return features
+
+def _trapezoid(y: np.ndarray, x: np.ndarray) -> float:
+    """Integrate y over x with the trapezoidal rule."""
+    return float(np.sum((y[1:] + y[:-1]) * np.diff(x)) / 2)
+
+def cv_cycle_features(time: np.ndarray, voltage: np.ndarray, current: np.ndarray,
+                      window_size: int = 5) -> Dict[str, float]:
+    """
+    Extract the features of one CV cycle.
+    
+    Peaks are the extrema of the smoothed current, as in analyze_cv_batch.
+    Charges integrate the raw current over time: the anodic charge counts
+    positive current only, the cathodic charge negative current only.
+    
+    Args:
+        time (np.ndarray): Time data array in seconds
+        voltage (np.ndarray): Voltage data array
+        current (np.ndarray): Current data array in amperes
+        window_size (int): Size of the moving average window
+        
+    Returns:
+        Dict[str, float]: e_pa, i_pa, e_pc, i_pc, delta_ep, e_half, charge,
+            anodic_charge and cathodic_charge
+    """
+    time = np.asarray(time, dtype=float)
+    voltage = np.asarray(voltage, dtype=float)
+    current = np.asarray(current, dtype=float)
+    current_smooth = smooth_data(current, window_size)
+    
+    features = dict.fromkeys(["e_pa", "i_pa", "e_pc", "i_pc", "delta_ep", "e_half"], float("nan"))
+    if current.size and not np.isnan(current_smooth).all():
+        anodic = int(np.nanargmax(current_smooth))
+        cathodic = int(np.nanargmin(current_smooth))
+        features.update({
+            "e_pa": float(voltage[anodic]),
+            "i_pa": float(current_smooth[anodic]),
+            "e_pc": float(voltage[cathodic]),
+            "i_pc": float(current_smooth[cathodic]),
+            "delta_ep": float(voltage[anodic] - voltage[cathodic]),
+            "e_half": float(voltage[anodic] + voltage[cathodic]) / 2
+        })
+    features.update({
+        "charge": _trapezoid(current, time),
+        "anodic_charge": _trapezoid(np.maximum(current, 0), time),
+        "cathodic_charge": _trapezoid(np.minimum(current, 0), time)
+    })
+    return features
+
+class CVCycleTracker:
+    """
+    Per-cycle CV features computed as each cycle completes.
+    
+    Besides the features of cv_cycle_features, every cycle after the first
+    reports its drift from the previous cycle: the change of the peak
+    potentials and currents, and drift_rms, the RMS change of the current
+    relative to the RMS of the previous cycle's current. The CV counts as
+    stable once drift_rms stayed within tolerance for stable_cycles
+    consecutive cycles.
+    """
+    
+    def __init__(self, tolerance: Optional[float] = None, stable_cycles: int = 2,
+                 window_size: int = 5):
+        """
+        Initialize the tracker.
+        
+        Args:
+            tolerance (Optional[float]): Largest drift_rms of a stable cycle,
+                e.g. 0.01 for 1 %. None never reports the CV as stable
+            stable_cycles (int): Consecutive stable cycles needed
+            window_size (int): Size of the moving average window
+        """
+        self.tolerance = tolerance
+        self.stable_cycles = stable_cycles
+        self.window_size = window_size
+        self.features: List[Dict[str, Any]] = []
+        self._previous_current: Optional[np.ndarray] = None
+        self._stable_run = 0
+    
+    def add_cycle(self, time: np.ndarray, voltage: np.ndarray, current: np.ndarray) -> Dict[str, Any]:
+        """
+        Add a completed cycle.
+        
+        Args:
+            time (np.ndarray): Time data array in seconds
+            voltage (np.ndarray): Voltage data array
+            current (np.ndarray): Current data array in amperes
+            
+        Returns:
+            Dict[str, Any]: Features of the cycle, with its number and drift
+        """
+        current = np.asarray(current, dtype=float)
+        features = {"cycle": len(self.features) + 1}
+        features.update(cv_cycle_features(time, voltage, current, self.window_size))
+        
+        drift = dict.fromkeys(["drift_e_pa", "drift_e_pc", "drift_i_pa", "drift_i_pc", "drift_rms"], float("nan"))
+        if self.features:
+            previous = self.features[-1]
+            drift.update({
+                "drift_e_pa": features["e_pa"] - previous["e_pa"],
+                "drift_e_pc": features["e_pc"] - previous["e_pc"],
+                "drift_i_pa": features["i_pa"] - previous["i_pa"],
+                "drift_i_pc": features["i_pc"] - previous["i_pc"]
+            })
+            # Only comparable when both cycles sampled the same waveform
+            if self._previous_current is not None and self._previous_current.size == current.size:
+                reference = np.sqrt(np.mean(self._previous_current ** 2))
+                if reference > 0:
+                    change = np.sqrt(np.mean((current - self._previous_current) ** 2))
+                    drift["drift_rms"] = float(change / reference)
+        features.update(drift)
+        
+        if self.tolerance is not None and drift["drift_rms"] <= self.tolerance:
+            self._stable_run += 1
+        else:
+            self._stable_run = 0
+        features["stable"] = self.stable
+        
+        self.features.append(features)
+        self._previous_current = current.copy()
+        return features
+    
+    @property
+    def stable(self) -> bool:
+        """Whether the last stable_cycles cycles drifted less than the tolerance."""
+        return self.tolerance is not None and self._stable_run >= self.stable_cycles
+
 def process_eis_data(frequency: np.ndarray, z_real: np.ndarray, 
                      z_imag: np.ndarray) -> Dict[str, Any]:
     """
@@ -211,26 +697,31 @@ def export_to_csv(data: Dict[str, Any], filepath: str) -> None:
     # Save to file
     df.to_csv(filepath, index=False)
 
-def load_experiment_data(filepath: str) -> Dict[str, Any]:
+def load_experiment_data(filepath: str, mmap: bool = True) -> Dict[str, Any]:
     """
     Load experiment data from JSON file.
     
+    Columnar results (see utils.result_store) are loaded with their series
+    as NumPy arrays, memory-mapped unless mmap is False.
+    
     Args:
         filepath (str): Path to JSON file
+        mmap (bool): Memory-map columnar series
         
     Returns:
         Dict[str, Any]: Loaded data
     """
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    return load_results(filepath, mmap=mmap)
 
-def save_experiment_data(data: Dict[str, Any], filepath: str) -> None:
+def save_experiment_data(data: Dict[str, Any], filepath: str, result_format: str = "columnar") -> None:
     """
-    Save experiment data to JSON file.
+    Save experiment data to file.
     
     Args:
         data (Dict[str, Any]): Data to save
         filepath (str): Output file path
+        result_format (str): "columnar" for binary columns with a JSON sidecar,
+            or "json" for a self-contained JSON file
     """
     # Ensure directory exists
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -242,5 +733,5 @@ def save_experiment_data(data: Dict[str, Any], filepath: str) -> None:
     }
     
     # Save to file
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2) 
+    save_results(data, filepath, result_format=result_format)
+
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Equivalent-Circuit Fitting for Impedance Spectra
+
+This module fits Rs + (R1||C1) + (R2||C2) + ... circuits to impedance
+spectra with the Levenberg-Marquardt method:
+
+    "randles"   Rs + (Rct || Cdl)
+    "r_rc_rc"   Rs + (R1 || C1) + (R2 || C2)
+
+Impedances and their analytic Jacobians are evaluated for all frequencies
+and all spectra at once. Many spectra are fitted together: every iteration
+solves the damped normal equations of all spectra in one batched call, and
+each spectrum keeps its own damping and stops on its own.
+
+Parameters are fitted as logarithms, which keeps them positive and puts
+ohms and farads on a comparable scale. Residuals are weighted by |Z|, so
+every frequency counts equally.
+"""
+
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+# Parameter names of each circuit; RC elements follow Rs in (R, C) pairs
+CIRCUITS: Dict[str, List[str]] = {
+    "randles": ["Rs", "Rct", "Cdl"],
+    "r_rc_rc": ["Rs", "R1", "C1", "R2", "C2"],
+}
+
+# Smallest resistance of an initial guess, in ohms
+_MIN_RESISTANCE = 1e-6
+
+# Largest change of a log parameter in one iteration, so a poor start cannot
+# throw a parameter out of floating point range
+_MAX_LOG_STEP = 3.0
+
+
+def _parameter_names(circuit: str) -> List[str]:
+    """Get the parameters of a circuit, raising on unknown circuits."""
+    if circuit not in CIRCUITS:
+        raise ValueError(f"Unknown circuit: {circuit}. Expected one of {', '.join(CIRCUITS)}")
+    return CIRCUITS[circuit]
+
+
+def circuit_impedance(circuit: str, params: np.ndarray, frequency: np.ndarray,
+                      jacobian: bool = False) -> Any:
+    """
+    Evaluate the impedance of a circuit, and optionally its derivatives.
+
+    Args:
+        circuit (str): Circuit name, see CIRCUITS
+        params (np.ndarray): Parameters, shape (n_spectra, n_params) or (n_params,)
+        frequency (np.ndarray): Frequencies in Hz, shape (n_freq,) or (n_spectra, n_freq)
+        jacobian (bool): Also return dZ/dparams, shape (n_spectra, n_freq, n_params)
+
+    Returns:
+        Any: Complex impedance of shape (n_spectra, n_freq), and the Jacobian if requested
+    """
+    _parameter_names(circuit)
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    omega = 2 * np.pi * np.atleast_2d(np.asarray(frequency, dtype=float))
+
+    resistances = params[:, 1::2][:, None, :]
+    capacitances = params[:, 2::2][:, None, :]
+    # One denominator per spectrum, frequency and RC element
+    denominator = 1 + 1j * omega[:, :, None] * resistances * capacitances
+    impedance = params[:, :1] + np.sum(resistances / denominator, axis=2)
+    if not jacobian:
+        return impedance
+
+    squared = denominator ** 2
+    derivatives = np.empty(impedance.shape + (params.shape[1],), dtype=complex)
+    derivatives[..., 0] = 1
+    derivatives[..., 1::2] = 1 / squared
+    derivatives[..., 2::2] = -1j * omega[:, :, None] * resistances ** 2 / squared
+    return impedance, derivatives
+
+
+def initial_guess(circuit: str, frequency: np.ndarray, impedance: np.ndarray) -> np.ndarray:
+    """
+    Estimate starting parameters from the shape of each spectrum.
+
+    Rs is the real part at the highest frequency, the polarisation resistance
+    the rest of the real part at the lowest frequency, and the time constant
+    comes from the frequency of the largest -Im(Z). A single peak cannot
+    tell where a second RC element sits, so for two RC elements the second
+    time constant is tried one and two decades either side of the first,
+    with the resistance split both ways between them.
+
+    Args:
+        circuit (str): Circuit name, see CIRCUITS
+        frequency (np.ndarray): Frequencies in Hz, shape (n_freq,) or (n_spectra, n_freq)
+        impedance (np.ndarray): Complex impedance, shape (n_spectra, n_freq)
+
+    Returns:
+        np.ndarray: Candidate parameters, shape (n_starts, n_spectra, n_params)
+    """
+    names = _parameter_names(circuit)
+    impedance = np.atleast_2d(impedance)
+    frequency = np.broadcast_to(np.atleast_2d(np.asarray(frequency, dtype=float)), impedance.shape)
+    rows = np.arange(len(impedance))
+
+    # Missing points never win
+    valid = np.isfinite(impedance)
+    high = np.argmax(np.where(valid, frequency, -np.inf), axis=1)
+    low = np.argmin(np.where(valid, frequency, np.inf), axis=1)
+    peak = np.argmax(np.where(valid, -impedance.imag, -np.inf), axis=1)
+
+    rs = np.maximum(impedance[rows, high].real, _MIN_RESISTANCE)
+    polarisation = np.maximum(impedance[rows, low].real - rs, _MIN_RESISTANCE)
+    tau = 1 / (2 * np.pi * frequency[rows, peak])
+
+    if len(names) == 3:
+        return np.column_stack((rs, polarisation, tau / polarisation))[None]
+
+    starts = []
+    for offset in (-2, -1, 1, 2):
+        for share in (0.25, 0.75):
+            r1, r2 = polarisation * share, polarisation * (1 - share)
+            starts.append(np.column_stack((rs, r1, tau / r1, r2, tau * 10.0 ** offset / r2)))
+    return np.stack(starts)
+
+
+def _residuals(circuit: str, log_params: np.ndarray, frequency: np.ndarray, impedance: np.ndarray,
+               weights: np.ndarray, jacobian: bool = False) -> Any:
+    """Weighted real and imaginary residuals, and their derivatives by log parameter."""
+    params = np.exp(log_params)
+    if not jacobian:
+        model = circuit_impedance(circuit, params, frequency)
+        difference = (model - impedance) * weights
+        return np.concatenate((difference.real, difference.imag), axis=1)
+
+    model, derivatives = circuit_impedance(circuit, params, frequency, jacobian=True)
+    difference = (model - impedance) * weights
+    # d/dlog(p) = p * d/dp
+    derivatives = derivatives * weights[:, :, None] * params[:, None, :]
+    residuals = np.concatenate((difference.real, difference.imag), axis=1)
+    jacobian = np.concatenate((derivatives.real, derivatives.imag), axis=1)
+    return residuals, jacobian
+
+
+def _levenberg_marquardt(circuit: str, frequency: np.ndarray, impedance: np.ndarray,
+                         initial: np.ndarray, max_iterations: int,
+                         tolerance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit every spectrum of a stack at once.
+
+    Returns:
+        Tuple: Parameters, cost (sum of squared weighted residuals),
+            iterations and convergence flag of each spectrum
+    """
+    valid = np.isfinite(impedance)
+    # Missing points get zero weight and a finite placeholder value
+    weights = np.where(valid, 1 / np.where(valid & (np.abs(impedance) > 0), np.abs(impedance), 1.0), 0.0)
+    impedance = np.where(valid, impedance, 0.0)
+    frequency = np.broadcast_to(frequency, impedance.shape)
+
+    n_spectra, n_params = initial.shape
+    log_params = np.log(initial)
+    residuals, jacobian = _residuals(circuit, log_params, frequency, impedance, weights, jacobian=True)
+    cost = np.sum(residuals ** 2, axis=1)
+    damping = np.full(n_spectra, 1e-3)
+    iterations = np.zeros(n_spectra, dtype=int)
+    converged = np.zeros(n_spectra, dtype=bool)
+    identity = np.eye(n_params)
+
+    for _ in range(max_iterations):
+        # Only spectra still being fitted take part in an iteration
+        active = np.flatnonzero(~converged)
+        if not len(active):
+            break
+        iterations[active] += 1
+        J, r, lam = jacobian[active], residuals[active], damping[active]
+
+        # Damped normal equations of every spectrum, solved in one batched call
+        transposed = J.transpose(0, 2, 1)
+        normal = transposed @ J
+        gradient = (transposed @ r[..., None])[..., 0]
+        scaling = (np.diagonal(normal, axis1=1, axis2=2) + 1e-12)[:, :, None] * identity
+        step = -np.linalg.solve(normal + lam[:, None, None] * scaling, gradient[..., None])[..., 0]
+        step = np.clip(step, -_MAX_LOG_STEP, _MAX_LOG_STEP)
+
+        trial_params = log_params[active] + step
+        with np.errstate(over="ignore", invalid="ignore"):
+            trial_residuals, trial_jacobian = _residuals(circuit, trial_params, frequency[active],
+                                                         impedance[active], weights[active], jacobian=True)
+            trial_cost = np.sum(trial_residuals ** 2, axis=1)
+
+        better = np.isfinite(trial_cost) & (trial_cost < cost[active])
+        small_change = better & (cost[active] - trial_cost <= tolerance * cost[active])
+        accepted = active[better]
+        log_params[accepted] = trial_params[better]
+        residuals[accepted] = trial_residuals[better]
+        jacobian[accepted] = trial_jacobian[better]
+        cost[accepted] = trial_cost[better]
+
+        lam = np.where(better, lam / 10, lam * 10)
+        damping[active] = lam
+        # Stop on a negligible improvement or step, or when no step helps any more
+        small_step = np.max(np.abs(step), axis=1) < tolerance
+        converged[active] = small_change | small_step | (lam > 1e10)
+
+    return np.exp(log_params), cost, iterations, converged
+
+
+def _fit_from_starts(circuit: str, frequency: np.ndarray, impedance: np.ndarray, starts: np.ndarray,
+                     max_iterations: int,
+                     tolerance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Fit every start of every spectrum in one stack and keep each spectrum's best fit."""
+    n_starts, n_spectra = starts.shape[:2]
+    params, cost, iterations, converged = _levenberg_marquardt(
+        circuit, np.tile(frequency, (n_starts, 1)), np.tile(impedance, (n_starts, 1)),
+        starts.reshape(n_starts * n_spectra, -1), max_iterations, tolerance)
+    if n_starts == 1:
+        return params, cost, iterations, converged
+
+    cost = np.where(np.isfinite(cost), cost, np.inf).reshape(n_starts, n_spectra)
+    best = np.argmin(cost, axis=0) * n_spectra + np.arange(n_spectra)
+    return params[best], cost.ravel()[best], iterations[best], converged[best]
+
+
+def fit_spectra(frequency: np.ndarray, impedance: np.ndarray, circuit: str = "randles",
+                initial: Optional[np.ndarray] = None, warm_start: bool = False,
+                max_iterations: int = 100, tolerance: float = 1e-10) -> "pd.DataFrame":
+    """
+    Fit an equivalent circuit to many impedance spectra.
+
+    By default all spectra are fitted together, each from its own initial
+    guess. With warm_start the spectra are fitted one after another, each
+    starting from the previous result, which suits a series of slowly
+    changing spectra from one electrode.
+
+    Args:
+        frequency (np.ndarray): Frequencies in Hz, shape (n_freq,) shared by
+            all spectra, or (n_spectra, n_freq)
+        impedance (np.ndarray): Complex impedance in ohms, shape (n_spectra, n_freq)
+            or (n_freq,). NaN marks missing points
+        circuit (str): Circuit name, see CIRCUITS
+        initial (Optional[np.ndarray]): Starting parameters, shape (n_params,)
+            or (n_spectra, n_params). Estimated from the data if None
+        warm_start (bool): Start each fit from the previous spectrum's result
+        max_iterations (int): Maximum Levenberg-Marquardt iterations per spectrum
+        tolerance (float): Relative cost decrease that ends a fit
+
+    Returns:
+        pd.DataFrame: One row per spectrum with the fitted parameters, the
+            reduced chi-square of the weighted residuals, iterations and
+            whether the fit converged
+    """
+    import pandas as pd
+
+    names = _parameter_names(circuit)
+    impedance = np.atleast_2d(np.asarray(impedance, dtype=complex))
+    frequency = np.broadcast_to(np.atleast_2d(np.asarray(frequency, dtype=float)), impedance.shape)
+    n_spectra, n_freq = impedance.shape
+
+    if initial is None:
+        starts = initial_guess(circuit, frequency, impedance)
+    else:
+        starts = np.broadcast_to(np.asarray(initial, dtype=float), (1, n_spectra, len(names))).copy()
+
+    if warm_start and n_spectra > 1:
+        results = []
+        previous = None
+        for i in range(n_spectra):
+            start = previous[None] if previous is not None else starts[:, i:i + 1]
+            result = _fit_from_starts(circuit, frequency[i:i + 1], impedance[i:i + 1],
+                                      start, max_iterations, tolerance)
+            results.append(result)
+            if np.all(np.isfinite(result[0])):
+                previous = result[0]
+        params, cost, iterations, converged = (np.concatenate(parts) for parts in zip(*results))
+    else:
+        params, cost, iterations, converged = _fit_from_starts(
+            circuit, frequency, impedance, starts, max_iterations, tolerance)
+
+    # RC elements are interchangeable; order them by time constant
+    if len(names) > 3:
+        resistances, capacitances = params[:, 1::2], params[:, 2::2]
+        order = np.argsort(resistances * capacitances, axis=1)
+        params[:, 1::2] = np.take_along_axis(resistances, order, axis=1)
+        params[:, 2::2] = np.take_along_axis(capacitances, order, axis=1)
+
+    points = np.sum(np.isfinite(impedance), axis=1)
+    degrees_of_freedom = np.maximum(2 * points - len(names), 1)
+    if not converged.all():
+        LOGGER.warning(f"{np.count_nonzero(~converged)} of {n_spectra} spectra did not converge "
+                       f"in {max_iterations} iterations")
+
+    table = pd.DataFrame(params, columns=names)
+    table["chi_square"] = cost / degrees_of_freedom
+    table["iterations"] = iterations
+    table["converged"] = converged
+    return table
+
+
+def fit_spectrum(frequency: np.ndarray, impedance: np.ndarray, circuit: str = "randles",
+                 initial: Optional[np.ndarray] = None, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Fit an equivalent circuit to one impedance spectrum.
+
+    Args:
+        frequency (np.ndarray): Frequencies in Hz
+        impedance (np.ndarray): Complex impedance in ohms
+        circuit (str): Circuit name, see CIRCUITS
+        initial (Optional[np.ndarray]): Starting parameters
+        **kwargs (Any): Passed to fit_spectra
+
+    Returns:
+        Dict[str, Any]: Fitted parameters by name, with chi_square, iterations and converged
+    """
+    row = fit_spectra(frequency, np.asarray(impedance)[None, :], circuit, initial, **kwargs).iloc[0]
+    fit = {name: float(row[name]) for name in CIRCUITS[circuit]}
+    fit.update({
+        "circuit": circuit,
+        "chi_square": float(row["chi_square"]),
+        "iterations": int(row["iterations"]),
+        "converged": bool(row["converged"])
+    })
+    return fit
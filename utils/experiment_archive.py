@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Experiment Archive
+
+This module keeps a SQLite index over stored experiment results, so questions
+like "all CVA runs at 60 °C on cell A1" are answered from the index instead
+of by opening every result file:
+
+    <root>/index.sqlite          experiments, flattened parameters and series
+    <root>/store/<hash>.json     columnar copies of results saved as plain JSON
+
+Three layouts are recognised: results/<type>_<ts>.json written by the
+backends, results/<experiment_id>/results.json written by
+LocalResultUploader, and data/<date>_<run>/metadata.json run records.
+Columnar results (see utils.result_store) are indexed where they are; plain
+JSON results are converted once into the archive's store so their series can
+be memory-mapped too. Series are memory-mapped when read, so a slice only
+touches the pages it covers.
+
+Parameters are flattened to dotted keys ("arduino_control.base0_temp") and
+indexed by value, numeric or text:
+
+    with ExperimentArchive("results/archive") as archive:
+        archive.scan(["results", "data"])
+        runs = archive.find("CVA", cell="A1", parameters={"arduino_control.base0_temp": 60})
+        current = archive.load_array(runs[0]["id"], "results.current", 0, 1000)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from numbers import Number
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.result_store import COLUMN_KEY, arrays_dir_for, load_column, load_results, save_results
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_NAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    id INTEGER PRIMARY KEY,
+    experiment_id TEXT,
+    type TEXT,
+    timestamp TEXT,
+    cell TEXT,
+    status TEXT,
+    source TEXT UNIQUE,
+    source_mtime REAL,
+    path TEXT,
+    parameters TEXT
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    record INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value_num REAL,
+    value_text TEXT
+);
+CREATE TABLE IF NOT EXISTS arrays (
+    record INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    file TEXT NOT NULL,
+    dtype TEXT,
+    shape TEXT
+);
+CREATE INDEX IF NOT EXISTS experiments_type ON experiments (type, timestamp);
+CREATE INDEX IF NOT EXISTS experiments_cell ON experiments (cell, timestamp);
+CREATE INDEX IF NOT EXISTS experiments_experiment_id ON experiments (experiment_id);
+CREATE INDEX IF NOT EXISTS parameters_num ON parameters (key, value_num, record);
+CREATE INDEX IF NOT EXISTS parameters_text ON parameters (key, value_text, record);
+CREATE INDEX IF NOT EXISTS parameters_record ON parameters (record);
+CREATE UNIQUE INDEX IF NOT EXISTS arrays_key ON arrays (record, key);
+"""
+
+def _flatten(value: Any, prefix: str = "") -> Iterable[Tuple[str, Any]]:
+    """Yield (dotted key, scalar) pairs of a nested parameter mapping."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, (str, Number)) and prefix:
+        yield prefix, value
+
+def _iso_timestamp(value: Any) -> Optional[str]:
+    """Normalise the timestamp formats used in result files to ISO 8601."""
+    if not value:
+        return None
+    for layout in ("%Y%m%d_%H%M%S", "%Y%m%d %H:%M:%S"):
+        try:
+            return datetime.strptime(str(value), layout).isoformat()
+        except ValueError:
+            pass
+    return str(value)
+
+def _is_columnar(skeleton: Any) -> bool:
+    """Check whether a loaded sidecar references any .npy columns."""
+    if isinstance(skeleton, dict):
+        return COLUMN_KEY in skeleton or any(_is_columnar(item) for item in skeleton.values())
+    if isinstance(skeleton, list):
+        return any(_is_columnar(item) for item in skeleton)
+    return False
+
+def _columns(skeleton: Any, path: List[str]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    """Yield (dotted key, column reference) for every column of a sidecar."""
+    if isinstance(skeleton, dict):
+        if COLUMN_KEY in skeleton:
+            yield ".".join(path), skeleton
+            return
+        for key, item in skeleton.items():
+            yield from _columns(item, path + [str(key)])
+    elif isinstance(skeleton, list):
+        for i, item in enumerate(skeleton):
+            yield from _columns(item, path + [str(i)])
+
+def describe(data: Dict[str, Any], default_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract the indexed metadata of a result or run record.
+
+    Args:
+        data (Dict[str, Any]): Contents of a result or metadata.json file
+        default_id (Optional[str]): Experiment ID when the data holds none
+
+    Returns:
+        Dict[str, Any]: experiment_id, type, timestamp, cell, status and parameters
+    """
+    uo = data.get("uo") if isinstance(data.get("uo"), dict) else {}
+    results = data.get("results") if isinstance(data.get("results"), dict) else {}
+
+    if uo:
+        # Backend result file: {"uo", "results", "timestamp", "experiment_type"}
+        parameters = uo.get("parameters", {})
+        experiment_type = data.get("experiment_type") or uo.get("uo_type")
+        experiment_id = uo.get("experiment_id")
+    elif "experimentID" in data:
+        # Run record: data/<date>_<run>/metadata.json
+        parameters = {key: value for key, value in data.items()
+                      if key not in ("date", "time", "experimentID", "cell", "status")}
+        experiment_type = data.get("uo_type")
+        experiment_id = data["experimentID"]
+    else:
+        # Dispatcher result: {"status", "results", "experiment_id", "uo_type", "timestamp"}
+        parameters = results.get("parameters", {})
+        experiment_type = data.get("uo_type") or data.get("experiment_type")
+        experiment_id = data.get("experiment_id")
+
+    if "date" in data and "time" in data:
+        timestamp = _iso_timestamp(f"{data['date']} {data['time']}")
+    else:
+        timestamp = _iso_timestamp(data.get("timestamp") or results.get("timestamp"))
+
+    parameters = parameters if isinstance(parameters, dict) else {}
+    return {
+        "experiment_id": experiment_id or default_id,
+        "type": experiment_type,
+        "timestamp": timestamp,
+        "cell": data.get("cell") or parameters.get("cell"),
+        "status": data.get("status") or results.get("status"),
+        "parameters": parameters
+    }
+
+class ExperimentArchive:
+    """
+    SQLite index over stored experiment results.
+
+    Each indexed file is one record with an integer id. Several records can
+    share an experiment_id, e.g. the backend and dispatcher copies of one run.
+    An archive can be shared between threads.
+    """
+
+    def __init__(self, root: str = os.path.join("results", "archive")):
+        """
+        Open or create an archive.
+
+        Args:
+            root (str): Directory of the index and of converted results
+        """
+        self.root = root
+        self.store_dir = os.path.join(root, "store")
+        os.makedirs(self.store_dir, exist_ok=True)
+        # One connection shared by all threads, used under a lock
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(os.path.join(root, INDEX_NAME), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        # Readers keep working while a scan writes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the index."""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "ExperimentArchive":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _query(self, sql: str, arguments: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        """Run a read query under the lock."""
+        with self._lock:
+            return self._connection.execute(sql, tuple(arguments)).fetchall()
+
+    def add_file(self, path: str) -> Optional[int]:
+        """
+        Index a result or metadata.json file, re-indexing it if it changed.
+
+        Args:
+            path (str): Path to the JSON file
+
+        Returns:
+            Optional[int]: Record id, or None if the file is not a result
+        """
+        source = os.path.abspath(path)
+        mtime = os.path.getmtime(source)
+        rows = self._query("SELECT id, source_mtime FROM experiments WHERE source = ?", (source,))
+        if rows and rows[0]["source_mtime"] == mtime:
+            return rows[0]["id"]
+
+        try:
+            with open(source, 'r') as f:
+                skeleton = json.load(f)
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f"Skipping {path}: {str(e)}")
+            return None
+        if not isinstance(skeleton, dict) or not any(key in skeleton for key in ("uo", "results", "experimentID")):
+            return None
+
+        # Name records after their file, or after their directory for
+        # results.json and metadata.json
+        stem = os.path.splitext(os.path.basename(source))[0]
+        if stem in ("results", "metadata"):
+            stem = os.path.basename(os.path.dirname(source))
+        info = describe(skeleton, default_id=stem)
+
+        if _is_columnar(skeleton):
+            sidecar = source
+        elif "experimentID" in skeleton:
+            # Run records carry no series
+            sidecar = source
+        else:
+            # Keyed by source path, since files in different directories can share a name
+            key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+            sidecar = save_results(skeleton, os.path.join(self.store_dir, f"{key}.json"))
+            with open(sidecar, 'r') as f:
+                skeleton = json.load(f)
+
+        with self._lock, self._connection:
+            for row in self._connection.execute("SELECT id FROM experiments WHERE source = ?", (source,)).fetchall():
+                self._delete(row["id"])
+            record = self._insert(info, source, mtime, sidecar)
+            self._connection.executemany(
+                "INSERT INTO arrays (record, key, file, dtype, shape) VALUES (?, ?, ?, ?, ?)",
+                [(record, key, os.path.normpath(os.path.join(arrays_dir_for(sidecar), column[COLUMN_KEY])),
+                  column.get("dtype"), json.dumps(column.get("shape")))
+                 for key, column in _columns(skeleton, [])]
+            )
+        return record
+
+    def scan(self, directories: Iterable[str] = ("results", "data")) -> int:
+        """
+        Index every result file under some directories.
+
+        Unchanged files are skipped, so a rescan only reads new or modified ones.
+
+        Args:
+            directories (Iterable[str]): Directories to walk
+
+        Returns:
+            int: Number of indexed records
+        """
+        root = os.path.abspath(self.root)
+        count = 0
+        for directory in directories:
+            for dirpath, dirnames, filenames in os.walk(directory):
+                # Skip column directories and the archive itself
+                dirnames[:] = [name for name in dirnames if not name.endswith(".arrays")
+                               and os.path.abspath(os.path.join(dirpath, name)) != root]
+                for filename in filenames:
+                    if filename.endswith(".json") and self.add_file(os.path.join(dirpath, filename)) is not None:
+                        count += 1
+        LOGGER.info(f"Indexed {count} result files")
+        return count
+
+    def _insert(self, info: Dict[str, Any], source: str, mtime: float, sidecar: str) -> int:
+        """Insert an experiment row and its flattened parameters."""
+        cursor = self._connection.execute(
+            "INSERT INTO experiments (experiment_id, type, timestamp, cell, status, source, source_mtime, path, parameters) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (info["experiment_id"], info["type"], info["timestamp"], info["cell"], info["status"],
+             source, mtime, sidecar, json.dumps(info["parameters"], default=str))
+        )
+        record = cursor.lastrowid
+        self._connection.executemany(
+            "INSERT INTO parameters (record, key, value_num, value_text) VALUES (?, ?, ?, ?)",
+            [(record, key, float(value), None) if isinstance(value, Number) else (record, key, None, value)
+             for key, value in _flatten(info["parameters"])]
+        )
+        return record
+
+    def _delete(self, record: int) -> None:
+        """Remove a record from every table."""
+        for table, column in (("parameters", "record"), ("arrays", "record"), ("experiments", "id")):
+            self._connection.execute(f"DELETE FROM {table} WHERE {column} = ?", (record,))
+
+    def find(self, experiment_type: Optional[str] = None, cell: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None,
+             parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Find records by type, cell, time and parameter values.
+
+        Args:
+            experiment_type (Optional[str]): Experiment type, e.g. "CVA"
+            cell (Optional[str]): Cell, e.g. "A1"
+            since (Optional[str]): Earliest ISO timestamp (inclusive)
+            until (Optional[str]): Latest ISO timestamp (inclusive)
+            parameters (Optional[Dict[str, Any]]): Required values by dotted key.
+                A (low, high) tuple matches a numeric range
+
+        Returns:
+            List[Dict[str, Any]]: Matching records, oldest first
+        """
+        clauses, values = [], []
+        for column, value in (("type", experiment_type), ("cell", cell)):
+            if value is not None:
+                clauses.append(f"e.{column} = ?")
+                values.append(value)
+        if since is not None:
+            clauses.append("e.timestamp >= ?")
+            values.append(since)
+        if until is not None:
+            clauses.append("e.timestamp <= ?")
+            values.append(until)
+
+        for key, value in (parameters or {}).items():
+            if isinstance(value, tuple):
+                condition, arguments = "p.value_num BETWEEN ? AND ?", list(value)
+            elif isinstance(value, Number):
+                condition, arguments = "p.value_num = ?", [float(value)]
+            else:
+                condition, arguments = "p.value_text = ?", [value]
+            clauses.append(f"EXISTS (SELECT 1 FROM parameters p WHERE p.key = ? AND {condition} AND p.record = e.id)")
+            values.extend([key] + arguments)
+
+        where = " AND ".join(clauses) or "1"
+        rows = self._query(
+            "SELECT e.id, e.experiment_id, e.type, e.timestamp, e.cell, e.status, e.source, e.path "
+            f"FROM experiments e WHERE {where} ORDER BY e.timestamp, e.id", values
+        )
+        return [dict(row) for row in rows]
+
+    def get(self, record: int) -> Dict[str, Any]:
+        """
+        Get the indexed metadata of a record.
+
+        Args:
+            record (int): Record id
+
+        Returns:
+            Dict[str, Any]: Record with its parameters and series
+
+        Raises:
+            KeyError: If the record does not exist
+        """
+        rows = self._query("SELECT * FROM experiments WHERE id = ?", (record,))
+        if not rows:
+            raise KeyError(record)
+        info = dict(rows[0])
+        info["parameters"] = json.loads(info["parameters"])
+        info["arrays"] = self.arrays(record)
+        return info
+
+    def arrays(self, record: int) -> Dict[str, Dict[str, Any]]:
+        """
+        List the stored series of a record.
+
+        Args:
+            record (int): Record id
+
+        Returns:
+            Dict[str, Dict[str, Any]]: dtype and shape by dotted key
+        """
+        rows = self._query("SELECT key, dtype, shape FROM arrays WHERE record = ? ORDER BY key", (record,))
+        return {row["key"]: {"dtype": row["dtype"], "shape": json.loads(row["shape"])} for row in rows}
+
+    def load_array(self, record: int, key: str, start: Optional[int] = None,
+                   stop: Optional[int] = None) -> np.ndarray:
+        """
+        Load a series, or a slice of it, without reading the whole file.
+
+        Args:
+            record (int): Record id
+            key (str): Dotted key of the series, e.g. "results.voltage"
+            start (Optional[int]): First sample
+            stop (Optional[int]): End of the slice (exclusive)
+
+        Returns:
+            np.ndarray: Read-only memory-mapped view of the samples
+
+        Raises:
+            KeyError: If the record has no such series
+        """
+        rows = self._query("SELECT file, dtype, shape FROM arrays WHERE record = ? AND key = ?", (record, key))
+        if not rows:
+            raise KeyError(f"{record}: {key}")
+        return load_column(rows[0]["file"], rows[0]["dtype"], json.loads(rows[0]["shape"]))[start:stop]
+
+    def load(self, record: int, mmap: bool = True) -> Dict[str, Any]:
+        """
+        Load a whole record.
+
+        Args:
+            record (int): Record id
+            mmap (bool): Memory-map the series
+
+        Returns:
+            Dict[str, Any]: Results with each series as a NumPy array
+        """
+        return load_results(self.get(record)["path"], mmap=mmap)
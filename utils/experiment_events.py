@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Experiment Event Streaming
+
+Backends report progress (new samples, cycle boundaries) with emit(). The call
+is a no-op unless the running thread was given a listener with emitting_to(),
+so backends need no reference to the API that is streaming their data.
+
+EventBroadcaster fans events for an experiment out to any number of asyncio
+subscribers. Each subscriber has a bounded buffer. When a slow client falls
+behind, sample events are dropped first and the client is told how many
+samples it missed, while status and cycle events are always delivered.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+# Event types
+SAMPLES = "samples"
+CYCLE = "cycle"
+FEATURES = "features"
+STATUS = "status"
+END = "end"
+
+# Events that may be dropped when a subscriber falls behind
+DROPPABLE_EVENTS = (SAMPLES,)
+
+Listener = Callable[[str, Dict[str, Any]], None]
+
+_local = threading.local()
+
+@contextmanager
+def emitting_to(listener: Listener) -> Iterator[None]:
+    """
+    Send events emitted on the current thread to a listener.
+
+    Args:
+        listener (Listener): Called as listener(event_type, data)
+    """
+    previous = getattr(_local, "listener", None)
+    _local.listener = listener
+    try:
+        yield
+    finally:
+        _local.listener = previous
+
+def emit(event_type: str, data: Dict[str, Any]) -> None:
+    """
+    Report an event for the experiment running on the current thread.
+
+    Args:
+        event_type (str): Event type, e.g. SAMPLES or CYCLE
+        data (Dict[str, Any]): JSON-compatible event payload
+    """
+    listener = getattr(_local, "listener", None)
+    if listener is None:
+        return
+    try:
+        listener(event_type, data)
+    except Exception as e:
+        # Streaming must never break a measurement
+        LOGGER.warning(f"Failed to emit {event_type} event: {str(e)}")
+
+def is_streaming() -> bool:
+    """Check whether events emitted on the current thread go anywhere."""
+    return getattr(_local, "listener", None) is not None
+
+
+class Subscription:
+    """Bounded event buffer for one subscriber."""
+
+    def __init__(self, maxsize: int = 256):
+        """
+        Initialize the subscription.
+
+        Args:
+            maxsize (int): Maximum number of buffered events
+        """
+        self.maxsize = maxsize
+        self.dropped_samples = 0
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]) -> None:
+        """Buffer an event, dropping sample events if the buffer is full."""
+        if len(self._events) >= self.maxsize:
+            if event["event"] in DROPPABLE_EVENTS:
+                self.dropped_samples += event["data"].get("count", 0)
+                return
+            # Make room for a control event by discarding the oldest sample event
+            for buffered in self._events:
+                if buffered["event"] in DROPPABLE_EVENTS:
+                    self._events.remove(buffered)
+                    self.dropped_samples += buffered["data"].get("count", 0)
+                    break
+            else:
+                self._events.popleft()
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self) -> Dict[str, Any]:
+        """
+        Wait for the next event.
+
+        Returns:
+            Dict[str, Any]: Event with "event" and "data" keys. If samples were
+                dropped since the last event, "dropped_samples" holds their number
+        """
+        while not self._events:
+            self._ready.clear()
+            await self._ready.wait()
+        event = self._events.popleft()
+        if self.dropped_samples:
+            event = dict(event, dropped_samples=self.dropped_samples)
+            self.dropped_samples = 0
+        return event
+
+
+class EventBroadcaster:
+    """
+    Fans out experiment events to asyncio subscribers.
+
+    subscribe, unsubscribe and publish must be called from the event loop;
+    publish_threadsafe may be called from any thread.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            maxsize (int): Default buffer size of each subscription
+        """
+        self.maxsize = maxsize
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, experiment_id: str, maxsize: Optional[int] = None) -> Subscription:
+        """
+        Start receiving events for an experiment.
+
+        Args:
+            experiment_id (str): Experiment to follow
+            maxsize (Optional[int]): Buffer size for this subscriber
+
+        Returns:
+            Subscription: Buffer to read events from
+        """
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(maxsize or self.maxsize)
+        self._subscribers.setdefault(experiment_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, experiment_id: str, subscription: Subscription) -> None:
+        """Stop receiving events for an experiment."""
+        subscribers = self._subscribers.get(experiment_id, [])
+        if subscription in subscribers:
+            subscribers.remove(subscription)
+        if not subscribers:
+            self._subscribers.pop(experiment_id, None)
+
+    def has_subscribers(self, experiment_id: str) -> bool:
+        """Check whether anyone follows an experiment."""
+        return bool(self._subscribers.get(experiment_id))
+
+    def publish(self, experiment_id: str, event_type: str, data: Dict[str, Any]) -> None:
+        """Deliver an event to every subscriber of an experiment."""
+        event = {"event": event_type, "data": data}
+        for subscription in list(self._subscribers.get(experiment_id, [])):
+            subscription.push(event)
+
+    def publish_threadsafe(self, experiment_id: str, event_type: str, data: Dict[str, Any]) -> None:
+        """Deliver an event from a worker thread. Does nothing without subscribers."""
+        if self._loop is None or not self.has_subscribers(experiment_id):
+            return
+        try:
+            self._loop.call_soon_threadsafe(self.publish, experiment_id, event_type, data)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    def listener_for(self, experiment_id: str) -> Listener:
+        """
+        Get a listener for emitting_to() that publishes an experiment's events.
+
+        Args:
+            experiment_id (str): Experiment the events belong to
+
+        Returns:
+            Listener: Thread-safe listener
+        """
+        def _listener(event_type: str, data: Dict[str, Any]) -> None:
+            self.publish_threadsafe(experiment_id, event_type, data)
+        return _listener
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Columnar Result Storage
+
+This module stores experiment results as typed binary columns plus a small JSON
+metadata sidecar. Every numeric series (time, voltage, current, impedance, ...)
+is written to its own .npy file, and the sidecar keeps the rest of the result
+structure with a reference in place of each series:
+
+    results/<name>.json               metadata sidecar
+    results/<name>.arrays/<key>.npy   one contiguous column per series
+
+Columns are memory-mapped when loaded, so reading a result does not parse or
+copy the samples. JSON with inline lists remains available as an export.
+
+Series that are already on disk as raw samples, i.e. memory-mapped from a
+utils.sample_sink stream, are not copied: their reference points at the
+stream file (relative to the .arrays directory) and records dtype and shape.
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+from numbers import Number
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+# Key marking a column reference in the sidecar
+COLUMN_KEY = "__column__"
+
+# Numeric lists shorter than this stay inline in the sidecar
+MIN_COLUMN_LENGTH = 16
+
+RESULT_FORMATS = ("columnar", "json")
+
+def _is_numeric_series(value: Any) -> bool:
+    """Check whether a value should be stored as a column."""
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in "biufc"
+    if isinstance(value, (list, tuple)) and len(value) >= MIN_COLUMN_LENGTH:
+        return all(isinstance(v, Number) and not isinstance(v, bool) for v in value)
+    return False
+
+def _column_name(path: List[str]) -> str:
+    """Build a file name from the location of a series in the result."""
+    name = ".".join(path) or "root"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".npy"
+
+def _raw_file(value: Any) -> Optional[str]:
+    """Get the raw sample file a series is memory-mapped from, if it spans the whole file."""
+    if not (isinstance(value, np.memmap) and isinstance(value.base, mmap.mmap)):
+        return None
+    if not value.filename or value.filename.endswith(".npy") or value.offset or value.ndim != 1:
+        return None
+    if os.path.getsize(value.filename) != value.nbytes:
+        return None
+    return value.filename
+
+def _split_columns(value: Any, path: List[str], columns: Dict[str, np.ndarray],
+                   arrays_dir: str) -> Any:
+    """Replace numeric series with column references, collecting the arrays."""
+    raw_file = _raw_file(value)
+    if raw_file:
+        try:
+            name = os.path.relpath(raw_file, arrays_dir)
+        except ValueError:
+            # Different drive, keep the absolute path
+            name = raw_file
+        return {COLUMN_KEY: name, "dtype": value.dtype.str, "shape": list(value.shape)}
+    if _is_numeric_series(value):
+        array = np.ascontiguousarray(value)
+        name = _column_name(path)
+        columns[name] = array
+        return {COLUMN_KEY: name, "dtype": array.dtype.str, "shape": list(array.shape)}
+    if isinstance(value, dict):
+        return {key: _split_columns(item, path + [str(key)], columns, arrays_dir)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_split_columns(item, path + [str(i)], columns, arrays_dir) for i, item in enumerate(value)]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _join_columns(value: Any, arrays_dir: str, mmap: bool) -> Any:
+    """Replace column references with the stored arrays."""
+    if isinstance(value, dict):
+        if COLUMN_KEY in value:
+            return load_column(os.path.join(arrays_dir, value[COLUMN_KEY]),
+                               value.get("dtype"), value.get("shape"), mmap)
+        return {key: _join_columns(item, arrays_dir, mmap) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_join_columns(item, arrays_dir, mmap) for item in value]
+    return value
+
+def load_column(path: str, dtype: Optional[str] = None, shape: Optional[Sequence[int]] = None,
+                mmap: bool = True) -> np.ndarray:
+    """
+    Load one stored column, either a .npy file or raw samples.
+
+    Args:
+        path (str): Path to the column file
+        dtype (Optional[str]): dtype of raw samples
+        shape (Optional[Sequence[int]]): Shape of raw samples
+        mmap (bool): Memory-map the column instead of reading it into memory
+
+    Returns:
+        np.ndarray: The column (read-only, if mmap)
+    """
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r" if mmap else None)
+    count = int(np.prod(shape))
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape))
+    return np.fromfile(path, dtype=dtype, count=count).reshape(shape)
+
+def to_json_compatible(value: Any) -> Any:
+    """
+    Convert arrays and NumPy scalars to plain Python values.
+
+    Args:
+        value (Any): Result structure, possibly holding NumPy arrays
+
+    Returns:
+        Any: The same structure with lists and Python scalars only
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: to_json_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_compatible(item) for item in value]
+    return value
+
+def arrays_dir_for(sidecar_path: str) -> str:
+    """
+    Get the column directory that belongs to a sidecar file.
+
+    Args:
+        sidecar_path (str): Path to the .json sidecar
+
+    Returns:
+        str: Path to the directory holding the .npy columns
+    """
+    return os.path.splitext(sidecar_path)[0] + ".arrays"
+
+def save_results(data: Dict[str, Any], sidecar_path: str, result_format: str = "columnar") -> str:
+    """
+    Save results as binary columns with a JSON sidecar, or as plain JSON.
+
+    Args:
+        data (Dict[str, Any]): Results to save. Series may be lists or NumPy arrays
+        sidecar_path (str): Path of the JSON file to write
+        result_format (str): "columnar" (default) or "json" for inline lists
+
+    Returns:
+        str: Path of the written JSON file
+
+    Raises:
+        ValueError: If the result format is unknown
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result format: {result_format}")
+
+    directory = os.path.dirname(sidecar_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if result_format == "json":
+        with open(sidecar_path, 'w') as f:
+            json.dump(to_json_compatible(data), f, indent=2)
+        return sidecar_path
+
+    columns: Dict[str, np.ndarray] = {}
+    arrays_dir = arrays_dir_for(sidecar_path)
+    skeleton = _split_columns(data, [], columns, os.path.abspath(arrays_dir))
+
+    if columns:
+        os.makedirs(arrays_dir, exist_ok=True)
+        for name, array in columns.items():
+            np.save(os.path.join(arrays_dir, name), array, allow_pickle=False)
+
+    # Write the sidecar last so a readable sidecar always has its columns
+    tmp_path = sidecar_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(skeleton, f, indent=2)
+    os.replace(tmp_path, sidecar_path)
+
+    LOGGER.debug(f"Saved {len(columns)} columns for {sidecar_path}")
+    return sidecar_path
+
+def load_results(sidecar_path: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Load results written by save_results.
+
+    Plain JSON result files load unchanged, so this also reads older results.
+
+    Args:
+        sidecar_path (str): Path to the JSON file
+        mmap (bool): Memory-map the columns instead of reading them into memory
+
+    Returns:
+        Dict[str, Any]: Results with each series as a (read-only, if mmap) NumPy array
+    """
+    with open(sidecar_path, 'r') as f:
+        skeleton = json.load(f)
+    return _join_columns(skeleton, arrays_dir_for(sidecar_path), mmap)
+
+def export_json(sidecar_path: str, json_path: str) -> str:
+    """
+    Export stored results as a self-contained JSON file with inline lists.
+
+    Args:
+        sidecar_path (str): Path to the stored results
+        json_path (str): Path of the JSON file to write
+
+    Returns:
+        str: Path of the written JSON file
+    """
+    return save_results(load_results(sidecar_path, mmap=True), json_path, result_format="json")
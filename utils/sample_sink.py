@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Streaming Sample Sink
+
+This module lets backends persist samples as they are acquired instead of
+collecting them in Python lists. Samples are buffered in a fixed-size NumPy
+block and appended to one raw binary file per column whenever the block fills
+(or a few seconds have passed), so memory stays bounded and a crash loses at
+most one block. The files can be memory-mapped while the run is still going:
+
+    <directory>/meta.json       column names, dtype, completion state
+    <directory>/<column>.bin    little-endian samples, appended in blocks
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+class SampleSink:
+    """
+    Chunked, append-only writer for multi-column sample series.
+
+    Example:
+        with SampleSink("results/streams/ocv_run", ["time", "voltage"]) as sink:
+            for t, v in acquire():
+                sink.append(t, v)
+            series = sink.read()
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        columns: Sequence[str],
+        block_size: int = 4096,
+        max_delay: Optional[float] = 5.0,
+        dtype: str = "<f8",
+        on_flush: Optional[Callable[[Dict[str, np.ndarray], int], None]] = None
+    ):
+        """
+        Initialize the sink and create its directory.
+
+        Args:
+            directory (str): Directory for the column files
+            columns (Sequence[str]): Column names, in the order values are appended
+            block_size (int): Number of samples buffered before writing to disk
+            max_delay (Optional[float]): Also write a partial block once this many
+                seconds have passed since the last write. None to disable
+            dtype (str): NumPy dtype of the stored samples
+            on_flush (Optional[Callable]): Called as on_flush(block, offset) after each
+                write, with the written samples per column and the index of the first one
+        """
+        if block_size <= 0:
+            raise ValueError("Block size must be positive")
+
+        self.directory = directory
+        self.columns = list(columns)
+        self.block_size = block_size
+        self.max_delay = max_delay
+        self.dtype = np.dtype(dtype)
+        self.on_flush = on_flush
+        self.count = 0
+
+        self._block = np.empty((block_size, len(self.columns)), dtype=self.dtype)
+        self._filled = 0
+        self._last_flush = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        self._files = {
+            column: open(self._column_path(directory, column), "wb")
+            for column in self.columns
+        }
+        self._write_meta(complete=False)
+
+    @staticmethod
+    def _column_path(directory: str, column: str) -> str:
+        return os.path.join(directory, f"{column}.bin")
+
+    def _write_meta(self, complete: bool) -> None:
+        """Write the metadata file atomically."""
+        meta_path = os.path.join(self.directory, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({
+                "columns": self.columns,
+                "dtype": self.dtype.str,
+                "block_size": self.block_size,
+                "count": self.count,
+                "complete": complete
+            }, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def append(self, *values: float) -> None:
+        """
+        Append one sample.
+
+        Args:
+            *values (float): One value per column, in column order
+        """
+        self._block[self._filled] = values
+        self._filled += 1
+        self.count += 1
+        if self._filled == self.block_size or self._flush_due():
+            self.flush()
+
+    def extend(self, data: Dict[str, np.ndarray]) -> None:
+        """
+        Append many samples at once.
+
+        Args:
+            data (Dict[str, np.ndarray]): Equal-length arrays keyed by column name
+        """
+        arrays = [np.asarray(data[column], dtype=self.dtype) for column in self.columns]
+        length = len(arrays[0])
+        start = 0
+        while start < length:
+            take = min(self.block_size - self._filled, length - start)
+            for i, array in enumerate(arrays):
+                self._block[self._filled:self._filled + take, i] = array[start:start + take]
+            self._filled += take
+            self.count += take
+            start += take
+            if self._filled == self.block_size:
+                self.flush()
+        if self._flush_due():
+            self.flush()
+
+    def _flush_due(self) -> bool:
+        return (self.max_delay is not None and self._filled > 0
+                and time.monotonic() - self._last_flush >= self.max_delay)
+
+    def flush(self) -> None:
+        """Write buffered samples to disk."""
+        if self._filled:
+            for i, column in enumerate(self.columns):
+                f = self._files[column]
+                f.write(self._block[:self._filled, i].tobytes())
+                f.flush()
+            if self.on_flush:
+                block = {column: self._block[:self._filled, i] for i, column in enumerate(self.columns)}
+                self.on_flush(block, self.count - self._filled)
+            self._filled = 0
+        self._last_flush = time.monotonic()
+
+    def read(self) -> Dict[str, np.ndarray]:
+        """
+        Flush and memory-map everything written so far.
+
+        Returns:
+            Dict[str, np.ndarray]: Read-only array per column
+        """
+        self.flush()
+        return read_samples(self.directory)
+
+    def close(self) -> None:
+        """Flush remaining samples and mark the series complete."""
+        if not self._files:
+            return
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        self._write_meta(complete=True)
+
+    def __enter__(self) -> "SampleSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def read_samples(directory: str) -> Dict[str, np.ndarray]:
+    """
+    Memory-map the samples of a sink, including one that is still being written.
+
+    Only whole samples present in every column are returned.
+
+    Args:
+        directory (str): Sink directory
+
+    Returns:
+        Dict[str, np.ndarray]: Read-only array per column
+    """
+    with open(os.path.join(directory, "meta.json"), "r") as f:
+        meta = json.load(f)
+
+    dtype = np.dtype(meta["dtype"])
+    paths = {column: SampleSink._column_path(directory, column) for column in meta["columns"]}
+    length = min(os.path.getsize(path) // dtype.itemsize for path in paths.values())
+
+    if length == 0:
+        return {column: np.empty(0, dtype=dtype) for column in paths}
+    return {
+        column: np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+        for column, path in paths.items()
+    }
@@ -1,5 +1,11 @@
+import contextlib
+import inspect
 import logging
-from typing import Dict, Any
+import re
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
 
 LOGGER = logging.getLogger(__name__)
 
@@ -60,3 +66,316 @@ def execute_arduino_actions(control_dict: Dict[str, Any], arduino) -> None:
             continue
     
     LOGGER.info("Completed Arduino actions") 
+
+
+# Keys of control dictionaries that drive a device, e.g. "pump0_ml"
+_ACTION_KEY = re.compile(r"^(base|pump|ultrasonic)(\d+)_(temp|ml|ms)$")
+
+
+def plan_arduino_actions(control_dict: Dict[str, Any]) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+    """
+    Work out the order and dependencies of Arduino control actions.
+
+    Without a "depends_on" entry every action waits for the one before it, as
+    the actions used to run one after another. With "depends_on", an action
+    only waits for the actions it lists and starts immediately otherwise.
+    "measure_after" lists the actions the measurement waits for, all of them
+    by default; the others run alongside the measurement.
+
+    Args:
+        control_dict (Dict[str, Any]): Arduino control parameters
+
+    Returns:
+        Tuple[List[str], Dict[str, List[str]], List[str]]: Action keys in
+            start order, the dependencies of each action and the actions the
+            measurement waits for
+
+    Raises:
+        ValueError: For unknown action names or circular dependencies
+
+    Examples:
+        control_dict = {
+            "base0_temp": 60,
+            "pump0_ml": 2.5,
+            "ultrasonic1_ms": 3000,
+            "depends_on": {"ultrasonic1_ms": []},
+            "measure_after": ["pump0_ml"]
+        }
+    """
+    actions = [key for key, value in control_dict.items() if _ACTION_KEY.match(key) and value is not None]
+
+    if "depends_on" in control_dict:
+        dependencies = {key: list(control_dict["depends_on"].get(key, [])) for key in actions}
+        for key in control_dict["depends_on"]:
+            if key not in dependencies:
+                raise ValueError(f"depends_on refers to unknown Arduino action: {key}")
+    else:
+        dependencies = {key: actions[i - 1:i] for i, key in enumerate(actions)}
+
+    measure_after = list(control_dict.get("measure_after", actions))
+    for key in measure_after + [dep for deps in dependencies.values() for dep in deps]:
+        if key not in dependencies:
+            raise ValueError(f"Unknown Arduino action: {key}")
+
+    return _start_order(actions, dependencies), dependencies, measure_after
+
+
+def _start_order(actions: List[str], dependencies: Dict[str, List[str]]) -> List[str]:
+    """Order actions after their dependencies, keeping the written order for ties."""
+    remaining = {key: len(set(deps)) for key, deps in dependencies.items()}
+    dependents: Dict[str, List[str]] = {key: [] for key in actions}
+    for key, deps in dependencies.items():
+        for dep in set(deps):
+            dependents[dep].append(key)
+
+    order: List[str] = []
+    ready = [key for key in actions if not remaining[key]]
+    while ready:
+        key = ready.pop(0)
+        order.append(key)
+        for dependent in dependents[key]:
+            remaining[dependent] -= 1
+            if not remaining[dependent]:
+                ready.append(dependent)
+        ready.sort(key=actions.index)
+
+    if len(order) < len(actions):
+        raise ValueError(f"Circular Arduino action dependencies: "
+                         f"{', '.join(key for key in actions if key not in order)}")
+    return order
+
+
+def _call_arduino_action(key: str, value: Any, arduino, blocking: bool = True):
+    """Call the Arduino method behind a control key."""
+    device, number, _ = _ACTION_KEY.match(key).groups()
+    number = int(number)
+    extra = {} if blocking else {"blocking": False}
+    if device == "base":
+        return arduino.setTemp(number, float(value), **extra)
+    if device == "pump":
+        return arduino.dispense_ml(number, float(value), **extra)
+    return arduino.setUltrasonicOnTimer(number, int(value), **extra)
+
+
+# Time the Arduino gets beyond an action's own duration before it counts as
+# frozen, as in the client's blocking calls (timeOn_ms/1000 + 3)
+ACTION_TIMEOUT_MARGIN_S = 3.0
+
+# Deadline of a pump action when the client doesn't expose its pump calibration
+_UNCALIBRATED_PUMP_TIMEOUT_S = 300.0
+
+
+def _action_timeout(key: str, value: Any, arduino) -> float:
+    """Get how long an action may take before the Arduino is considered frozen."""
+    device, number, _ = _ACTION_KEY.match(key).groups()
+    if device == "ultrasonic":
+        return int(value) / 1000 + ACTION_TIMEOUT_MARGIN_S
+    if device == "pump":
+        try:
+            # dispense_ml runs the pump for volume / slope seconds
+            return float(value) / arduino.pump_slope[int(number)] + ACTION_TIMEOUT_MARGIN_S
+        except (AttributeError, LookupError, TypeError, ZeroDivisionError):
+            return _UNCALIBRATED_PUMP_TIMEOUT_S
+    return ACTION_TIMEOUT_MARGIN_S
+
+
+class _InFlightActions:
+    """Action requests written to one Arduino and not answered yet."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: List[Future] = []
+
+    def discard(self, request: Future) -> None:
+        with self.lock:
+            if request in self.requests:
+                self.requests.remove(request)
+
+    def pending(self) -> int:
+        with self.lock:
+            return sum(not request.done() for request in self.requests)
+
+
+# Shared by every schedule on the same client, e.g. concurrent experiments
+_IN_FLIGHT: "weakref.WeakKeyDictionary[Any, _InFlightActions]" = weakref.WeakKeyDictionary()
+_IN_FLIGHT_LOCK = threading.Lock()
+
+
+def _in_flight(arduino) -> _InFlightActions:
+    """Get the in-flight actions of an Arduino client."""
+    with _IN_FLIGHT_LOCK:
+        if arduino not in _IN_FLIGHT:
+            _IN_FLIGHT[arduino] = _InFlightActions()
+        return _IN_FLIGHT[arduino]
+
+
+def _supports_futures(arduino, key: str) -> bool:
+    """Check whether the client can start an action without waiting for it."""
+    method = {"base": "setTemp", "pump": "dispense_ml", "ultrasonic": "setUltrasonicOnTimer"}[
+        _ACTION_KEY.match(key).group(1)]
+    try:
+        return "blocking" in inspect.signature(getattr(arduino, method)).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
+def _start_arduino_action(key: str, value: Any, arduino, lock: Optional[threading.Lock]) -> Future:
+    """
+    Start one action and get a Future that resolves once the Arduino finished it.
+
+    Clients that return futures (blocking=False) are only locked while the
+    command is written, so timers on different devices overlap. Other clients
+    run in a thread that holds the lock for the whole action.
+
+    A pending request gets the deadline the client's blocking calls use,
+    counted from when the Arduino can start it: plain firmware runs commands
+    one after another, so that is once the actions written before it are
+    answered. If the Arduino hasn't answered by then the action fails. The
+    Arduino is only assumed frozen, and the connection refreshed, when no
+    other action is in flight, since a refresh drops every pending command.
+    """
+    done = Future()
+    lock = lock or contextlib.nullcontext()
+    finish_lock = threading.Lock()
+
+    def _finish(error: Optional[BaseException]) -> bool:
+        # The answer and the deadline race; only the first one counts
+        with finish_lock:
+            if done.done():
+                return False
+            if error is None:
+                LOGGER.info(f"Arduino action {key}={value} completed")
+            else:
+                # Continue with other actions even if one fails
+                LOGGER.error(f"Error executing Arduino action {key}={value}: {str(error)}")
+            done.set_result(error is None)
+            return True
+
+    if _supports_futures(arduino, key):
+        in_flight = _in_flight(arduino)
+        try:
+            with lock, in_flight.lock:
+                request = _call_arduino_action(key, value, arduino, blocking=False)
+                if isinstance(request, Future):
+                    # Tagged firmware runs commands side by side
+                    ahead = [] if getattr(arduino, "taggedProtocol", False) else list(in_flight.requests)
+                    in_flight.requests.append(request)
+        except Exception as e:
+            _finish(e)
+            return done
+        if not isinstance(request, Future):
+            _finish(None)
+            return done
+        request.add_done_callback(in_flight.discard)
+
+        timeout_s = _action_timeout(key, value, arduino)
+
+        expired = threading.Event()
+
+        def _expire() -> None:
+            expired.set()
+            if not request.cancel():
+                # Answered in the meantime
+                return
+            # Reset before finishing, so dependent actions aren't written
+            # to a connection that is about to be refreshed
+            others = in_flight.pending()
+            if others:
+                LOGGER.warning(f"Not resetting the Arduino while {others} other actions are in flight")
+            elif hasattr(arduino, "refreshConnection"):
+                # Same recovery as the client's blocking calls: reset the Arduino
+                try:
+                    with lock:
+                        arduino.refreshConnection()
+                except Exception as e:
+                    LOGGER.error(f"Failed to refresh the Arduino connection: {str(e)}")
+            _finish(TimeoutError(f"No answer from the Arduino within {timeout_s:.1f} s"))
+
+        deadline = threading.Timer(timeout_s, _expire)
+        deadline.daemon = True
+        _when_done(ahead, deadline.start)
+
+        def _answered(request: Future) -> None:
+            deadline.cancel()
+            if request.cancelled() and expired.is_set():
+                # Cancelled by the deadline, which finishes the action
+                return
+            _finish(None if request.cancelled() else request.exception())
+
+        request.add_done_callback(_answered)
+        return done
+
+    def _run() -> None:
+        try:
+            with lock:
+                _call_arduino_action(key, value, arduino)
+        except Exception as e:
+            _finish(e)
+            return
+        _finish(None)
+
+    threading.Thread(target=_run, name=f"arduino-{key}", daemon=True).start()
+    return done
+
+
+def schedule_arduino_actions(control_dict: Dict[str, Any], arduino,
+                             lock: Optional[threading.Lock] = None) -> Dict[str, Future]:
+    """
+    Start Arduino control actions as futures, each once its dependencies are done.
+
+    See plan_arduino_actions for the "depends_on" and "measure_after" entries.
+    A failed action is logged and counts as done, so the actions after it
+    still run. Each Future resolves to True if its action succeeded.
+
+    Args:
+        control_dict (Dict[str, Any]): Arduino control parameters
+        arduino: Arduino client instance
+        lock (Optional[threading.Lock]): Lock guarding the Arduino connection
+
+    Returns:
+        Dict[str, Future]: Completion of each action by key
+
+    Raises:
+        ValueError: For unknown action names or circular dependencies
+    """
+    order, dependencies, _ = plan_arduino_actions(control_dict)
+    LOGGER.info(f"Scheduling Arduino actions: {control_dict}")
+
+    futures: Dict[str, Future] = {}
+    for key in order:
+        futures[key] = _start_after(
+            [futures[dep] for dep in dependencies[key]],
+            lambda key=key: _start_arduino_action(key, control_dict[key], arduino, lock)
+        )
+    return futures
+
+
+def _when_done(dependencies: List[Future], callback) -> None:
+    """Call callback() once every dependency is done."""
+    if not dependencies:
+        callback()
+        return
+
+    remaining = [len(dependencies)]
+    counter_lock = threading.Lock()
+
+    def _dependency_done(_) -> None:
+        with counter_lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        callback()
+
+    for dependency in dependencies:
+        dependency.add_done_callback(_dependency_done)
+
+
+def _start_after(dependencies: List[Future], start) -> Future:
+    """Call start() once every dependency is done and get a Future of its result."""
+    if not dependencies:
+        return start()
+
+    result = Future()
+    _when_done(dependencies,
+               lambda: start().add_done_callback(lambda action: result.set_result(action.result())))
+    return result
@@ -8,13 +8,23 @@ This script loads a workflow JSON file and executes each step in sequence.
 It maps operations in the workflow to function calls using the appropriate classes.
 """
 
+import contextlib
 import json
 import logging
 import os
 import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, FrozenSet, List, Optional, Tuple
+
+from labware_registry import DeckLayout, LabwareError, get_registry, standard_tiprack_definition
+from motion_planner import DEFAULT_SPEED, MotionPlanner
+from scheduler import arduino_resources, resources_for_params
+from temperature_monitor import TemperatureMonitor
+from tip_tracker import DEFAULT_STATE_FILE, OutOfTipsError, TipTracker
+from workflow_graph import WorkflowGraph
 
 # Import OT-2 and Arduino control classes
 # Create a mock opentronsClient class for testing
@@ -29,6 +39,9 @@ class opentronsClient:
     def homeRobot(self):
         print("Homing robot")
 
+    def commandBatch(self, fltTimeout=None):
+        return contextlib.nullcontext()
+
     def loadLabware(self, intSlot, strLabwareName):
         print(f"Loading labware {strLabwareName} in slot {intSlot}")
         return f"{strLabwareName}_{intSlot}"
@@ -113,6 +126,11 @@ logging.basicConfig(
 )
 LOGGER = logging.getLogger("WorkflowExecutor")
 
+# OT-2 actions that only queue run commands and can be sent as one batch.
+# Homing goes through a separate endpoint and wash steps need the robot in
+# place before the pumps start, so both end a batch.
+BATCHABLE_ACTIONS = ("pick_up_tip", "drop_tip", "move_to")
+
 class WorkflowExecutor:
     """
     Class for executing OT-2 workflows defined in JSON files.
@@ -122,7 +140,9 @@ class WorkflowExecutor:
     2. Prefect-based execution (new mode)
     """
 
-    def __init__(self, workflow_file: str, use_prefect: bool = False, mock_mode: bool = False):
+    def __init__(self, workflow_file: str, use_prefect: bool = False, mock_mode: bool = False,
+                 max_parallel_nodes: int = 4, optimize_motion: bool = False,
+                 tip_state_file: Optional[str] = DEFAULT_STATE_FILE, reset_tips: bool = False):
         """
         Initialize the workflow executor.
 
@@ -130,15 +150,33 @@ class WorkflowExecutor:
             workflow_file (str): Path to the workflow JSON file
             use_prefect (bool): Whether to use Prefect for workflow execution
             mock_mode (bool): Whether to use mock mode (no real devices)
+            max_parallel_nodes (int): Maximum number of nodes on disjoint hardware running at once
+            optimize_motion (bool): Whether to reorder well visits marked "reorderable" to shorten gantry travel
+            tip_state_file (Optional[str]): File that keeps tip rack usage across runs, None to keep it in memory
+            reset_tips (bool): Whether to treat every tip rack as full, e.g. after a refill
         """
         self.workflow_file = workflow_file
         self.workflow = self._load_workflow(workflow_file)
         self.ot2_client = None
         self.arduino_client = None
+        self.temperature_monitor = None
         self.labware_ids = {}
+        # Custom labware definitions are parsed once per process and indexed by slot
+        self.labware_registry = get_registry(os.path.join(os.getcwd(), 'labware'))
+        self.deck = DeckLayout()
+        self.tip_tracker = TipTracker(tip_state_file)
+        self.reset_tips = reset_tips
+        # Last known gantry target, used to pick the nearest tip
+        self._gantry_position = None
+        # Tip and gantry updates waiting for their batched commands to finish
+        self._batch_updates: Optional[List[Tuple[Future, Callable[[], None]]]] = None
         self.use_prefect = use_prefect
         self.mock_mode = mock_mode
+        self.max_parallel_nodes = max_parallel_nodes
+        self.optimize_motion = optimize_motion
         self.prefect_executor = None
+        # Nodes on different bases or pumps may run concurrently but share one serial link
+        self._arduino_lock = threading.Lock()
 
         # Initialize operation dispatcher
         self.operation_dispatcher = {
@@ -193,6 +231,7 @@ class WorkflowExecutor:
             LOGGER.info("Connecting to Arduino...")
             self.arduino_client = Arduino()
             LOGGER.info("Connected to Arduino")
+            self._start_temperature_monitor()
         except Exception as e:
             LOGGER.warning(f"Failed to connect to Arduino: {str(e)}")
             LOGGER.warning("Some functionality may be limited")
@@ -203,6 +242,8 @@ class WorkflowExecutor:
     def setup_labware(self) -> bool:
         """Set up labware on the OT-2 robot."""
         try:
+            self.deck = DeckLayout()
+
             # Load labware from global config
             labware_config = self.workflow.get("global_config", {}).get("labware", {})
 
@@ -214,7 +255,10 @@ class WorkflowExecutor:
 
                 # Check if it's a standard labware or custom labware
                 if labware_type.startswith("opentrons_"):
-                    # Standard Opentrons labware
+                    # Standard Opentrons labware; only tip rack geometry is known locally
+                    tiprack = standard_tiprack_definition(labware_type)
+                    if tiprack is not None:
+                        self.deck.place(slot, tiprack, name=labware_name)
                     try:
                         labware_id = self.ot2_client.loadLabware(
                             intSlot=slot,
@@ -236,13 +280,14 @@ class WorkflowExecutor:
                         LOGGER.debug(f"Exception details: {str(e)}")
                 else:
                     # Custom labware - load from JSON file or use mock labware
-                    custom_labware_path = os.path.join(os.getcwd(), 'labware', f"{labware_type}.json")
+                    custom_labware_path = self.labware_registry.path_for(labware_type)
                     LOGGER.info(f"Looking for custom labware at: {custom_labware_path}")
 
-                    if os.path.exists(custom_labware_path):
+                    if self.labware_registry.has(labware_type):
                         try:
-                            with open(custom_labware_path, 'r', encoding='utf-8') as f:
-                                custom_labware = json.load(f)
+                            definition = self.labware_registry.load(labware_type)
+                            self.deck.place(slot, definition, name=labware_name)
+                            custom_labware = definition.definition
 
                             LOGGER.info(f"Successfully loaded custom labware definition from {custom_labware_path}")
                             try:
@@ -282,6 +327,8 @@ class WorkflowExecutor:
                         self.labware_ids[labware_name] = f"{labware_type}_{slot}"
                         LOGGER.warning(f"Using mock labware ID: {self.labware_ids[labware_name]}")
 
+            self._setup_tip_racks()
+
             # Load pipettes from global config
             pipette_config = self.workflow.get("global_config", {}).get("instruments", {}).get("pipette", {})
             pipette_type = pipette_config.get("type")
@@ -343,63 +390,187 @@ class WorkflowExecutor:
             nodes = self.workflow.get("nodes", [])
             edges = self.workflow.get("edges", [])
 
-            # Create a dictionary to map node IDs to nodes
-            node_map = {node["id"]: node for node in nodes}
-
-            # Create a dictionary to map node IDs to their children
-            children_map = {}
-            for edge in edges:
-                source = edge.get("source")
-                target = edge.get("target")
-                if source not in children_map:
-                    children_map[source] = []
-                children_map[source].append(target)
-
-            # Find the starting node (node with no incoming edges)
-            starting_nodes = []
-            all_targets = [edge.get("target") for edge in edges]
-            for node in nodes:
-                if node["id"] not in all_targets:
-                    starting_nodes.append(node["id"])
-
-            if not starting_nodes:
-                LOGGER.error("No starting node found in the workflow")
+            if not nodes:
+                LOGGER.error("No nodes found in the workflow")
                 return False
 
-            # Execute the workflow starting from the starting node
-            for starting_node_id in starting_nodes:
-                self._execute_node(starting_node_id, node_map, children_map)
+            # Order the nodes up front; cycles and dangling edges fail here
+            graph = WorkflowGraph(nodes, edges)
+            LOGGER.info(f"Execution order: {graph.order}")
+            self._plan_motion(graph)
+
+            # Run each node once, independent nodes concurrently when their hardware doesn't overlap
+            graph.run(
+                self._execute_node,
+                resources=self._node_resources,
+                max_workers=self.max_parallel_nodes
+            )
 
             LOGGER.info("Workflow execution completed successfully")
             return True
         except Exception as e:
             LOGGER.error(f"Failed to execute workflow: {str(e)}")
             return False
-
-    def _execute_node(self, node_id: str, node_map: Dict[str, Dict[str, Any]], children_map: Dict[str, List[str]]) -> None:
-        """Execute a node and its children."""
-        # Get the node
-        node = node_map.get(node_id)
-        if not node:
-            LOGGER.error(f"Node {node_id} not found in the workflow")
+        finally:
+            if self.temperature_monitor is not None:
+                self.temperature_monitor.stop()
+
+    def _start_temperature_monitor(self) -> None:
+        """Sample the heater bases in the background, if the Arduino can read them."""
+        if not hasattr(self.arduino_client, "getTemp"):
+            LOGGER.warning("Arduino client cannot read temperatures; waiting for stable temperatures is disabled")
             return
+        control = self.workflow.get("global_config", {}).get("arduino_control", {})
+        self.temperature_monitor = TemperatureMonitor(
+            self.arduino_client,
+            bases=control.get("bases", [0, 1]),
+            interval_s=control.get("temp_sample_interval_s", 1.0)
+        )
+        self.temperature_monitor.start()
 
-        LOGGER.info(f"Executing node: {node_id} ({node.get('label')})")
+    def _action_position(self, action: Dict[str, Any]) -> Optional[Any]:
+        """Get the absolute target of a move action, if its labware geometry is known."""
+        labware = action.get("labware")
+        if not self.deck.has_labware(labware):
+            return None
+        try:
+            return self.deck.well_position(labware, action.get("well"), origin="top",
+                                           offset=action.get("offset"))
+        except LabwareError:
+            return None
+
+    def _plan_motion(self, graph: WorkflowGraph) -> None:
+        """Estimate gantry travel per node and, if enabled, reorder reorderable well visits."""
+        planner = MotionPlanner(self._action_position)
+        position = None
+        total_before = total_after = 0.0
+
+        for node_id in graph.order:
+            params = graph.nodes[node_id].get("params", {})
+            ot2_actions = params.get("ot2_actions") or []
+            if not ot2_actions:
+                continue
+
+            before, end_position = planner.estimate(ot2_actions, start=position)
+            after = before
+            if self.optimize_motion:
+                planned = planner.optimize(ot2_actions, start=position)
+                if planned != ot2_actions:
+                    after, end_position = planner.estimate(planned, start=position)
+                    params["ot2_actions"] = planned
+                    LOGGER.info(f"Reordered OT-2 actions of node {node_id}: "
+                                f"{before:.1f} s -> {after:.1f} s of gantry travel")
+            total_before += before
+            total_after += after
+            position = end_position
+
+        if self.optimize_motion:
+            LOGGER.info(f"Estimated gantry travel: {total_after:.1f} s "
+                        f"({total_before - total_after:.1f} s saved by reordering)")
+        else:
+            LOGGER.info(f"Estimated gantry travel: {total_after:.1f} s")
+
+    def _node_resources(self, node: Dict[str, Any]) -> FrozenSet[str]:
+        """Get the hardware a node touches, e.g. {"ot2", "arduino:base0"}."""
+        return resources_for_params(node.get("params", {}), measurement=False)
+
+    def _can_overlap(self, ot2_actions: List[Dict[str, Any]], arduino_control: Dict[str, Any]) -> bool:
+        """
+        Check whether a node's Arduino control may run while its OT-2 actions do.
+
+        Only heater setpoints move ahead of the robot, and only on bases that
+        none of the OT-2 actions (e.g. wash steps) use. Pumps and sonication
+        keep the authored order, since they need the robot in place first.
+        """
+        control_resources = arduino_resources(arduino_control)
+        if not ot2_actions or not control_resources:
+            return False
+        if arduino_resources({key: value for key, value in arduino_control.items()
+                              if key.startswith(("pump", "ultrasonic"))}):
+            return False
+        action_resources = resources_for_params({"ot2_actions": ot2_actions}, measurement=False)
+        return not (control_resources & action_resources)
+
+    def _execute_node(self, node: Dict[str, Any]) -> None:
+        """Execute a single node. Its successors are scheduled by the WorkflowGraph."""
+        LOGGER.info(f"Executing node: {node.get('id')} ({node.get('label')})")
 
-        # Execute OT-2 actions
         ot2_actions = node.get("params", {}).get("ot2_actions", [])
-        for action in ot2_actions:
-            self._execute_action(action)
+        arduino_control = node.get("params", {}).get("arduino_control", {})
+
+        # Preheat other bases while the robot moves; the node finishes only
+        # when both are done
+        if self._can_overlap(ot2_actions, arduino_control):
+            LOGGER.info(f"Running Arduino control alongside OT-2 actions for node {node.get('id')}")
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="arduino") as pool:
+                arduino_done = pool.submit(self._execute_arduino_control, arduino_control)
+                self._execute_ot2_actions(ot2_actions)
+                arduino_done.result()
+            return
+
+        # Execute OT-2 actions
+        self._execute_ot2_actions(ot2_actions)
 
         # Execute Arduino control
-        arduino_control = node.get("params", {}).get("arduino_control", {})
         if arduino_control:
             self._execute_arduino_control(arduino_control)
 
-        # Execute children nodes
-        children = children_map.get(node_id, [])
-        for child_id in children:
-            self._execute_node(child_id, node_map, children_map)
+    def _execute_ot2_actions(self, ot2_actions: List[Dict[str, Any]]) -> None:
+        """Execute a node's OT-2 actions, sending each run of robot-only actions as one batch."""
+        batch = []
+        for action in ot2_actions:
+            if action.get("action") in BATCHABLE_ACTIONS:
+                # Choosing a tip needs the tip state after the queued commands
+                if batch and action.get("action") in ("pick_up_tip", "drop_tip") and action.get("well") == "auto":
+                    self._execute_batch(batch)
+                    batch = []
+                batch.append(action)
+                continue
+            self._execute_batch(batch)
+            batch = []
+            self._execute_action(action)
+        self._execute_batch(batch)
+
+    def _execute_batch(self, actions: List[Dict[str, Any]]) -> None:
+        """Queue several OT-2 actions on the run and wait once for all of them."""
+        if len(actions) < 2:
+            for action in actions:
+                self._execute_action(action)
+            return
+
+        LOGGER.info(f"Sending {len(actions)} OT-2 actions as one batch")
+        self._batch_updates = []
+        try:
+            with self.ot2_client.commandBatch():
+                for action in actions:
+                    self._execute_action(action)
+        except Exception as e:
+            LOGGER.error(f"Failed to execute OT-2 batch: {str(e)}")
+            LOGGER.warning(f"Continuing with workflow execution...")
+        finally:
+            updates, self._batch_updates = self._batch_updates, None
+            self._apply_batch_updates(updates)
+
+    def _after_command(self, handle: Any, update: Callable[[], None]) -> None:
+        """
+        Record the effect of an OT-2 command once the robot has carried it out.
+
+        Inside a batch, commands only return the Future of the queued command,
+        so the update waits until the batch has finished.
+        """
+        if self._batch_updates is not None and isinstance(handle, Future):
+            self._batch_updates.append((handle, update))
+        else:
+            update()
+
+    def _apply_batch_updates(self, updates: List[Tuple[Future, Callable[[], None]]]) -> None:
+        """Apply the updates of the batched commands that succeeded, in command order."""
+        for handle, update in updates:
+            if handle.done() and not handle.cancelled() and handle.exception() is None:
+                update()
+            else:
+                LOGGER.warning(f"OT-2 command {getattr(handle, 'commandID', '')} did not complete, "
+                               f"not recording its tip or gantry update")
 
     def _execute_action(self, action: Dict[str, Any]) -> None:
         """Execute an OT-2 action."""
@@ -409,6 +580,29 @@ class WorkflowExecutor:
         else:
             LOGGER.error(f"Unknown action type: {action_type}")
 
+    def _setup_tip_racks(self) -> None:
+        """Track the tips of every tip rack on the deck."""
+        for labware_name, slot in self.deck.names.items():
+            definition = self.deck.definition(labware_name)
+            if not definition.is_tiprack:
+                continue
+            positions = self.deck.well_positions(labware_name)
+            self.tip_tracker.add_rack(labware_name, definition.load_name, slot, definition.well_names,
+                                      [positions[well] for well in definition.well_names])
+        if self.reset_tips:
+            self.tip_tracker.reset()
+
+    def _moved_to(self, labware: str, well: str) -> None:
+        """Remember where the gantry went."""
+        self._gantry_position = self._action_position({"labware": labware, "well": well})
+
+    def _check_well(self, labware: str, well: str) -> bool:
+        """Check a well against the labware definition, when the geometry is known locally."""
+        if self.deck.has_labware(labware) and not self.deck.has_well(labware, well):
+            LOGGER.error(f"Labware {labware} has no well {well}")
+            return False
+        return True
+
     def _execute_pick_up_tip(self, action: Dict[str, Any]) -> None:
         """Execute pick_up_tip action."""
         labware = action.get("labware")
@@ -426,6 +620,19 @@ class WorkflowExecutor:
             LOGGER.warning(f"Skipping pick_up_tip action for {labware} {well}")
             return
 
+        if well == "auto":
+            try:
+                _, well = self.tip_tracker.allocate(labware, near=self._gantry_position)
+            except OutOfTipsError as e:
+                LOGGER.error(f"Failed to allocate a tip: {str(e)}")
+                LOGGER.warning(f"Skipping pick_up_tip action for {labware}")
+                return
+            LOGGER.info(f"Allocated tip {labware} {well}")
+
+        if not self._check_well(labware, well):
+            LOGGER.warning(f"Skipping pick_up_tip action for {labware} {well}")
+            return
+
         # Move to the tip rack
         try:
             self.ot2_client.moveToWell(
@@ -436,17 +643,23 @@ class WorkflowExecutor:
                 fltOffsetX=offset_x,
                 fltOffsetY=offset_y,
                 fltOffsetZ=offset_z,
-                intSpeed=100
+                intSpeed=action.get("speed", DEFAULT_SPEED)
             )
 
             # Pick up the tip
-            self.ot2_client.pickUpTip(
+            handle = self.ot2_client.pickUpTip(
                 strLabwareName=self.labware_ids.get(labware),
                 strPipetteName="p1000_single_gen2",
                 strWellName=well,
                 fltOffsetX=offset_x,
                 fltOffsetY=offset_y
             )
+
+            def _picked_up() -> None:
+                self.tip_tracker.picked_up(labware, well)
+                self._moved_to(labware, well)
+
+            self._after_command(handle, _picked_up)
         except Exception as e:
             LOGGER.error(f"Failed to pick up tip: {str(e)}")
             LOGGER.warning(f"Continuing with workflow execution...")
@@ -469,6 +682,19 @@ class WorkflowExecutor:
             LOGGER.warning(f"Skipping drop_tip action for {labware} {well}")
             return
 
+        if well == "auto":
+            # Back where the tip came from when returning it to a rack
+            well = self.tip_tracker.return_well(labware) if self.tip_tracker.is_tiprack(labware) else "A1"
+            if well is None:
+                LOGGER.error(f"No empty well in {labware} to return the tip to")
+                LOGGER.warning(f"Skipping drop_tip action for {labware}")
+                return
+            LOGGER.info(f"Dropping tip into {labware} {well}")
+
+        if not self._check_well(labware, well):
+            LOGGER.warning(f"Skipping drop_tip action for {labware} {well}")
+            return
+
         # Move to the tip rack
         try:
             self.ot2_client.moveToWell(
@@ -479,11 +705,11 @@ class WorkflowExecutor:
                 fltOffsetX=offset_x,
                 fltOffsetY=offset_y,
                 fltOffsetZ=offset_z,
-                intSpeed=100
+                intSpeed=action.get("speed", DEFAULT_SPEED)
             )
 
             # Drop the tip
-            self.ot2_client.dropTip(
+            handle = self.ot2_client.dropTip(
                 strLabwareName=self.labware_ids.get(labware),
                 strPipetteName="p1000_single_gen2",
                 strWellName=well,
@@ -492,6 +718,12 @@ class WorkflowExecutor:
                 fltOffsetY=offset_y,
                 fltOffsetZ=offset_z
             )
+
+            def _dropped() -> None:
+                self.tip_tracker.dropped(labware, well)
+                self._moved_to(labware, well)
+
+            self._after_command(handle, _dropped)
         except Exception as e:
             LOGGER.error(f"Failed to drop tip: {str(e)}")
             LOGGER.warning(f"Continuing with workflow execution...")
@@ -514,9 +746,13 @@ class WorkflowExecutor:
             LOGGER.warning(f"Skipping move_to action for {labware} {well}")
             return
 
+        if not self._check_well(labware, well):
+            LOGGER.warning(f"Skipping move_to action for {labware} {well}")
+            return
+
         # Move to the well
         try:
-            self.ot2_client.moveToWell(
+            handle = self.ot2_client.moveToWell(
                 strLabwareName=self.labware_ids.get(labware),
                 strWellName=well,
                 strPipetteName="p1000_single_gen2",
@@ -524,8 +760,9 @@ class WorkflowExecutor:
                 fltOffsetX=offset_x,
                 fltOffsetY=offset_y,
                 fltOffsetZ=offset_z,
-                intSpeed=100
+                intSpeed=action.get("speed", DEFAULT_SPEED)
             )
+            self._after_command(handle, lambda: self._moved_to(labware, well))
         except Exception as e:
             LOGGER.error(f"Failed to move to well: {str(e)}")
             LOGGER.warning(f"Continuing with workflow execution...")
@@ -544,19 +781,20 @@ class WorkflowExecutor:
 
         # Execute Arduino actions
         try:
-            for pump_name, volume in arduino_actions.items():
-                if pump_name == "pump0_ml" and volume > 0:
-                    LOGGER.info(f"Dispensing {volume}ml from pump 0 (water)")
-                    self.arduino_client.dispense_ml(pumpNumber=0, volume=volume)
-                elif pump_name == "pump1_ml" and volume > 0:
-                    LOGGER.info(f"Dispensing {volume}ml from pump 1 (acid)")
-                    self.arduino_client.dispense_ml(pumpNumber=1, volume=volume)
-                elif pump_name == "pump2_ml" and volume > 0:
-                    LOGGER.info(f"Dispensing {volume}ml from pump 2 (waste)")
-                    self.arduino_client.dispense_ml(pumpNumber=2, volume=volume)
-                elif pump_name == "ultrasonic0_ms" and volume > 0:
-                    LOGGER.info(f"Running ultrasonic for {volume}ms")
-                    self.arduino_client.setUltrasonicOnTimer(0, volume)
+            with self._arduino_lock:
+                for pump_name, volume in arduino_actions.items():
+                    if pump_name == "pump0_ml" and volume > 0:
+                        LOGGER.info(f"Dispensing {volume}ml from pump 0 (water)")
+                        self.arduino_client.dispense_ml(pumpNumber=0, volume=volume)
+                    elif pump_name == "pump1_ml" and volume > 0:
+                        LOGGER.info(f"Dispensing {volume}ml from pump 1 (acid)")
+                        self.arduino_client.dispense_ml(pumpNumber=1, volume=volume)
+                    elif pump_name == "pump2_ml" and volume > 0:
+                        LOGGER.info(f"Dispensing {volume}ml from pump 2 (waste)")
+                        self.arduino_client.dispense_ml(pumpNumber=2, volume=volume)
+                    elif pump_name == "ultrasonic0_ms" and volume > 0:
+                        LOGGER.info(f"Running ultrasonic for {volume}ms")
+                        self.arduino_client.setUltrasonicOnTimer(0, volume)
         except Exception as e:
             LOGGER.error(f"Failed to execute wash action: {str(e)}")
             LOGGER.warning(f"Continuing with workflow execution...")
@@ -585,22 +823,37 @@ class WorkflowExecutor:
         ultrasonic0_ms = arduino_control.get("ultrasonic0_ms")
 
         try:
-            if base0_temp:
-                LOGGER.info(f"Setting base 0 temperature to {base0_temp}°C")
-                self.arduino_client.setTemp(0, base0_temp)
-
-            if pump0_ml and pump0_ml > 0:
-                LOGGER.info(f"Dispensing {pump0_ml}ml from pump 0")
-                self.arduino_client.dispense_ml(pumpNumber=0, volume=pump0_ml)
-
-            if ultrasonic0_ms and ultrasonic0_ms > 0:
-                LOGGER.info(f"Running ultrasonic for {ultrasonic0_ms}ms")
-                self.arduino_client.setUltrasonicOnTimer(0, ultrasonic0_ms)
+            with self._arduino_lock:
+                if base0_temp:
+                    LOGGER.info(f"Setting base 0 temperature to {base0_temp}°C")
+                    self.arduino_client.setTemp(0, base0_temp)
+
+                if pump0_ml and pump0_ml > 0:
+                    LOGGER.info(f"Dispensing {pump0_ml}ml from pump 0")
+                    self.arduino_client.dispense_ml(pumpNumber=0, volume=pump0_ml)
+
+                if ultrasonic0_ms and ultrasonic0_ms > 0:
+                    LOGGER.info(f"Running ultrasonic for {ultrasonic0_ms}ms")
+                    self.arduino_client.setUltrasonicOnTimer(0, ultrasonic0_ms)
         except Exception as e:
             LOGGER.error(f"Failed to execute Arduino control actions: {str(e)}")
             LOGGER.warning(f"Continuing with workflow execution...")
             return
 
+        # Hold the node until the base has settled, without blocking other Arduino users
+        base0_stable_s = arduino_control.get("base0_stable_s")
+        if base0_temp and base0_stable_s is not None:
+            if self.temperature_monitor is None:
+                LOGGER.warning("No temperature monitor running. Not waiting for base 0 to settle.")
+                return
+            if not self.temperature_monitor.wait_until_stable(
+                0, base0_temp,
+                tolerance=arduino_control.get("base0_tolerance", 0.5),
+                hold_s=base0_stable_s,
+                timeout_s=arduino_control.get("base0_timeout_s", 1800)
+            ):
+                LOGGER.warning(f"Continuing with workflow execution...")
+
 if __name__ == "__main__":
     # Parse command line arguments
     import argparse
@@ -610,6 +863,10 @@ if __name__ == "__main__":
     parser.add_argument("--mock", action="store_true", help="Use mock mode (no real devices)")
     parser.add_argument("--register", action="store_true", help="Register workflow with Prefect server")
     parser.add_argument("--project", default="电化学实验", help="Prefect project name for registration")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Maximum number of nodes on disjoint hardware running at once")
+    parser.add_argument("--optimize-motion", action="store_true", help="Reorder well visits marked reorderable to shorten gantry travel")
+    parser.add_argument("--tip-state", default=DEFAULT_STATE_FILE, help="File that keeps track of used tips across runs")
+    parser.add_argument("--reset-tips", action="store_true", help="Treat every tip rack as full, e.g. after a refill")
     args = parser.parse_args()
 
     workflow_file = args.workflow_file
@@ -633,7 +890,11 @@ if __name__ == "__main__":
         executor = WorkflowExecutor(
             workflow_file=workflow_file,
             use_prefect=args.prefect,
-            mock_mode=args.mock
+            mock_mode=args.mock,
+            max_parallel_nodes=args.max_parallel,
+            optimize_motion=args.optimize_motion,
+            tip_state_file=args.tip_state,
+            reset_tips=args.reset_tips
         )
         print(f"Workflow executor created successfully (Prefect: {args.prefect}, Mock: {args.mock})")
 
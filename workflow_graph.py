@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Workflow Graph
+
+This module turns the nodes and edges of a workflow JSON file into a directed
+acyclic graph and executes it. Every node runs exactly once, after all of its
+predecessors have finished, and independent nodes run concurrently as long as
+they don't need the same hardware.
+"""
+
+import bisect
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+class WorkflowGraphError(ValueError):
+    """Raised when a workflow's nodes and edges don't form a valid DAG."""
+    pass
+
+class WorkflowGraph:
+    """
+    Directed acyclic graph of workflow nodes.
+
+    Nodes are ordered topologically; ties are broken by the order the nodes
+    appear in the workflow file.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        """
+        Build the graph and check that it is acyclic.
+
+        Args:
+            nodes: Workflow nodes, each with a unique "id"
+            edges: Workflow edges, each with "source" and "target" node ids
+
+        Raises:
+            WorkflowGraphError: On duplicate node ids, edges to unknown nodes or cycles
+        """
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        for node in nodes:
+            node_id = node.get("id")
+            if node_id in self.nodes:
+                raise WorkflowGraphError(f"Duplicate node id: {node_id}")
+            self.nodes[node_id] = node
+
+        self.successors: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        self.predecessors: Dict[str, Set[str]] = {node_id: set() for node_id in self.nodes}
+        for edge in edges:
+            source, target = edge.get("source"), edge.get("target")
+            for node_id in (source, target):
+                if node_id not in self.nodes:
+                    raise WorkflowGraphError(f"Edge {source} -> {target} refers to unknown node {node_id}")
+            # Repeated edges would make a node wait for the same predecessor twice
+            if source not in self.predecessors[target]:
+                self.successors[source].append(target)
+                self.predecessors[target].add(source)
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Order the nodes with Kahn's algorithm, raising on cycles."""
+        position = {node_id: i for i, node_id in enumerate(self.nodes)}
+        remaining = {node_id: len(preds) for node_id, preds in self.predecessors.items()}
+        ready = sorted((position[n], n) for n, count in remaining.items() if count == 0)
+        order = []
+
+        while ready:
+            _, node_id = ready.pop(0)
+            order.append(node_id)
+            for successor in self.successors[node_id]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    bisect.insort(ready, (position[successor], successor))
+
+        if len(order) < len(self.nodes):
+            cyclic = [node_id for node_id in self.nodes if remaining[node_id] > 0]
+            raise WorkflowGraphError(f"Workflow contains a cycle through nodes: {cyclic}")
+        return order
+
+    def run(
+        self,
+        execute: Callable[[Dict[str, Any]], None],
+        resources: Optional[Callable[[Dict[str, Any]], FrozenSet[str]]] = None,
+        max_workers: int = 4
+    ) -> List[str]:
+        """
+        Execute every node once, in dependency order.
+
+        A node starts when all its predecessors have finished and none of its
+        resources are held by a running node. Ready nodes are started in
+        topological order. After a node fails no new nodes are started; running
+        nodes are allowed to finish and the first error is re-raised.
+
+        Args:
+            execute: Called with each node; runs on a worker thread
+            resources: Returns the hardware a node needs. Without it nodes run one at a time
+            max_workers: Maximum number of nodes running at once
+
+        Returns:
+            List[str]: Node ids in the order they finished
+        """
+        if resources is None:
+            needs = {node_id: frozenset(["workflow"]) for node_id in self.nodes}
+        else:
+            needs = {node_id: frozenset(resources(node)) for node_id, node in self.nodes.items()}
+
+        position = {node_id: i for i, node_id in enumerate(self.order)}
+        remaining = {node_id: len(preds) for node_id, preds in self.predecessors.items()}
+        ready = [node_id for node_id in self.order if remaining[node_id] == 0]
+        busy: Set[str] = set()
+        running = {}
+        finished: List[str] = []
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow") as pool:
+            while ready or running:
+                if error is None:
+                    for node_id in list(ready):
+                        if len(running) >= max_workers:
+                            break
+                        if needs[node_id] & busy:
+                            continue
+                        ready.remove(node_id)
+                        busy |= needs[node_id]
+                        LOGGER.debug(f"Starting node {node_id} holding {sorted(needs[node_id])}")
+                        running[pool.submit(execute, self.nodes[node_id])] = node_id
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    busy -= needs[node_id]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        LOGGER.error(f"Node {node_id} failed: {str(e)}")
+                        if error is None:
+                            error = e
+                        continue
+
+                    finished.append(node_id)
+                    for successor in self.successors[node_id]:
+                        remaining[successor] -= 1
+                        if remaining[successor] == 0:
+                            ready.append(successor)
+                ready.sort(key=position.get)
+
+        if error is not None:
+            raise error
+        return finished